@@ -0,0 +1,61 @@
+"""
+Compare the Qt and PIL JPEG decode backends of the FPV viewer
+
+Usage: python benchmarks/bench_decode.py [--width 1280] [--height 720] [--frames 300]
+"""
+
+import argparse
+import random
+import time
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+from PySide6.QtGui import QGuiApplication
+
+from kevinbot_desktopclient.ui.mjpeg import DecodeBackend, decode_jpeg
+
+
+def synthetic_jpeg(width: int, height: int, quality: int = 80) -> bytes:
+    rng = random.Random(0)
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(200):
+        x, y = rng.randrange(width), rng.randrange(height)
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        draw.rectangle((x, y, x + rng.randrange(8, 80), y + rng.randrange(8, 80)), fill=color)
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def bench(data: bytes, backend: DecodeBackend, frames: int) -> tuple[float, float]:
+    decode_jpeg(data, backend)  # warm up plugins and caches
+
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for _ in range(frames):
+        decode_jpeg(data, backend)
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    return frames / wall, cpu / frames * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    _app = QGuiApplication([])
+    data = synthetic_jpeg(args.width, args.height, args.quality)
+    print(f"{args.width}x{args.height} JPEG, {len(data) / 1024:.1f} KiB, {args.frames} frames")
+    print(f"{'backend':<8}{'frames/s':>12}{'CPU ms/frame':>16}")
+    for backend in DecodeBackend:
+        fps, cpu_ms = bench(data, backend, args.frames)
+        print(f"{backend.value:<8}{fps:>12.1f}{cpu_ms:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Measure GUI-thread time per LivePlot tick as the history grows
+
+Compares the old approach (Python lists that grow forever, handed to pyqtgraph in full on every tick)
+against LivePlot's ring buffers with a retention window, drawn at full resolution and with min/max
+decimation. Every tick samples all sources, updates the plot items, handles pending events (which
+delivers finished decimation results) and repaints. The reported time is the mean over the ticks
+leading up to each checkpoint.
+
+Usage: QT_QPA_PLATFORM=offscreen python benchmarks/bench_plot.py [--sources 6] [--retention 60]
+    [--interval 0.01] [--checkpoints 1000 5000 20000 50000]
+"""
+
+import argparse
+import math
+import time
+
+import pyqtgraph as pg
+from PySide6.QtWidgets import QApplication
+
+from kevinbot_desktopclient.components.dataplot import Decimation, LivePlot, TelemetrySampler
+
+WINDOW = 200
+
+
+def source(index: int):
+    return lambda x: math.sin(x + index)
+
+
+def bench_lists(sources: int, interval: float, checkpoints: list[int]) -> list[float]:
+    widget = pg.PlotWidget()
+    widget.resize(800, 300)
+    widget.show()
+    items = [widget.plot(pen=pg.mkPen("w", width=2)) for _ in range(sources)]
+    data_x: list[float] = []
+    data_y: list[list[float]] = [[] for _ in range(sources)]
+    funcs = [source(index) for index in range(sources)]
+
+    results = []
+    x = 0.0
+    for tick in range(1, checkpoints[-1] + 1):
+        if tick == checkpoints[len(results)] - WINDOW + 1:
+            start = time.perf_counter()
+        data_x.append(x)
+        for item, values, func in zip(items, data_y, funcs, strict=True):
+            values.append(func(x))
+            item.setData(data_x, values)
+        widget.repaint()
+        x += interval
+        if tick == checkpoints[len(results)]:
+            results.append((time.perf_counter() - start) / WINDOW * 1000)
+            if len(results) == len(checkpoints):
+                break
+    widget.close()
+    return results
+
+
+def bench_live_plot(
+    sources: int, retention: float, interval: float, checkpoints: list[int], decimation: Decimation
+) -> tuple[list[float], int]:
+    # Simulated time, so the retention window fills up at the sampling interval
+    ticks = 0
+    plot = LivePlot(retention, sampler=TelemetrySampler(clock=lambda: ticks * interval), decimation=decimation)
+    plot.timer.stop()
+    plot.sampler.timer.stop()
+    plot.resize(800, 300)
+    plot.show()
+    for index in range(sources):
+        plot.add_data_source(f"source{index}", source(index), enabled=True)
+    decimated = 0
+
+    def count():
+        nonlocal decimated
+        decimated += 1
+
+    plot.decimator.finished.connect(count)
+
+    results = []
+    for tick in range(1, checkpoints[-1] + 1):
+        if tick == checkpoints[len(results)] - WINDOW + 1:
+            start = time.perf_counter()
+        plot.sampler.sample()
+        plot.update_plot()
+        QApplication.processEvents()
+        plot.repaint()
+        ticks += 1
+        if tick == checkpoints[len(results)]:
+            results.append((time.perf_counter() - start) / WINDOW * 1000)
+            if len(results) == len(checkpoints):
+                break
+    plot.close()
+    return results, decimated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", type=int, default=6)
+    parser.add_argument("--retention", type=float, default=60)
+    parser.add_argument("--interval", type=float, default=0.01)
+    parser.add_argument("--checkpoints", type=int, nargs="+", default=[1000, 5000, 20000, 50000])
+    args = parser.parse_args()
+    checkpoints = sorted(max(checkpoint, WINDOW) for checkpoint in args.checkpoints)
+
+    _app = QApplication([])
+    lists = bench_lists(args.sources, args.interval, checkpoints)
+    full, _ = bench_live_plot(args.sources, args.retention, args.interval, checkpoints, Decimation.NONE)
+    minmax, decimated = bench_live_plot(args.sources, args.retention, args.interval, checkpoints, Decimation.MINMAX)
+
+    print(
+        f"{args.sources} sources, {args.interval * 1000:g} ms interval, {args.retention:g}s retention, "
+        f"ms per tick over {WINDOW} ticks"
+    )
+    print(f"{'history':>9}{'lists':>10}{'ring':>10}{'minmax':>10}")
+    for checkpoint, list_ms, full_ms, minmax_ms in zip(checkpoints, lists, full, minmax, strict=True):
+        print(f"{checkpoint:>9}{list_ms:>10.2f}{full_ms:>10.2f}{minmax_ms:>10.2f}")
+    print(f"{decimated} decimated series drawn")
+
+
+if __name__ == "__main__":
+    main()
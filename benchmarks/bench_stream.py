@@ -0,0 +1,163 @@
+"""
+Measure the whole FPV path, from socket to screen, against a local synthetic MJPEG server
+
+The server runs in a child process, so its CPU time isn't counted. For every scenario the viewer
+shows the stream headless for `--duration` seconds and reports:
+    fps         frames painted per second
+    CPU ms      process CPU time (all threads) per painted frame
+    RSS MB      resident memory at the end of the run
+    dropped     frames received but never shown, skipped by the decode queue or the viewer
+    latency     median capture to paint time
+
+Usage: python benchmarks/bench_stream.py [--duration 10] [--sizes 640x480 1280x720 1920x1080]
+    [--fps 30] [--quality 80] [--chunk-sizes 0 1460] [--chunk-delay 0] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QTimer  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from kevinbot_desktopclient.ui.mjpeg import MJPEGViewer  # noqa: E402
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        import resource
+
+        # Peak instead of current, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(size: tuple[int, int], fps: float, quality: int, chunk_size: int, chunk_delay: float):
+    port = free_port()
+    # fmt: off
+    server = subprocess.Popen([  # noqa: S603
+        sys.executable, "-m", "kevinbot_desktopclient.mjpeg_server",
+        "--port", str(port), "--fps", str(fps), "--width", str(size[0]), "--height", str(size[1]),
+        "--quality", str(quality), "--chunk-size", str(chunk_size), "--chunk-delay", str(chunk_delay),
+    ])
+    # fmt: on
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    else:
+        server.kill()
+        msg = "Test server did not start"
+        raise RuntimeError(msg)
+    return server, f"http://127.0.0.1:{port}/video_feed"
+
+
+def run(app: QApplication, url: str, duration: float, view_size: tuple[int, int]) -> dict[str, float]:
+    viewer = MJPEGViewer(url)
+    viewer.resize(*view_size)
+    viewer.show()
+
+    received = 0
+
+    def count(_data, _stamps):
+        nonlocal received
+        received += 1
+
+    # Let the connection settle before measuring
+    QTimer.singleShot(1000, app.quit)
+    app.exec()
+
+    viewer.stats.clear()
+    dropped = viewer.dropped_frames
+    displayed = 0
+
+    def displayed_frame():
+        nonlocal displayed
+        displayed += 1
+
+    viewer.frame_displayed.connect(displayed_frame)
+    viewer.mjpeg_thread.add_sink(count)
+    cpu = time.process_time()
+    wall = time.monotonic()
+    QTimer.singleShot(round(duration * 1000), app.quit)
+    app.exec()
+    cpu = time.process_time() - cpu
+    wall = time.monotonic() - wall
+
+    viewer.mjpeg_thread.remove_sink(count)
+    latency = viewer.stats.summary().get("Latency", {}).get("p50", float("nan"))
+    result = {
+        "fps": displayed / wall,
+        "cpu_ms": cpu / max(displayed, 1) * 1000,
+        "rss_mb": rss_mb(),
+        "received": received,
+        "displayed": displayed,
+        "dropped": viewer.dropped_frames - dropped,
+        "latency_ms": latency,
+    }
+    viewer.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1280x720", "1920x1080"])
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[0, 1460])
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    parser.add_argument("--view-width", type=int, default=800)
+    parser.add_argument("--view-height", type=int, default=450)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    app = QApplication([])
+    results = []
+    print(f"{args.duration:g}s per scenario, {args.fps:g} fps source, shown at {args.view_width}x{args.view_height}")
+    print(
+        f"{'size':<11}{'chunk':>7}{'fps':>8}{'CPU ms':>9}{'RSS MB':>9}"
+        f"{'recv':>7}{'shown':>7}{'dropped':>9}{'latency':>9}"
+    )
+    for size_text in args.sizes:
+        size = tuple(int(value) for value in size_text.split("x"))
+        for chunk_size in args.chunk_sizes:
+            server, url = start_server(size, args.fps, args.quality, chunk_size, args.chunk_delay)  # type: ignore
+            try:
+                result = run(app, url, args.duration, (args.view_width, args.view_height))
+            finally:
+                server.terminate()
+                server.wait()
+            result |= {"size": size_text, "chunk_size": chunk_size}
+            results.append(result)
+            print(
+                f"{size_text:<11}{chunk_size or '-':>7}{result['fps']:>8.1f}{result['cpu_ms']:>9.2f}"
+                f"{result['rss_mb']:>9.1f}{result['received']:>7}{result['displayed']:>7}"
+                f"{result['dropped']:>9}{result['latency_ms']:>9.1f}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measure GUI-thread time per frame of the FPV viewer paint path
+
+Compares the old QLabel path (smooth scale into a new pixmap on every frame) against
+`MJPEGViewer.update_image` followed by a repaint.
+
+Usage: QT_QPA_PLATFORM=offscreen python benchmarks/bench_viewer.py [--width 1280] [--height 720] [--frames 300]
+"""
+
+import argparse
+import time
+
+from bench_decode import synthetic_jpeg
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QPixmap
+from PySide6.QtTest import QTest
+from PySide6.QtWidgets import QApplication, QLabel
+
+from kevinbot_desktopclient.ui.mjpeg import MJPEGViewer, decode_jpeg
+
+
+def bench_label(label: QLabel, qimg, frames: int) -> float:
+    start = time.process_time()
+    for _ in range(frames):
+        pixmap = QPixmap.fromImage(qimg)
+        label.setMinimumHeight(round(200 / (pixmap.width() / pixmap.height())))
+        label.setPixmap(
+            pixmap.scaled(label.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        )
+        label.repaint()
+    return (time.process_time() - start) / frames * 1000
+
+
+def bench_viewer(viewer: MJPEGViewer, qimg, frames: int) -> float:
+    start = time.process_time()
+    for _ in range(frames):
+        viewer.update_image(qimg)
+        viewer.repaint()
+    return (time.process_time() - start) / frames * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--view-width", type=int, default=800)
+    parser.add_argument("--view-height", type=int, default=450)
+    args = parser.parse_args()
+
+    _app = QApplication([])
+    qimg = decode_jpeg(synthetic_jpeg(args.width, args.height))
+
+    label = QLabel()
+    label.resize(args.view_width, args.view_height)
+    label.show()
+
+    viewer = MJPEGViewer("http://127.0.0.1:9/video_feed")
+    viewer.mjpeg_thread.stop()
+    viewer.resize(args.view_width, args.view_height)
+    viewer.show()
+    # Let the resize settle, so frames are scaled smoothly like they are most of the time
+    QTest.qWait(viewer.RESIZE_SETTLE_MS * 2)
+
+    print(f"{args.width}x{args.height} frames into {args.view_width}x{args.view_height}, {args.frames} frames")
+    print(f"{'path':<8}{'CPU ms/frame':>16}")
+    print(f"{'label':<8}{bench_label(label, qimg, args.frames):>16.2f}")
+    print(f"{'viewer':<8}{bench_viewer(viewer, qimg, args.frames):>16.2f}")
+    viewer.mjpeg_thread.pipeline.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
 import math
 import random
 import sys
+import threading
+import time
 from collections.abc import Callable
+from enum import Enum
 
+import numpy as np
 import pyqtgraph as pg
-from PySide6.QtCore import QSize, Qt, QTimer, Signal, SignalInstance
+from PySide6.QtCore import QObject, QSize, Qt, QTimer, Signal, SignalInstance
 from PySide6.QtGui import QColor, QIcon, QPixmap
 from PySide6.QtWidgets import (
     QAbstractItemView,
@@ -155,24 +159,495 @@ class DataSourceManagerItem(QFrame):
         self.width_changed.emit(self.label.text(), self.width_select.currentData())
 
 
+class RingBuffer:
+    """
+    Preallocated float64 FIFO whose contents can always be viewed as one contiguous array.
+
+    Every value is written twice, at its index and one capacity further. The newest `len` values then
+    always sit next to each other in the backing array, so `view` never has to copy or wrap around.
+
+    A view can be pinned, to be read on another thread. A write that would overwrite a pinned value
+    moves the buffer to a new backing array instead, leaving the pinned views as they were.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.capacity = max(1, capacity)
+        self._data = np.empty(self.capacity * 2, dtype=np.float64)
+        self._start = 0
+        self._len = 0
+        # Number of values dropped so far, and the oldest value of each pinned view, in the same count
+        self._head = 0
+        self._pins: list[int] = []
+
+    def __len__(self) -> int:
+        return self._len
+
+    def append(self, value: float) -> None:
+        """Add a value, dropping the oldest one if the buffer is full.
+
+        Args:
+            value: Value to add
+        """
+        if self._len == self.capacity:
+            self.drop(1)
+        if self._pins and self._head + self._len - self.capacity >= min(self._pins):
+            self._reallocate(self.capacity)
+        pos = (self._start + self._len) % self.capacity
+        self._data[pos] = value
+        self._data[pos + self.capacity] = value
+        self._len += 1
+
+    def drop(self, count: int) -> None:
+        """Remove the oldest values.
+
+        Args:
+            count: Number of values to remove
+        """
+        count = min(count, self._len)
+        self._start = (self._start + count) % self.capacity
+        self._len -= count
+        self._head += count
+
+    def clear(self) -> None:
+        self.drop(self._len)
+
+    def reserve(self, capacity: int) -> None:
+        """Grow the buffer, keeping its contents.
+
+        Args:
+            capacity: New capacity, smaller values are ignored
+        """
+        if capacity > self.capacity:
+            self._reallocate(capacity)
+
+    def _reallocate(self, capacity: int) -> None:
+        values = self.view()
+        data = np.empty(capacity * 2, dtype=np.float64)
+        data[: self._len] = values
+        data[capacity : capacity + self._len] = values
+        self.capacity = capacity
+        self._data = data
+        self._start = 0
+        # The old array now belongs to the pinned views
+        self._pins.clear()
+
+    def view(self) -> np.ndarray:
+        """Values from oldest to newest, without copying. The view is only valid until the next change."""
+        return self._data[self._start : self._start + self._len]
+
+    def pin(self) -> int:
+        """Keep the current `view` unchanged until `unpin` is called, whatever is written meanwhile.
+
+        Returns:
+            Key to pass to `unpin`
+        """
+        self._pins.append(self._head)
+        return self._head
+
+    def unpin(self, key: int) -> None:
+        if key in self._pins:
+            self._pins.remove(key)
+
+
+class TimeSeries:
+    """Samples of one data source, kept for `retention` seconds."""
+
+    def __init__(self, retention: float, capacity: int = 1024) -> None:
+        self.retention = retention
+        self.x = RingBuffer(capacity)
+        self.y = RingBuffer(capacity)
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def append(self, x: float, y: float) -> None:
+        """Add a sample, and drop the samples that fall out of the retention window.
+
+        Args:
+            x: Time of the sample in seconds, not older than the previous sample
+            y: Value of the sample
+        """
+        if len(self.x) == self.x.capacity:
+            # Grow rather than overwrite, so the buffers settle with room to spare and pinned views are
+            # not overwritten while they are read
+            self.x.reserve(self.x.capacity * 2)
+            self.y.reserve(self.y.capacity * 2)
+        self.x.append(x)
+        self.y.append(y)
+        self.trim()
+
+    def trim(self) -> None:
+        """Drop samples older than the retention window."""
+        xs = self.x.view()
+        if not len(xs) or xs[0] >= xs[-1] - self.retention:
+            return
+        expired = int(np.searchsorted(xs, xs[-1] - self.retention))
+        self.x.drop(expired)
+        self.y.drop(expired)
+
+    def clear(self) -> None:
+        self.x.clear()
+        self.y.clear()
+
+    def views(self) -> tuple[np.ndarray, np.ndarray]:
+        """Times and values of the retained samples, without copying."""
+        return self.x.view(), self.y.view()
+
+    def pin(self) -> int:
+        """Keep the current `views` unchanged until `unpin` is called.
+
+        Returns:
+            Key to pass to `unpin`
+        """
+        self.y.pin()
+        return self.x.pin()
+
+    def unpin(self, key: int) -> None:
+        self.x.unpin(key)
+        self.y.unpin(key)
+
+
+class Decimation(Enum):
+    NONE = "none"
+    MINMAX = "minmax"
+    LTTB = "lttb"
+
+
+def decimate_minmax(x: np.ndarray, y: np.ndarray, buckets: int) -> tuple[np.ndarray, np.ndarray]:
+    """Reduce a series to the minimum and maximum of each bucket, so spikes stay visible.
+
+    Buckets hold the same number of samples, which matches pixel columns for evenly sampled data. A
+    NaN in a bucket is kept too, so gaps in the data stay gaps.
+
+    Args:
+        x: Sample times
+        y: Sample values
+        buckets: Number of buckets, usually the width of the plot in pixels
+
+    Returns:
+        Times and values of at most 3 samples per bucket, or the series unchanged if it is not larger
+    """
+    n = len(x)
+    if buckets <= 0 or n <= buckets * 3:
+        return x, y
+    size = n // buckets
+    body = size * buckets
+    rows = y[:body].reshape(buckets, size)
+    nan = np.isnan(rows)
+    low = np.where(nan, np.inf, rows).argmin(axis=1)
+    high = np.where(nan, -np.inf, rows).argmax(axis=1)
+    gap = np.where(nan.any(axis=1), nan.argmax(axis=1), low)
+    picks = np.stack((low, high, gap), axis=1) + (np.arange(buckets) * size)[:, None]
+    # The samples that don't fill a whole bucket are kept as they are
+    indices = np.unique(np.concatenate((picks.ravel(), np.arange(body, n))))
+    return x[indices], y[indices]
+
+
+def decimate_lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> tuple[np.ndarray, np.ndarray]:
+    """Reduce a series with Largest-Triangle-Three-Buckets, which keeps its visual shape.
+
+    Gaps (NaN values) are not kept, the line is drawn across them. Picking a sample depends on the one
+    picked before it, so buckets are walked in a Python loop: this is several times slower than
+    `decimate_minmax`, which is why it is not the default.
+
+    Args:
+        x: Sample times
+        y: Sample values
+        threshold: Number of samples to keep
+
+    Returns:
+        Times and values of the kept samples, or the series unchanged if it is not larger
+    """
+    finite = np.isfinite(y)
+    if not finite.all():
+        x, y = x[finite], y[finite]
+    n = len(x)
+    if threshold < 3 or n <= threshold:
+        return x, y
+
+    # The first and last samples are always kept, the rest is split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    kept = np.empty(threshold, dtype=np.intp)
+    kept[0] = 0
+    kept[-1] = n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        # The third corner of the triangle is the average of the next bucket
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        kept[bucket + 1] = a
+    return x[kept], y[kept]
+
+
+class Decimator(QObject):
+    """
+    Decimates plot series on a worker thread.
+
+    Only the newest request for each series is kept, a request replaced before it was started is never
+    computed. Results are emitted with `finished`, which is delivered on the thread the Decimator lives
+    in.
+    """
+
+    finished = Signal(str, int, object, object)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._cond = threading.Condition()
+        self._pending: dict[str, tuple[int, np.ndarray, np.ndarray, int, Decimation]] = {}
+        self._stopped = False
+        self._thread = threading.Thread(target=self._work, name="Plot decimation", daemon=True)
+        self._thread.start()
+
+    def submit(self, name: str, generation: int, x: np.ndarray, y: np.ndarray, buckets: int, method: Decimation):
+        """Request a series to be decimated.
+
+        Args:
+            name: Name of the series
+            generation: Passed back with the result, to tell it apart from results of older requests
+            x: Sample times, must not be modified until the result is emitted
+            y: Sample values, must not be modified until the result is emitted
+            buckets: Number of pixel columns the series is drawn across
+            method: Decimation method
+        """
+        with self._cond:
+            self._pending.pop(name, None)
+            self._pending[name] = (generation, x, y, buckets, method)
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            self._cond.notify()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                # Oldest request first, so no series starves
+                name = next(iter(self._pending))
+                generation, x, y, buckets, method = self._pending.pop(name)
+            if method == Decimation.LTTB:
+                x, y = decimate_lttb(x, y, buckets * 2)
+            else:
+                x, y = decimate_minmax(x, y, buckets)
+            self.finished.emit(name, generation, x, y)
+
+
+class TelemetrySampler(QObject):
+    """
+    Samples data sources on one timer into one shared store, for any number of LivePlots.
+
+    Plots attached to the sampler are only views: they pick which sources they show, over which time
+    window, and how they draw them. A source is sampled once per tick however many plots show it, and
+    only while at least one plot shows it or keeps recording hidden sources. The history is kept for the
+    longest window of the attached plots.
+
+    Samples are stamped with the time they were taken, in seconds since the sampler was created, so
+    timer jitter and stalls of the GUI thread don't distort the time axis. In event-driven mode the
+    timer is stopped, and a sample is taken each time `record` is called, usually when new data arrives.
+    """
+
+    sampled = Signal()
+    _recorded = Signal(float, object)
+
+    def __init__(
+        self,
+        interval: int = 100,
+        retention: float = 300.0,
+        *,
+        event_driven: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create a sampler. It starts sampling right away.
+
+        Args:
+            interval: Time between samples in milliseconds, when sampling on the timer
+            retention: Seconds of history kept while no plot is attached
+            event_driven: Sample when `record` is called instead of on the timer
+            clock: Monotonic clock the samples are stamped with, in seconds
+        """
+        super().__init__()
+        self.sources: dict[str, Callable[[float], float]] = {}
+        self.series: dict[str, TimeSeries] = {}
+        self.plots: list[LivePlot] = []
+        self.default_retention = retention
+        self.retention = retention
+        self.event_driven = event_driven
+
+        self.clock = clock
+        self._epoch = clock()
+        self._sampling: list[str] = []
+
+        # Samples recorded on other threads are stored on this one
+        self._recorded.connect(self._store, Qt.ConnectionType.QueuedConnection)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.sample)
+        if not event_driven:
+            self.timer.start()
+
+    def now(self) -> float:
+        """Current time on the time axis, in seconds."""
+        return self.clock() - self._epoch
+
+    def set_event_driven(self, enabled: bool) -> None:  # noqa: FBT001
+        """Choose between sampling when `record` is called and sampling on the timer.
+
+        Args:
+            enabled: True to sample when `record` is called
+        """
+        self.event_driven = enabled
+        if enabled:
+            self.timer.stop()
+        else:
+            self.timer.start()
+
+    def set_interval(self, interval: int) -> None:
+        """Change the time between samples, when sampling on the timer.
+
+        Args:
+            interval: Time between samples in milliseconds
+        """
+        self.timer.setInterval(interval)
+
+    def add_source(self, name: str, func: Callable[[float], float]) -> None:
+        """Add a data source. Sources are shared by name, adding one that exists keeps the existing one.
+
+        Args:
+            name: The name of the data source
+            func: A function that takes a float x value and returns a float y value
+        """
+        if name in self.sources:
+            return
+        self.sources[name] = func
+        self.series[name] = TimeSeries(self.retention)
+
+    def attach(self, plot: "LivePlot") -> None:
+        self.plots.append(plot)
+        self.update()
+
+    def detach(self, plot: "LivePlot") -> None:
+        if plot in self.plots:
+            self.plots.remove(plot)
+            self.update()
+
+    def update(self) -> None:
+        """Pick up changes in which sources the plots show and how much history they need."""
+        retention = max((plot.retention for plot in self.plots), default=self.default_retention)
+        if retention != self.retention:
+            self.retention = retention
+            for series in self.series.values():
+                series.retention = retention
+                series.trim()
+
+        sampling = [
+            name
+            for name in self.sources
+            if any(
+                name in plot.data_sources and (plot.data_sources[name]["enabled"] or plot.sample_disabled)
+                for plot in self.plots
+            )
+        ]
+        for name in sampling:
+            if name not in self._sampling and len(self.series[name]):
+                # Samples were missed while nothing needed the source, don't draw a line across the gap
+                self.series[name].append(self.now(), math.nan)
+        self._sampling = sampling
+
+    def is_sampled(self, name: str) -> bool:
+        return name in self._sampling
+
+    def sample(self) -> None:
+        """Sample every source that a plot needs."""
+        x = self.now()
+        self._store(x, [(name, self.sources[name](x)) for name in self._sampling])
+
+    def record(self) -> None:
+        """Sample every source that a plot needs, in event-driven mode. Does nothing otherwise.
+
+        Can be called from any thread. The sources are read on the calling thread, so the values match
+        the time of the call, and the sample is stored on the sampler's thread.
+        """
+        if not self.event_driven:
+            return
+        x = self.now()
+        self._recorded.emit(x, [(name, self.sources[name](x)) for name in self._sampling])
+
+    def _store(self, x: float, values: list[tuple[str, float]]) -> None:
+        for name, value in values:
+            series = self.series.get(name)
+            if series is None or (len(series) and series.x.view()[-1] > x):
+                # A gap was marked after this sample was taken on another thread
+                continue
+            series.append(x, value)
+        self.sampled.emit()
+
+
 class LivePlot(QMainWindow):
     on_data_source_selection_changed = Signal(str, bool)
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        retention: float = 300.0,
+        *,
+        sampler: TelemetrySampler | None = None,
+        sample_disabled: bool = False,
+        decimation: Decimation = Decimation.MINMAX,
+    ) -> None:
+        """Create a plot of live data sources.
+
+        The data comes from a TelemetrySampler, which plots can share so that each source is sampled and
+        stored once. The plot only draws it, on its own timer.
+
+        Disabled sources cost nothing per tick: they aren't drawn, their plot item is only created once
+        they are first enabled, and they aren't sampled unless a plot showing them sets `sample_disabled`.
+
+        Series with more samples than the plot has pixels to show them are decimated on a Decimator
+        thread, whenever their data or the visible range changes. Zoomed in far enough, they are drawn
+        at full resolution.
+
+        Args:
+            retention: Seconds of history shown
+            sampler: Sampler to draw the data from, a private one is created if not given
+            sample_disabled: Keep sampling disabled sources, so their history is there when they are enabled
+            decimation: How long series are reduced before drawing
+        """
         super().__init__()
 
         # Initialize data structures for dynamic sources
         self.data_sources: dict[str, dict] = {}
-        self.data_y: dict[str, list[float]] = {}
+        self.sampler = sampler or TelemetrySampler(retention=retention)
+        self.series = self.sampler.series
         self.plot_data_items: dict[str, pg.PlotDataItem] = {}
+        self.retention = retention
+        self.sample_disabled = sample_disabled
+        self.decimation = decimation
+
+        # What was last drawn for each source, so nothing is decimated twice
+        self._drawn: dict[str, tuple] = {}
+        self._generation: dict[str, int] = {}
+        # Series with a job on the decimator, and the key their pinned samples were pinned with
+        self._decimating: dict[str, int] = {}
+        self.decimator = Decimator()
+        self.decimator.finished.connect(self._decimated)
+
+        # Samples before this time were cleared from this plot, samples after this time came in while paused
+        self._cleared_at: float = -math.inf
+        self._paused_at: float | None = None
 
         self._setup_ui()
+        self.sampler.attach(self)
 
-        # Initialize the data series for real-time updates
-        self.data_x: list[float] = []
-        self.plot_x: float = 0
-
-        # Timer to update data
+        # Timer to redraw the plot
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_plot)
         self.timer.start(100)  # 100ms default update rate
@@ -204,18 +679,48 @@ class LivePlot(QMainWindow):
         clear_button.clicked.connect(self.clear_data)
         controls_layout.addWidget(clear_button)
 
-        # Update rate control
+        # Redraw rate control, the sample rate is set on the sampler
         rate_layout = QHBoxLayout()
-        rate_label = QLabel("Update Rate (ms):")
+        rate_label = QLabel("Redraw Interval (ms):")
         self.rate_spinbox = QSpinBox()
         self.rate_spinbox.setRange(10, 1000)
         self.rate_spinbox.setValue(100)
         self.rate_spinbox.setSingleStep(10)
+        self.rate_spinbox.setToolTip("How often the plot is redrawn, this doesn't change how often data is sampled")
         self.rate_spinbox.valueChanged.connect(self.update_timer_interval)
         rate_layout.addWidget(rate_label)
         rate_layout.addWidget(self.rate_spinbox)
         controls_layout.addLayout(rate_layout)
 
+        # History length control
+        retention_layout = QHBoxLayout()
+        retention_label = QLabel("History (s):")
+        self.retention_spinbox = QSpinBox()
+        self.retention_spinbox.setRange(10, 3600)
+        self.retention_spinbox.setValue(round(self.retention))
+        self.retention_spinbox.setSingleStep(30)
+        self.retention_spinbox.valueChanged.connect(self.set_retention)
+        retention_layout.addWidget(retention_label)
+        retention_layout.addWidget(self.retention_spinbox)
+        controls_layout.addLayout(retention_layout)
+
+        self.sample_disabled_check = QCheckBox("Record Hidden Sources")
+        self.sample_disabled_check.setToolTip("Keep sampling disabled sources, so they have history once enabled")
+        self.sample_disabled_check.setChecked(self.sample_disabled)
+        self.sample_disabled_check.toggled.connect(self.set_sample_disabled)
+        controls_layout.addWidget(self.sample_disabled_check)
+
+        self.decimation_combo = QComboBox()
+        self.decimation_combo.setToolTip("How long histories are reduced before drawing")
+        self.decimation_combo.addItem("Full Resolution", Decimation.NONE)
+        self.decimation_combo.addItem("Min/Max", Decimation.MINMAX)
+        self.decimation_combo.addItem("LTTB (Slower)", Decimation.LTTB)
+        self.decimation_combo.setCurrentIndex(self.decimation_combo.findData(self.decimation))
+        self.decimation_combo.currentIndexChanged.connect(
+            lambda: self.set_decimation(self.decimation_combo.currentData())
+        )
+        controls_layout.addWidget(self.decimation_combo)
+
         # Add stretch to push controls to the left
         controls_layout.addStretch()
 
@@ -235,26 +740,60 @@ class LivePlot(QMainWindow):
         # Controls
         autoscale_button.clicked.connect(self.plot_widget.setAutoVisible)
         autoscale_button.clicked.connect(self.plot_widget.enableAutoRange)
+        self.plot_widget.sigXRangeChanged.connect(self._redraw)
 
     def toggle_play_pause(self) -> None:
-        """Toggle between playing and pausing the plot updates."""
+        """Toggle between playing and pausing the plot updates. Sampling goes on while paused."""
         if self.play_pause_button.isChecked():
             self.timer.stop()
+            self._paused_at = self.sampler.now()
             self.play_pause_button.setText("Resume")
         else:
+            self._paused_at = None
             self.timer.start()
             self.play_pause_button.setText("Pause")
 
     def clear_data(self) -> None:
-        """Clear all plotted data."""
-        self.data_x.clear()
-        for name in self.data_sources:
-            self.data_y[name].clear()
-            self.plot_data_items[name].clear()
-        self.plot_x = 0
+        """Clear the plotted data. The shared history is kept for other plots."""
+        self._cleared_at = self.sampler.now()
+        for item in self.plot_data_items.values():
+            item.clear()
+        # Results still being computed are for the old data
+        for name in self._generation:
+            self._generation[name] += 1
+        self._drawn.clear()
+
+    def set_sample_disabled(self, sample: bool) -> None:  # noqa: FBT001
+        """Choose whether disabled sources keep being sampled.
+
+        Args:
+            sample: True to keep sampling them
+        """
+        self.sample_disabled = sample
+        self.sampler.update()
+
+    def set_decimation(self, decimation: Decimation) -> None:
+        """Change how long series are reduced before drawing.
+
+        Args:
+            decimation: Decimation method
+        """
+        self.decimation = decimation
+        self._drawn.clear()
+        self._redraw()
+
+    def set_retention(self, seconds: float) -> None:
+        """Change how much history is shown.
+
+        Args:
+            seconds: Length of the history in seconds
+        """
+        self.retention = seconds
+        self.sampler.update()
+        self._redraw()
 
     def update_timer_interval(self, value: int) -> None:
-        """Update the timer interval for data updates.
+        """Update the timer interval for redrawing the plot.
 
         Args:
             value: New interval in milliseconds
@@ -274,19 +813,21 @@ class LivePlot(QMainWindow):
 
         Args:
             name: The name of the data source
-            func: A function that takes a float x value and returns a float y value
+            func: A function that takes a float x value and returns a float y value, not used if the
+                sampler already has a source with this name
             color: The color to use for plotting (default: white)
+            width: Width of the line
+            enabled: Whether the source is shown
         """
         if name in self.data_sources:
             msg = f"Data source '{name}' already exists"
             raise ValueError(msg)
 
-        # Add the source function
-        self.data_sources[name] = {"func": func, "color": color, "width": width, "enabled": enabled}
-
-        # Initialize data structures for the new source
-        self.data_y[name] = []
-        self.plot_data_items[name] = self.plot_widget.plot(pen=pg.mkPen(color, width=width))
+        self.sampler.add_source(name, func)
+        self.data_sources[name] = {"color": color, "width": width, "enabled": enabled}
+        self.sampler.update()
+        if enabled:
+            self._show_source(name)
 
     def get_data_sources(self):
         return self.data_sources
@@ -300,7 +841,8 @@ class LivePlot(QMainWindow):
             color: The new color to use for plotting (default: white)
         """
         self.data_sources[name]["color"] = color
-        self.plot_data_items[name].setPen(pg.mkPen(color, width=self.data_sources[name]["width"]))
+        if name in self.plot_data_items:
+            self.plot_data_items[name].setPen(pg.mkPen(color, width=self.data_sources[name]["width"]))
 
     def edit_pen_width(self, name: str, width: int):
         """
@@ -311,7 +853,8 @@ class LivePlot(QMainWindow):
             width: The new width to use for plotting
         """
         self.data_sources[name]["width"] = width
-        self.plot_data_items[name].setPen(pg.mkPen(self.data_sources[name]["color"], width=width))
+        if name in self.plot_data_items:
+            self.plot_data_items[name].setPen(pg.mkPen(self.data_sources[name]["color"], width=width))
 
     def edit_enabled(self, name: str, *, enabled: bool):
         """
@@ -321,7 +864,80 @@ class LivePlot(QMainWindow):
             name: The name of the data source
             enabled: The new enabled state
         """
+        if enabled == self.data_sources[name]["enabled"]:
+            return
         self.data_sources[name]["enabled"] = enabled
+        self.sampler.update()
+        if enabled:
+            self._show_source(name)
+        elif name in self.plot_data_items:
+            self.plot_data_items[name].setVisible(False)
+
+    def _show_source(self, name: str) -> None:
+        item = self.plot_data_items.get(name)
+        if item is None:
+            source = self.data_sources[name]
+            item = self.plot_widget.plot(pen=pg.mkPen(source["color"], width=source["width"]), connect="finite")
+            self.plot_data_items[name] = item
+        item.setVisible(True)
+        self._draw(name)
+
+    def _buckets(self, x: np.ndarray) -> int:
+        """Number of pixel columns the whole series would span at the current zoom."""
+        width = max(int(self.plot_widget.getViewBox().width()), 100)
+        x_min, x_max = self.plot_widget.viewRange()[0]
+        span = x[-1] - x[0]
+        if x_max <= x_min or span <= 0:
+            return width
+        return int(width * max(1.0, span / (x_max - x_min)))
+
+    def _window(self, name: str) -> tuple[np.ndarray, np.ndarray]:
+        """Samples within this plot's history, without copying."""
+        x, y = self.series[name].views()
+        if self._paused_at is not None:
+            end = int(np.searchsorted(x, self._paused_at))
+            x, y = x[:end], y[:end]
+        if not len(x):
+            return x, y
+        start = int(np.searchsorted(x, max(x[-1] - self.retention, self._cleared_at)))
+        return x[start:], y[start:]
+
+    def _draw(self, name: str) -> None:
+        x, y = self._window(name)
+        buckets = self._buckets(x) if len(x) else 0
+        key = (len(x), x[-1] if len(x) else None, buckets, self.decimation)
+        if self._drawn.get(name) == key:
+            return
+        full = self.decimation == Decimation.NONE or len(x) <= buckets * 3
+        if not full and name in self._decimating:
+            # One job per series, the newest samples are drawn when it is done
+            return
+        self._drawn[name] = key
+        self._generation[name] = self._generation.get(name, 0) + 1
+        if full:
+            self.plot_data_items[name].setData(x, y)
+            return
+        # The worker reads the shared ring buffers directly, they are pinned until it is done
+        self._decimating[name] = self.series[name].pin()
+        self.decimator.submit(name, self._generation[name], x, y, buckets, self.decimation)
+
+    def _redraw(self) -> None:
+        for name, data in self.data_sources.items():
+            if data["enabled"]:
+                self._draw(name)
+
+    def _decimated(self, name: str, generation: int, x: np.ndarray, y: np.ndarray) -> None:
+        self._unpin(name)
+        if self._generation.get(name) == generation and name in self.plot_data_items:
+            self.plot_data_items[name].setData(x, y)
+        # Catch up with the samples that came in while the job ran
+        if name in self.data_sources and self.data_sources[name]["enabled"]:
+            self._draw(name)
+
+    def _unpin(self, name: str) -> None:
+        key = self._decimating.pop(name, None)
+        if key is not None and name in self.series:
+            self.series[name].unpin(key)
 
     def remove_data_source(self, name: str) -> None:
         """
@@ -334,30 +950,29 @@ class LivePlot(QMainWindow):
             msg = f"Data source '{name}' does not exist"
             raise ValueError(msg)
 
-        # Remove the data
+        # The sampler keeps the source for other plots, but stops sampling it if no one needs it
         del self.data_sources[name]
-        del self.data_y[name]
+        self.sampler.update()
 
         # Remove the plot item
-        self.plot_widget.removeItem(self.plot_data_items[name])
-        del self.plot_data_items[name]
+        item = self.plot_data_items.pop(name, None)
+        if item is not None:
+            self.plot_widget.removeItem(item)
+        self._drawn.pop(name, None)
+        self._generation.pop(name, None)
+        self._unpin(name)
 
     def update_plot(self) -> None:
-        """Update the plot with new data points."""
-        # Add new x value
-        self.data_x.append(self.plot_x)
-
-        # Update each data source
-        for name, data in self.data_sources.items():
-            # Generate the y-value using the source function
-            y_value = data["func"](self.plot_x)
-            self.data_y[name].append(y_value)
-
-            # Update the plot data item, but set visibility based on selection
-            self.plot_data_items[name].setData(self.data_x, self.data_y[name])
-            self.plot_data_items[name].setVisible(data["enabled"])
-
-        self.plot_x += self.timer.interval() / 1000
+        """Draw the samples taken since the last update."""
+        self._redraw()
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        self.sampler.detach(self)
+        self.decimator.stop()
+        for name in list(self._decimating):
+            self._unpin(name)
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
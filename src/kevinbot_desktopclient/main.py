@@ -28,6 +28,7 @@ from PySide6.QtCore import (
     QRunnable,
     QSettings,
     QSize,
+    QStandardPaths,
     Qt,
     QThreadPool,
     QTimer,
@@ -48,18 +49,23 @@ from PySide6.QtWidgets import (
     QGridLayout,
     QGroupBox,
     QHBoxLayout,
+    QHeaderView,
     QLabel,
     QLCDNumber,
     QLineEdit,
     QListWidget,
     QListWidgetItem,
     QMainWindow,
+    QPlainTextEdit,
     QPushButton,
     QRadioButton,
     QScrollArea,
     QSlider,
+    QSpinBox,
     QSplitter,
     QStatusBar,
+    QTableWidget,
+    QTableWidgetItem,
     QTabWidget,
     QTextEdit,
     QToolBox,
@@ -78,10 +84,20 @@ from kevinbot_desktopclient.components import (
     begin_controller_backend,
     controllers,
 )
-from kevinbot_desktopclient.components.dataplot import DataSourceManagerItem, LivePlot
+from kevinbot_desktopclient.components.dataplot import DataSourceManagerItem, LivePlot, TelemetrySampler
 from kevinbot_desktopclient.components.ping import PingWidget
 from kevinbot_desktopclient.enums import Cardinal
-from kevinbot_desktopclient.ui.mjpeg import MJPEGViewer
+from kevinbot_desktopclient.ui.fpv_hud import HUDState, TelemetryHUD
+from kevinbot_desktopclient.ui.mjpeg import DecodeBackend, DecodePool
+from kevinbot_desktopclient.ui.mjpeg_mosaic import MJPEGMosaic, MosaicLayout
+from kevinbot_desktopclient.ui.mjpeg_process import MJPEGProcessStream
+from kevinbot_desktopclient.ui.mjpeg_recording import (
+    FrameRecorder,
+    MJPEGPlaybackBar,
+    MJPEGPlayer,
+    Recording,
+    ReplayBuffer,
+)
 from kevinbot_desktopclient.ui.plots import BatteryGraph, PovVisual, StickVisual
 from kevinbot_desktopclient.ui.util import add_tabs
 from kevinbot_desktopclient.ui.widgets import (
@@ -104,6 +120,12 @@ __authors__ = [
 ]
 
 
+def default_recording_dir() -> str:
+    return os.path.join(
+        QStandardPaths.writableLocation(QStandardPaths.StandardLocation.MoviesLocation), "Kevinbot FPV"
+    )
+
+
 class AppState(Enum):
     NO_COMMUNICATIONS = 1
     CONNECTING = 2
@@ -120,6 +142,7 @@ class StateManager:
     id: str = ""
     tick_speed: float | None = None
     camera_address: str = "http://kevinbot.local"
+    extra_camera_addresses: list[str] = field(default_factory=list)
     mqtt_host: str = "http://10.0.0.1/"
     mqtt_port: int = 1883
     last_system_tick: float = field(default_factory=lambda: time.time())
@@ -221,6 +244,11 @@ class MainWindow(QMainWindow):
         )  # type: ignore
         self.state.mqtt_host = self.settings.value("comm/host", "http://10.0.0.1/", type=str)  # type: ignore
         logger.info(f"Robot FPV MJPEG Host: {self.state.camera_address}")
+        self.state.extra_camera_addresses = self.settings.value(
+            "comm/extra_camera_addresses", "", type=str
+        ).split()  # type: ignore
+        if self.state.extra_camera_addresses:
+            logger.info(f"Extra FPV MJPEG Hosts: {', '.join(self.state.extra_camera_addresses)}")
 
         # Theme
         theme = self.settings.value("window/theme", "dark", type=str)
@@ -489,6 +517,11 @@ class MainWindow(QMainWindow):
         # * Plot
         self.plot_docks: list[QDockWidget] = []
         self.plots: list[LivePlot] = []
+        # Every plot draws from the same samples
+        self.plot_sampler = TelemetrySampler(
+            self.settings.value("plot/sample_interval", 100, type=int),  # type: ignore
+            event_driven=self.settings.value("plot/event_sampling", False, type=bool),  # type: ignore
+        )
         self.add_plot()
 
         self.state_label = QLabel("No Communications")
@@ -546,16 +579,112 @@ class MainWindow(QMainWindow):
         self.fpv_refresh.setFixedSize(QSize(32, 32))
         self.fpv_control_layout.addWidget(self.fpv_refresh)
 
+        self.fpv_record = QPushButton()
+        self.fpv_record.setIcon(qta.icon("mdi6.record-rec"))
+        self.fpv_record.setIconSize(QSize(24, 24))
+        self.fpv_record.setFixedSize(QSize(32, 32))
+        self.fpv_record.setCheckable(True)
+        self.fpv_record.setToolTip("Record FPV")
+        self.fpv_control_layout.addWidget(self.fpv_record)
+        self.fpv_recorder: FrameRecorder | None = None
+
+        self.fpv_open = QPushButton()
+        self.fpv_open.setIcon(qta.icon("mdi6.folder-play"))
+        self.fpv_open.setIconSize(QSize(24, 24))
+        self.fpv_open.setFixedSize(QSize(32, 32))
+        self.fpv_open.setToolTip("Play back a recording")
+        self.fpv_control_layout.addWidget(self.fpv_open)
+
+        self.fpv_replay = QPushButton()
+        self.fpv_replay.setIcon(qta.icon("mdi6.history"))
+        self.fpv_replay.setIconSize(QSize(24, 24))
+        self.fpv_replay.setFixedSize(QSize(32, 32))
+        self.fpv_replay.setToolTip("Instant replay")
+        self.fpv_control_layout.addWidget(self.fpv_replay)
+
+        self.fpv_pip = QPushButton()
+        self.fpv_pip.setIcon(qta.icon("mdi6.picture-in-picture-bottom-right"))
+        self.fpv_pip.setIconSize(QSize(24, 24))
+        self.fpv_pip.setFixedSize(QSize(32, 32))
+        self.fpv_pip.setCheckable(True)
+        self.fpv_pip.setToolTip("Picture-in-picture")
+        self.fpv_pip.setVisible(bool(self.state.extra_camera_addresses))
+        self.fpv_control_layout.addWidget(self.fpv_pip)
+
         self.fpv_control_layout.addStretch()
 
+        self.fpv_hud_button = QPushButton()
+        self.fpv_hud_button.setIcon(qta.icon("mdi6.gauge"))
+        self.fpv_hud_button.setIconSize(QSize(24, 24))
+        self.fpv_hud_button.setFixedSize(QSize(32, 32))
+        self.fpv_hud_button.setCheckable(True)
+        self.fpv_hud_button.setToolTip("Telemetry HUD")
+        self.fpv_control_layout.addWidget(self.fpv_hud_button)
+
+        self.fpv_smooth = QPushButton()
+        self.fpv_smooth.setIcon(qta.icon("mdi6.sine-wave"))
+        self.fpv_smooth.setIconSize(QSize(24, 24))
+        self.fpv_smooth.setFixedSize(QSize(32, 32))
+        self.fpv_smooth.setCheckable(True)
+        self.fpv_smooth.setToolTip("Smooth mode, buffers a few frames to even out network jitter")
+        self.fpv_control_layout.addWidget(self.fpv_smooth)
+
         self.fpv_fps = QLabel("?? FPS")
         self.fpv_control_layout.addWidget(self.fpv_fps)
 
-        self.fpv = MJPEGViewer(self.state.camera_address)
+        self.fpv_latency = QLabel("?? ms")
+        self.fpv_latency.setToolTip("Capture to display latency, needs timestamped frames from the camera")
+        self.fpv_control_layout.addWidget(self.fpv_latency)
+
+        self.fpv_mosaic = MJPEGMosaic(
+            [self.state.camera_address, *self.state.extra_camera_addresses],
+            DecodeBackend(self.settings.value("fpv/decode_backend", DecodeBackend.QT.value, type=str)),
+            DecodePool(self.settings.value("fpv/decode_workers", 2, type=int)),  # type: ignore
+            self.settings.value("fpv/queue_depth", 2, type=int),  # type: ignore
+            MosaicLayout(self.settings.value("fpv/layout", MosaicLayout.MOSAIC.value, type=str)),
+            self.settings.value("fpv/decode_process", False, type=bool),  # type: ignore
+        )
+        # The main camera, recording, replay and statistics are for this stream
+        self.fpv = self.fpv_mosaic.viewers[0]
+        disconnect_after = self.settings.value("fpv/disconnect_hidden", 30, type=int)
+        for viewer in self.fpv_mosaic.viewers:
+            viewer.disconnect_after = disconnect_after or None
         self.fpv_refresh.clicked.connect(self.reload_fpv)
-        self.fpv_last_frame = time.time()
-        self.fpv.mjpeg_thread.frame_received.connect(self.fpv_new_frame)
-        self.left_split_layout.addWidget(self.fpv, 2)
+        self.fpv_pip.setChecked(self.fpv_mosaic.layout_mode == MosaicLayout.PICTURE_IN_PICTURE)
+        self.fpv_pip.toggled.connect(self.set_fpv_layout)
+        self.fpv_smooth.toggled.connect(self.set_fpv_pacing)
+        self.fpv_hud = TelemetryHUD(self.fpv_hud_state)
+        self.fpv_hud_button.toggled.connect(self.set_fpv_hud)
+        self.fpv_hud_button.setChecked(self.settings.value("fpv/hud", False, type=bool))  # type: ignore
+        self.fpv_smooth.setChecked(self.settings.value("fpv/pacing", False, type=bool))  # type: ignore
+        self.fpv_record.toggled.connect(self.record_fpv)
+        self.fpv_stats_timer = QTimer()
+        self.fpv_stats_timer.setInterval(500)
+        self.fpv_stats_timer.timeout.connect(self.fpv_update_stats)
+        self.fpv_stats_timer.start()
+        self.left_split_layout.addWidget(self.fpv_mosaic, 2)
+
+        self.fpv_player: MJPEGPlayer | None = None
+        self.fpv_playback = MJPEGPlaybackBar()
+        self.fpv_playback.setVisible(False)
+        self.fpv_playback.close_requested.connect(self.fpv_live)
+        self.left_split_layout.addWidget(self.fpv_playback)
+        self.fpv_open.clicked.connect(self.open_fpv_recording)
+
+        self.fpv_replay_buffer = ReplayBuffer(
+            self.settings.value("fpv/replay_memory", 32, type=int) * 1024 * 1024,  # type: ignore
+            self.settings.value("fpv/replay_seconds", 30, type=int),  # type: ignore
+        )
+        self.fpv_replay.clicked.connect(self.replay_fpv)
+        if isinstance(self.fpv.mjpeg_thread, MJPEGProcessStream):
+            # Compressed frames stay in the decode process
+            for button in (self.fpv_record, self.fpv_replay):
+                button.setEnabled(False)
+                button.setToolTip(f"{button.toolTip()} is not available while decoding in a separate process")
+        else:
+            # Instant replay doesn't keep the stream connected while the FPV view is hidden, so hidden streams
+            # can still be disconnected. The replay has a gap for that time
+            self.fpv.mjpeg_thread.add_sink(self.fpv_replay_buffer.write, keep_connected=False)
 
         # * Mid View
         self.mid_split = QWidget()
@@ -678,13 +807,177 @@ class MainWindow(QMainWindow):
 
         return widget, skins, motions, bl_slider
 
-    def fpv_new_frame(self):
-        self.fpv_fps.setText(f"{round(1 / (time.time() - self.fpv_last_frame))} FPS")
-        self.fpv_last_frame = time.time()
+    def fpv_update_stats(self):
+        self.fpv_fps.setText(f"{self.fpv.stats.fps():.1f} FPS")
+        summary = self.fpv.stats.summary()
+        if "Latency" in summary:
+            self.fpv_latency.setText(f"{summary['Latency']['p50']:.0f} ms")
+        else:
+            self.fpv_latency.setText("?? ms")
+        if self.fpv.pacer is not None and "Pacing" in summary:
+            self.fpv_smooth.setToolTip(
+                f"Smooth mode adds {summary['Pacing']['p50']:.0f} ms of latency\n"
+                f"Buffering {self.fpv.pacer.target_depth} frames, "
+                f"jitter {self.fpv.pacer.jitter * 1000:.1f} ms, {self.fpv.pacer.underruns} underruns"
+            )
+        else:
+            self.fpv_smooth.setToolTip("Lowest latency mode, frames are shown as soon as they are decoded")
+        pipeline = self.fpv.mjpeg_thread.pipeline
+        if pipeline is not None:
+            occupancy = pipeline.occupancy()
+            decode_text = (
+                f"Decode queue: {occupancy['queued']}/{pipeline.depth}\n"
+                f"Decoding: {occupancy['decoding']}/{self.fpv.mjpeg_thread.pool.workers}\n"
+                f"Reordering: {occupancy['reordering']}\n"
+            )
+        else:
+            decode_text = "Decoding in a separate process\n"
+        self.fpv_fps.setToolTip(
+            f"{self.fpv.dropped_frames} frames dropped, {self.fpv.mjpeg_thread.corrupt} corrupt\n"
+            + decode_text
+            + f"Frame buffers: {self.fpv.mjpeg_thread.frame_pool.available()}/"
+            f"{self.fpv.mjpeg_thread.frame_pool.count} free, "
+            f"exhausted {self.fpv.mjpeg_thread.frame_pool.exhausted} times\n"
+            f"Reconnects: {self.fpv.mjpeg_thread.reconnects}"
+            + (
+                f" (last took {self.fpv.mjpeg_thread.last_reconnect_time:.2f}s)"
+                if self.fpv.mjpeg_thread.last_reconnect_time is not None
+                else ""
+            )
+        )
+
+        self.fpv_stats_table.setRowCount(len(summary))
+        for row, (stage, values) in enumerate(summary.items()):
+            self.fpv_stats_table.setItem(row, 0, QTableWidgetItem(stage))
+            for column, key in enumerate(("mean", "p50", "p95", "p99", "max"), 1):
+                item = QTableWidgetItem(f"{values[key]:.1f}")
+                item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.fpv_stats_table.setItem(row, column, item)
+        if self.fpv_replay.isEnabled():
+            self.fpv_replay.setToolTip(
+                f"Instant replay\n{self.fpv_replay_buffer.duration:.1f}s, "
+                f"{self.fpv_replay_buffer.size / 1e6:.1f} MB buffered"
+            )
+
+        self.fpv_frame_counts.setText(
+            f"Dropped: {self.fpv.dropped_frames}\t"
+            f"Corrupt: {self.fpv.mjpeg_thread.corrupt}\t"
+            f"Buffer pool exhausted: {self.fpv.mjpeg_thread.frame_pool.exhausted}"
+        )
+
+        if self.fpv_recorder is not None:
+            self.fpv_record.setToolTip(
+                f"Recording to {self.fpv_recorder.path}\n"
+                f"{self.fpv_recorder.written} frames, {self.fpv_recorder.bytes_written / 1e6:.1f} MB, "
+                f"{self.fpv_recorder.dropped} dropped"
+            )
 
     def reload_fpv(self):
-        self.fpv.mjpeg_thread.terminate()
-        self.fpv.mjpeg_thread.start()
+        self.fpv_mosaic.stop()
+        for viewer in self.fpv_mosaic.viewers:
+            viewer.mjpeg_thread.start()
+
+    def set_fpv_pacing(self, smooth: bool):  # noqa: FBT001
+        self.settings.setValue("fpv/pacing", smooth)
+        self.fpv.set_pacing(smooth)
+        self.fpv.stats.clear()
+
+    def set_fpv_hud(self, enabled: bool):  # noqa: FBT001
+        self.settings.setValue("fpv/hud", enabled)
+        if enabled:
+            self.fpv_hud.start()
+            self.fpv.set_overlay(self.fpv_hud)
+        else:
+            self.fpv_hud.stop()
+            self.fpv.set_overlay(None)
+
+    def fpv_hud_state(self) -> HUDState:
+        estopped = self.state.app_state == AppState.ESTOPPED
+        if not self.robot.connected:
+            return HUDState(estopped=estopped)
+        state = self.robot.get_state()
+        return HUDState(
+            connected=True,
+            enabled=state.enabled,
+            estopped=estopped,
+            voltages=list(state.battery.voltages),
+            powers=(state.motion.powers[0], state.motion.powers[1]),
+        )
+
+    def set_fpv_layout(self, pip: bool):  # noqa: FBT001
+        layout = MosaicLayout.PICTURE_IN_PICTURE if pip else MosaicLayout.MOSAIC
+        self.settings.setValue("fpv/layout", layout.value)
+        self.fpv_mosaic.set_layout_mode(layout)
+
+    def open_fpv_recording(self):
+        name, _ = QFileDialog.getOpenFileName(
+            self,
+            "Open FPV Recording",
+            self.settings.value("fpv/recording_dir", default_recording_dir(), type=str),  # type: ignore
+            filter="FPV Recording (*.mjpeg);;All Files (*)",
+        )
+        if not name:
+            return
+        try:
+            recording = Recording(name)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not open FPV recording, {e!r}")
+            self.modal_bar.pop_toast("FPV", "Could not open recording", qta.icon("mdi6.alert").pixmap(32, 32))
+            return
+        if not len(recording):
+            recording.close()
+            self.modal_bar.pop_toast("FPV", "Recording has no frames", qta.icon("mdi6.alert").pixmap(32, 32))
+            return
+        self.play_fpv(MJPEGPlayer(recording, self.fpv.mjpeg_thread.pool, self.fpv.mjpeg_thread.backend))
+
+    def replay_fpv(self):
+        clip = self.fpv_replay_buffer.snapshot()
+        if not len(clip):
+            self.modal_bar.pop_toast("FPV", "Nothing to replay yet", qta.icon("mdi6.history").pixmap(32, 32))
+            return
+        self.play_fpv(MJPEGPlayer(clip, self.fpv.mjpeg_thread.pool, self.fpv.mjpeg_thread.backend))
+
+    def play_fpv(self, player: MJPEGPlayer):
+        self.fpv_live()
+        self.fpv_player = player
+        self.fpv.set_player(player)
+        self.fpv_playback.set_player(player)
+        self.fpv_playback.setVisible(True)
+        player.play()
+
+    def fpv_live(self):
+        if self.fpv_player is None:
+            return
+        self.fpv.set_player(None)
+        self.fpv_playback.set_player(None)
+        self.fpv_playback.setVisible(False)
+        self.fpv_player.close()
+        if isinstance(self.fpv_player.source, Recording):
+            self.fpv_player.source.close()
+        self.fpv_player = None
+
+    def record_fpv(self, recording: bool):  # noqa: FBT001
+        if not recording:
+            if self.fpv_recorder is not None:
+                self.fpv.mjpeg_thread.remove_sink(self.fpv_recorder.write)
+                self.fpv_recorder.stop()
+                self.fpv_recorder = None
+            self.fpv_record.setToolTip("Record FPV")
+            return
+
+        folder = self.settings.value("fpv/recording_dir", default_recording_dir(), type=str)
+        recorder = FrameRecorder(os.path.join(folder, time.strftime("fpv-%Y%m%d-%H%M%S.mjpeg")))  # type: ignore
+        try:
+            recorder.start()
+        except OSError as e:
+            logger.error(f"Could not start FPV recording, {e!r}")
+            self.modal_bar.pop_toast(
+                "FPV", f"Could not start recording, {e.strerror}", qta.icon("mdi6.alert").pixmap(32, 32)
+            )
+            self.fpv_record.setChecked(False)
+            return
+        self.fpv_recorder = recorder
+        self.fpv.mjpeg_thread.add_sink(recorder.write)
 
     def plot_manager_layout(self, _settings: QSettings, _plots: list[LivePlot]):
         layout = QVBoxLayout()
@@ -741,6 +1034,14 @@ class MainWindow(QMainWindow):
             data.append(plot_data)
         self.settings.setValue("plot/settings", json.dumps({"plots": data}))
 
+    def set_plot_event_sampling(self, enabled: bool):  # noqa: FBT001
+        self.plot_sampler.set_event_driven(enabled)
+        self.settings.setValue("plot/event_sampling", enabled)
+
+    def set_plot_sample_interval(self, interval: int):
+        self.plot_sampler.set_interval(interval)
+        self.settings.setValue("plot/sample_interval", interval)
+
     def add_plot(self, title="Plot"):
         dock = QDockWidget(title)
         self.plot_docks.append(dock)
@@ -757,7 +1058,7 @@ class MainWindow(QMainWindow):
         plot_layout = QVBoxLayout()
         plot_widget.setLayout(plot_layout)
 
-        plot = LivePlot()
+        plot = LivePlot(sampler=self.plot_sampler)
         self.plots.append(plot)
         plot_layout.addWidget(plot)
 
@@ -869,6 +1170,21 @@ class MainWindow(QMainWindow):
         camera_input.textChanged.connect(lambda: self.set_camera_address(camera_input.text()))
         comm_layout.addWidget(camera_input)
 
+        extra_cameras_details = QLabel("Extra MJPEG FPV streams, one per line (restart required)")
+        comm_layout.addWidget(extra_cameras_details)
+
+        extra_cameras_input = QPlainTextEdit()
+        extra_cameras_input.setPlainText(
+            self.settings.value("comm/extra_camera_addresses", "", type=str)  # type: ignore
+        )
+        extra_cameras_input.setMaximumHeight(80)
+        extra_cameras_input.textChanged.connect(
+            lambda: self.settings.setValue(
+                "comm/extra_camera_addresses", "\n".join(extra_cameras_input.toPlainText().split())
+            )
+        )
+        comm_layout.addWidget(extra_cameras_input)
+
         mqtt_host_defails = QLabel("IP Address (preferred) or host of KevinbotLib MQTT Interface")
         comm_layout.addWidget(mqtt_host_defails)
 
@@ -879,6 +1195,148 @@ class MainWindow(QMainWindow):
         mqtt_host_input.textChanged.connect(lambda: self.set_mqtt_host(mqtt_host_input.text()))
         comm_layout.addWidget(mqtt_host_input)
 
+        # FPV
+        fpv_widget = QWidget()
+        toolbox.addItem(fpv_widget, "FPV")
+
+        fpv_layout = QVBoxLayout()
+        fpv_widget.setLayout(fpv_layout)
+
+        fpv_warning = WarningBar("Restart required to apply FPV settings")
+        fpv_layout.addWidget(fpv_warning)
+
+        fpv_decoder_label = QLabel("JPEG Decoder")
+        fpv_layout.addWidget(fpv_decoder_label)
+
+        fpv_decoder = QComboBox()
+        fpv_decoder.addItem("Qt", DecodeBackend.QT.value)
+        fpv_decoder.addItem("Pillow", DecodeBackend.PIL.value)
+        fpv_decoder.setCurrentIndex(
+            fpv_decoder.findData(settings.value("fpv/decode_backend", DecodeBackend.QT.value, type=str))
+        )
+        fpv_decoder.currentIndexChanged.connect(
+            lambda: settings.setValue("fpv/decode_backend", fpv_decoder.currentData())
+        )
+        fpv_layout.addWidget(fpv_decoder)
+
+        fpv_workers_label = QLabel("Decode Threads")
+        fpv_layout.addWidget(fpv_workers_label)
+
+        fpv_workers = QSpinBox()
+        fpv_workers.setRange(1, 8)
+        fpv_workers.setValue(settings.value("fpv/decode_workers", 2, type=int))  # type: ignore
+        fpv_workers.valueChanged.connect(lambda value: settings.setValue("fpv/decode_workers", value))
+        fpv_layout.addWidget(fpv_workers)
+
+        fpv_depth_label = QLabel("Decode Queue Depth")
+        fpv_layout.addWidget(fpv_depth_label)
+
+        fpv_depth = QSpinBox()
+        fpv_depth.setRange(1, 8)
+        fpv_depth.setValue(settings.value("fpv/queue_depth", 2, type=int))  # type: ignore
+        fpv_depth.valueChanged.connect(lambda value: settings.setValue("fpv/queue_depth", value))
+        fpv_layout.addWidget(fpv_depth)
+
+        fpv_disconnect_label = QLabel("Disconnect Hidden Streams After")
+        fpv_layout.addWidget(fpv_disconnect_label)
+
+        fpv_disconnect = QSpinBox()
+        fpv_disconnect.setRange(0, 3600)
+        fpv_disconnect.setSuffix(" s")
+        fpv_disconnect.setSpecialValueText("Never")
+        fpv_disconnect.setToolTip(
+            "Hidden streams are never decoded, this also closes their connection.\n"
+            "Streams that are being recorded stay connected, instant replay has a gap while disconnected."
+        )
+        fpv_disconnect.setValue(settings.value("fpv/disconnect_hidden", 30, type=int))  # type: ignore
+        fpv_disconnect.valueChanged.connect(lambda value: settings.setValue("fpv/disconnect_hidden", value))
+        fpv_layout.addWidget(fpv_disconnect)
+
+        fpv_process = QCheckBox("Decode in a Separate Process")
+        fpv_process.setToolTip(
+            "Keeps decoding from slowing down the interface and controller input, at the cost of memory.\n"
+            "Recording and instant replay are not available in this mode."
+        )
+        fpv_process.setChecked(settings.value("fpv/decode_process", False, type=bool))  # type: ignore
+        fpv_process.toggled.connect(lambda checked: settings.setValue("fpv/decode_process", checked))
+        fpv_layout.addWidget(fpv_process)
+
+        fpv_replay_label = QLabel("Instant Replay Length")
+        fpv_layout.addWidget(fpv_replay_label)
+
+        fpv_replay_seconds = QSpinBox()
+        fpv_replay_seconds.setRange(5, 300)
+        fpv_replay_seconds.setSuffix(" s")
+        fpv_replay_seconds.setValue(settings.value("fpv/replay_seconds", 30, type=int))  # type: ignore
+        fpv_replay_seconds.valueChanged.connect(lambda value: settings.setValue("fpv/replay_seconds", value))
+        fpv_layout.addWidget(fpv_replay_seconds)
+
+        fpv_replay_memory_label = QLabel("Instant Replay Memory Limit")
+        fpv_layout.addWidget(fpv_replay_memory_label)
+
+        fpv_replay_memory = QSpinBox()
+        fpv_replay_memory.setRange(4, 1024)
+        fpv_replay_memory.setSuffix(" MB")
+        fpv_replay_memory.setValue(settings.value("fpv/replay_memory", 32, type=int))  # type: ignore
+        fpv_replay_memory.valueChanged.connect(lambda value: settings.setValue("fpv/replay_memory", value))
+        fpv_layout.addWidget(fpv_replay_memory)
+
+        fpv_recording_label = QLabel("Recording Folder")
+        fpv_layout.addWidget(fpv_recording_label)
+
+        fpv_recording_layout = QHBoxLayout()
+        fpv_layout.addLayout(fpv_recording_layout)
+
+        fpv_recording_dir = QLineEdit()
+        fpv_recording_dir.setText(
+            settings.value("fpv/recording_dir", default_recording_dir(), type=str)  # type: ignore
+        )
+        fpv_recording_dir.textChanged.connect(lambda text: settings.setValue("fpv/recording_dir", text))
+        fpv_recording_layout.addWidget(fpv_recording_dir)
+
+        fpv_recording_browse = QPushButton("Browse")
+        fpv_recording_browse.clicked.connect(
+            lambda: fpv_recording_dir.setText(
+                QFileDialog.getExistingDirectory(self, "FPV Recording Folder", fpv_recording_dir.text())
+                or fpv_recording_dir.text()
+            )
+        )
+        fpv_recording_layout.addWidget(fpv_recording_browse)
+
+        fpv_layout.addStretch()
+
+        # Plots
+        plot_widget = QWidget()
+        toolbox.addItem(plot_widget, "Plots")
+
+        plot_layout = QVBoxLayout()
+        plot_widget.setLayout(plot_layout)
+
+        plot_event_sampling = QCheckBox("Sample on New Robot State")
+        plot_event_sampling.setToolTip(
+            "Take a sample each time the robot sends new state, instead of at a fixed rate.\n"
+            "Fast telemetry isn't missed between samples, but nothing is plotted while disconnected."
+        )
+        plot_event_sampling.setChecked(settings.value("plot/event_sampling", False, type=bool))  # type: ignore
+        plot_event_sampling.toggled.connect(self.set_plot_event_sampling)
+        plot_layout.addWidget(plot_event_sampling)
+
+        plot_interval_label = QLabel("Sample Interval")
+        plot_layout.addWidget(plot_interval_label)
+
+        plot_interval = QSpinBox()
+        plot_interval.setRange(10, 1000)
+        plot_interval.setSingleStep(10)
+        plot_interval.setSuffix(" ms")
+        plot_interval.setToolTip("Time between samples of every plotted source, when not sampling on new robot state")
+        plot_interval.setValue(settings.value("plot/sample_interval", 100, type=int))  # type: ignore
+        plot_interval.setEnabled(not plot_event_sampling.isChecked())
+        plot_interval.valueChanged.connect(self.set_plot_sample_interval)
+        plot_event_sampling.toggled.connect(lambda checked: plot_interval.setEnabled(not checked))
+        plot_layout.addWidget(plot_interval)
+
+        plot_layout.addStretch()
+
         # Logging
         logging_widget = QWidget()
         toolbox.addItem(logging_widget, "Logging")
@@ -984,6 +1442,24 @@ class MainWindow(QMainWindow):
         self.logger_timer.timeout.connect(lambda: self.update_logs(logger_area))
         self.logger_timer.start()
 
+        fpv_stats_widget = QWidget()
+        splitter.addWidget(fpv_stats_widget)
+
+        fpv_stats_layout = QVBoxLayout()
+        fpv_stats_widget.setLayout(fpv_stats_layout)
+
+        fpv_stats_layout.addWidget(QLabel("FPV Frame Timings (ms)"))
+
+        self.fpv_stats_table = QTableWidget(0, 6)
+        self.fpv_stats_table.setHorizontalHeaderLabels(["Stage", "Mean", "p50", "p95", "p99", "Max"])
+        self.fpv_stats_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.fpv_stats_table.verticalHeader().setVisible(False)
+        self.fpv_stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        fpv_stats_layout.addWidget(self.fpv_stats_table)
+
+        self.fpv_frame_counts = QLabel()
+        fpv_stats_layout.addWidget(self.fpv_frame_counts)
+
         return layout
 
     def connection_layout(self):
@@ -1325,6 +1801,8 @@ class MainWindow(QMainWindow):
         if self.state.app_state != AppState.CONNECTED:
             return
 
+        self.plot_sampler.record()
+
         if self.robot.get_state().enabled:
             self.state_label.setText("Robot Enabled")
         else:
@@ -1461,8 +1939,9 @@ class MainWindow(QMainWindow):
 
         self.battery_timer.stop()
 
-        self.fpv.mjpeg_thread.terminate()
-        self.fpv.mjpeg_thread.wait()
+        self.fpv_mosaic.stop()
+        self.fpv_record.setChecked(False)
+        self.fpv_live()
 
         self.robot.disconnect()
 
@@ -0,0 +1,185 @@
+"""
+Local stand-in for the robot's camera, serving a synthetic MJPEG stream
+
+Every part has an X-Timestamp header with the time the frame was captured, so FPV latency can be
+measured without the robot. Frames can be sent in small chunks with a delay in between, to mimic a
+slow or bursty network.
+
+Usage: python -m kevinbot_desktopclient.mjpeg_server [--port 5000] [--fps 30] [--width 640] [--height 480]
+    [--quality 80] [--chunk-size 0] [--chunk-delay 0]
+"""
+
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from loguru import logger
+from PIL import Image, ImageDraw
+
+BOUNDARY = "frame"
+
+
+def render_frame(index: int, size: tuple[int, int], quality: int = 80) -> bytes:
+    """Draw a numbered test frame.
+
+    Args:
+        index: Frame number, shown in the frame and used to move a bar across it
+        size: Width and height of the frame
+        quality: JPEG quality
+
+    Returns:
+        Compressed JPEG frame
+    """
+    width, height = size
+    image = Image.new("RGB", size, ((index * 3) % 256, 64, 160))
+    draw = ImageDraw.Draw(image)
+    # Some detail, so frames compress about as well as camera images
+    rng = random.Random(index)
+    for _ in range(64):
+        x, y = rng.randrange(width), rng.randrange(height)
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        draw.rectangle((x, y, x + rng.randrange(4, width // 8 + 5), y + rng.randrange(4, height // 8 + 5)), fill=color)
+    x = (index * 8) % width
+    draw.rectangle((x, 0, x + width // 16, height), fill="white")
+    draw.text((8, 8), f"Frame {index}", fill="white")
+
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class MJPEGTestHandler(BaseHTTPRequestHandler):
+    server: "MJPEGTestServer"
+
+    def do_GET(self):  # noqa: N802
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        interval = 1 / self.server.fps
+        next_frame = time.monotonic()
+        index = 0
+        while not self.server.stopping.is_set():
+            captured = time.time()
+            frame = self.server.frame(index)
+            part = (
+                f"--{BOUNDARY}\r\n"
+                f"Content-Type: image/jpeg\r\n"
+                f"Content-Length: {len(frame)}\r\n"
+                f"X-Timestamp: {captured:.6f}\r\n\r\n".encode() + frame + b"\r\n"
+            )
+            try:
+                self._send(part)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            index += 1
+            self.server.frames_sent += 1
+
+            next_frame += interval
+            # Don't try to catch up after a stall, that would send a burst of frames
+            next_frame = max(next_frame, time.monotonic())
+            self.server.stopping.wait(next_frame - time.monotonic())
+
+    def _send(self, part: bytes):
+        chunk_size = self.server.chunk_size or len(part)
+        for start in range(0, len(part), chunk_size):
+            if start and self.server.chunk_delay:
+                time.sleep(self.server.chunk_delay)
+            self.wfile.write(part[start : start + chunk_size])
+            self.wfile.flush()
+
+    def log_message(self, *_args):
+        pass
+
+
+class MJPEGTestServer(ThreadingHTTPServer):
+    """
+    MJPEG server with synthetic, timestamped frames.
+
+    Any path serves the stream. Use port 0 to pick a free port, `url` has the address to connect to.
+
+    A cycle of `variety` frames is rendered up front, so the server keeps up with high resolutions and
+    frame rates. If `chunk_size` is set, every part is written in chunks of that many bytes, with
+    `chunk_delay` seconds between them.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int] = ("127.0.0.1", 0),
+        fps: float = 30,
+        size: tuple[int, int] = (640, 480),
+        quality: int = 80,
+        chunk_size: int = 0,
+        chunk_delay: float = 0.0,
+        variety: int = 30,
+    ):
+        super().__init__(address, MJPEGTestHandler)
+        self.fps = fps
+        self.size = size
+        self.quality = quality
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.frames_sent = 0
+        self.stopping = threading.Event()
+        self._frames = [render_frame(index, size, quality) for index in range(max(1, variety))]
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/video_feed"
+
+    def frame(self, index: int) -> bytes:
+        """Compressed frame to send as the `index`th frame of a stream."""
+        return self._frames[index % len(self._frames)]
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="MJPEG Test Server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """End every stream and stop serving."""
+        self.stopping.set()
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--chunk-size", type=int, default=0, help="Bytes per write, 0 to write whole parts")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between chunks")
+    args = parser.parse_args()
+
+    server = MJPEGTestServer(
+        (args.host, args.port),
+        args.fps,
+        (args.width, args.height),
+        args.quality,
+        args.chunk_size,
+        args.chunk_delay,
+    )
+    logger.info(f"Serving test MJPEG stream at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stopping.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Telemetry heads-up display drawn over the FPV view
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+import qtawesome as qta
+from PySide6.QtCore import QObject, QPoint, QRect, QSize, Qt, QTimer, Signal
+from PySide6.QtGui import QColor, QFont, QPainter, QPixmap
+
+
+@dataclass
+class HUDState:
+    """Robot state shown on the HUD."""
+
+    connected: bool = False
+    enabled: bool = False
+    estopped: bool = False
+    voltages: list[float] = field(default_factory=list)
+    # Left and right drive power, -1 to 1
+    powers: tuple[float, float] = (0.0, 0.0)
+
+
+class TelemetryHUD(QObject):
+    """
+    Panel with robot telemetry, painted by an MJPEGViewer on top of its frames.
+
+    The panel is drawn from two cached layers. The static layer holds the background, icons and labels,
+    and is only rebuilt when the number of rows or the device pixel ratio changes. The value layer holds
+    the numbers, it is redrawn at most `max_rate` times a second and only when the text changes. Painting
+    the HUD on every video frame is just two pixmap blits.
+    """
+
+    changed = Signal()
+
+    WIDTH = 168
+    ROW_HEIGHT = 20
+    PADDING = 6
+    MARGIN = 8
+    ICON_SIZE = 16
+    LABEL_WIDTH = 64
+
+    BACKGROUND = QColor(0, 0, 0, 150)
+    TEXT = QColor("#ffffff")
+    STATE_COLORS = {
+        "E-STOP": QColor("#f44336"),
+        "ENABLED": QColor("#4caf50"),
+        "DISABLED": QColor("#ff9800"),
+        "NO COMMS": QColor("#9e9e9e"),
+    }
+
+    def __init__(self, source: Callable[[], HUDState], max_rate: float = 5.0):
+        """Create a HUD. It only polls `source` while started.
+
+        Args:
+            source: Returns the current robot state, called on the GUI thread
+            max_rate: Maximum number of value redraws per second
+        """
+        super().__init__()
+        self.source = source
+        self.redraws = 0
+
+        self._rows = 0
+        self._dpr = 1.0
+        self._static: QPixmap | None = None
+        self._values: QPixmap | None = None
+        self._texts: list[str] | None = None
+
+        self._font = QFont("Roboto Medium", 9)
+        self._timer = QTimer(self)
+        self._timer.setInterval(round(1000 / max_rate))
+        self._timer.timeout.connect(self.refresh)
+
+    def start(self):
+        self.refresh()
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def size(self) -> QSize:
+        return QSize(self.WIDTH, self.PADDING * 2 + self.ROW_HEIGHT * max(self._rows, 1))
+
+    def rect(self, target: QRect) -> QRect:
+        """Area the HUD covers.
+
+        Args:
+            target: Area the frame is drawn into
+
+        Returns:
+            Rect in the viewer's coordinates
+        """
+        return QRect(target.topLeft() + QPoint(self.MARGIN, self.MARGIN), self.size())
+
+    def refresh(self):
+        """Poll the source, and redraw the values if their text changed."""
+        state = self.source()
+        texts = self._format(state)
+        if texts == self._texts:
+            return
+        if self._texts is None or len(texts) != len(self._texts):
+            self._rows = len(texts)
+            self._static = None
+        self._texts = texts
+        self._values = None
+        self.changed.emit()
+
+    def paint(self, painter: QPainter, target: QRect):
+        """Draw the HUD.
+
+        Args:
+            painter: Painter of the viewer
+            target: Area the frame is drawn into
+        """
+        if self._texts is None:
+            return
+        dpr = painter.device().devicePixelRatio()
+        if dpr != self._dpr:
+            self._dpr = dpr
+            self._static = None
+            self._values = None
+        if self._static is None:
+            self._static = self._render_static()
+        if self._values is None:
+            self._values = self._render_values()
+            self.redraws += 1
+        origin = self.rect(target).topLeft()
+        painter.drawPixmap(origin, self._static)
+        painter.drawPixmap(origin, self._values)
+
+    def _labels(self) -> list[tuple[str, str]]:
+        batteries = self._rows - 3
+        return [
+            ("mdi6.power", "State"),
+            *(("mdi6.battery", f"Batt {index + 1}") for index in range(batteries)),
+            ("mdi6.engine", "Left"),
+            ("mdi6.engine", "Right"),
+        ]
+
+    def _format(self, state: HUDState) -> list[str]:
+        if state.estopped:
+            status = "E-STOP"
+        elif not state.connected:
+            status = "NO COMMS"
+        elif state.enabled:
+            status = "ENABLED"
+        else:
+            status = "DISABLED"
+        return [
+            status,
+            *(f"{voltage:.1f} V" for voltage in state.voltages),
+            *(f"{power * 100:+.0f} %" for power in state.powers),
+        ]
+
+    def _layer(self) -> tuple[QPixmap, QPainter]:
+        pixmap = QPixmap(self.size() * self._dpr)
+        pixmap.setDevicePixelRatio(self._dpr)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(self._font)
+        return pixmap, painter
+
+    def _row_rect(self, row: int) -> QRect:
+        return QRect(self.PADDING, self.PADDING + row * self.ROW_HEIGHT, self.WIDTH - self.PADDING * 2, self.ROW_HEIGHT)
+
+    def _render_static(self) -> QPixmap:
+        pixmap, painter = self._layer()
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(self.BACKGROUND)
+        painter.drawRoundedRect(QRect(QPoint(0, 0), self.size()), 6, 6)
+
+        painter.setPen(self.TEXT)
+        for row, (icon, label) in enumerate(self._labels()):
+            rect = self._row_rect(row)
+            top = rect.top() + (self.ROW_HEIGHT - self.ICON_SIZE) // 2
+            painter.drawPixmap(
+                QRect(rect.left(), top, self.ICON_SIZE, self.ICON_SIZE),
+                qta.icon(icon, color=self.TEXT).pixmap(QSize(self.ICON_SIZE, self.ICON_SIZE), self._dpr),
+            )
+            painter.drawText(rect.adjusted(self.ICON_SIZE + 4, 0, 0, 0), Qt.AlignmentFlag.AlignVCenter, label)
+        painter.end()
+        return pixmap
+
+    def _render_values(self) -> QPixmap:
+        pixmap, painter = self._layer()
+        for row, text in enumerate(self._texts or []):
+            painter.setPen(self.STATE_COLORS.get(text, self.TEXT) if row == 0 else self.TEXT)
+            painter.drawText(
+                self._row_rect(row).adjusted(self.LABEL_WIDTH, 0, 0, 0),
+                Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignRight,
+                text,
+            )
+        painter.end()
+        return pixmap
@@ -2,17 +2,32 @@
 PySide6 MJPEG Stream Viewer and Widget
 """
 
+import contextlib
+import math
+import socket
 import textwrap
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from enum import Enum
 from io import BytesIO
-from typing import override
+from typing import TYPE_CHECKING, Protocol, override
 
 import requests
 import urllib3
 from loguru import logger
 from PIL import Image, ImageDraw, ImageFont
-from PySide6.QtCore import Qt, QThread, Signal
-from PySide6.QtGui import QImage, QPixmap
-from PySide6.QtWidgets import QLabel, QSizePolicy, QVBoxLayout, QWidget
+from PySide6.QtCore import QBuffer, QPoint, QRect, QSize, Qt, QThread, QTimer, Signal
+from PySide6.QtGui import QImage, QImageReader, QPainter, QPixmap
+from PySide6.QtWidgets import QSizePolicy, QWidget
+
+if TYPE_CHECKING:
+    from multiprocessing.synchronize import Event as ProcessEvent
+
+    from kevinbot_desktopclient.ui.fpv_hud import TelemetryHUD
+    from kevinbot_desktopclient.ui.mjpeg_recording import MJPEGPlayer
 
 
 def create_image_with_text(text1, text2, image_size=(400, 400), wrap_width=60):
@@ -40,109 +55,1509 @@ def create_image_with_text(text1, text2, image_size=(400, 400), wrap_width=60):
     return image
 
 
-class MJPEGStreamThread(QThread):
-    frame_received = Signal(QImage)
+def pil_to_qimage(image: Image.Image) -> QImage:
+    """Convert a PIL image to a QImage that owns its pixels.
+
+    Args:
+        image: Image to convert
+
+    Returns:
+        RGB888 QImage
+    """
+    image = image.convert("RGB")
+    # A QImage made from a Python buffer doesn't own the memory, copy it so the frame outlives `image`
+    return QImage(image.tobytes(), image.width, image.height, image.width * 3, QImage.Format.Format_RGB888).copy()
+
+
+class DecodeBackend(Enum):
+    QT = "qt"
+    PIL = "pil"
+
+
+def jpeg_scale_factor(size: QSize, target: QSize | None) -> int:
+    """Pick the largest JPEG DCT scale-down factor that still covers the size the frame is drawn at.
+
+    Frames are drawn aspect-fitted, so only the fitted rect inside the target has to be covered.
+
+    Args:
+        size: Full size of the encoded frame
+        target: Size of the area the frame will be displayed in, in device pixels
+
+    Returns:
+        1, 2, 4 or 8
+    """
+    if target is None or target.isEmpty() or size.isEmpty():
+        return 1
+    fitted = size.scaled(target, Qt.AspectRatioMode.KeepAspectRatio)
+    for factor in (8, 4, 2):
+        if math.ceil(size.width() / factor) >= fitted.width() and math.ceil(size.height() / factor) >= fitted.height():
+            return factor
+    return 1
+
+
+class FramePool(Protocol):
+    """Buffers a stream decodes frames into. Each frame goes back with `release` once the viewer is done with it."""
+
+    @property
+    def count(self) -> int: ...
+
+    # Number of times a frame was decoded while every buffer was in use
+    @property
+    def exhausted(self) -> int: ...
+
+    def release(self, frame: QImage) -> None: ...
+
+    def available(self) -> int: ...
+
+    # Make room for frames that the viewer holds on to, negative to give the room back
+    def reserve(self, extra: int) -> None: ...
+
+
+class FrameBufferPool:
+    """
+    Fixed set of preallocated frame buffers that decoded frames are written into.
+
+    Buffers are sized to the resolution frames are decoded at, and are reallocated only when it
+    changes. A buffer goes back to the pool once the viewer has displayed (or dropped) its frame.
+    If every buffer is still in use, a temporary one is allocated and counted in `exhausted`.
+    """
+
+    FORMAT = QImage.Format.Format_RGBX8888
+
+    def __init__(self, count: int = 4):
+        self.count = max(1, count)
+        self.exhausted = 0
+        self._lock = threading.Lock()
+        self._size = QSize()
+        self._allocated = 0
+        self._free: list[QImage] = []
+
+    def acquire(self, size: QSize) -> QImage:
+        """Get a buffer for a frame.
+
+        Args:
+            size: Size of the decoded frame
+
+        Returns:
+            A buffer of the given size, its contents are undefined
+        """
+        with self._lock:
+            if size != self._size:
+                self._size = QSize(size)
+                self._allocated = 0
+                self._free.clear()
+            if self._free:
+                return self._free.pop()
+            if self._allocated < self.count:
+                self._allocated += 1
+                return QImage(size, self.FORMAT)
+            self.exhausted += 1
+            exhausted = self.exhausted
+
+        if exhausted == 1:
+            logger.warning(f"All {self.count} FPV frame buffers are in use, allocating temporary buffers")
+        return QImage(size, self.FORMAT)
+
+    def release(self, frame: QImage):
+        """Return a buffer to the pool. Frames of another size or format are ignored.
+
+        Args:
+            frame: Buffer returned by `acquire`
+        """
+        with self._lock:
+            if (
+                frame.size() == self._size
+                and frame.format() == self.FORMAT
+                and len(self._free) < self._allocated
+                and not any(frame is free for free in self._free)
+            ):
+                self._free.append(frame)
+
+    def available(self) -> int:
+        """Number of buffers that can be handed out without allocating."""
+        with self._lock:
+            return len(self._free) + self.count - self._allocated
+
+    def reserve(self, extra: int):
+        """Change the number of buffers for frames that are held on to outside the stream.
+
+        Args:
+            extra: Number of buffers to add, negative to remove them
+        """
+        with self._lock:
+            self.count = max(1, self.count + extra)
+
+
+def _decode_pil_into(image: Image.Image, pool: FrameBufferPool) -> QImage:
+    frame = pool.acquire(QSize(*image.size))
+    # Map the buffer's pixels as a PIL image, PIL marks mapped images read-only to copy on write, but
+    # here writing through to the buffer is the point
+    view = Image.frombuffer("RGBX", image.size, frame.bits(), "raw", "RGBX", frame.bytesPerLine(), 1)
+    view.readonly = 0
+    try:
+        view.paste(image)
+    except BaseException:
+        pool.release(frame)
+        raise
+    return frame
+
+
+def decode_jpeg(
+    data: bytes,
+    backend: DecodeBackend = DecodeBackend.QT,
+    target_size: QSize | None = None,
+    pool: FrameBufferPool | None = None,
+) -> QImage | None:
+    """Decode a JPEG frame. Safe to call from any thread.
+
+    Args:
+        data: Compressed JPEG frame
+        backend: Decoder to use. Qt decodes straight into a QImage, PIL is kept as a fallback
+        target_size: Display size of the frame. If the frame is at least twice as large, it is decoded
+            at 1/2, 1/4 or 1/8 scale, skipping most of the IDCT and color conversion work
+        pool: Buffers to decode into instead of allocating a new image. Only the PIL backend can
+            decode in place, Qt's reader always allocates its own image
+
+    Returns:
+        Decoded frame, or None if the frame is corrupt
+    """
+    if backend == DecodeBackend.QT:
+        buffer = QBuffer()
+        buffer.setData(data)
+        reader = QImageReader(buffer, b"jpeg")
+        factor = jpeg_scale_factor(reader.size(), target_size)
+        if factor > 1:
+            size = reader.size()
+            reader.setScaledSize(QSize(math.ceil(size.width() / factor), math.ceil(size.height() / factor)))
+        qimg = reader.read()
+        return None if qimg.isNull() else qimg
+
+    try:
+        image = Image.open(BytesIO(data))
+        factor = jpeg_scale_factor(QSize(*image.size), target_size)
+        if factor > 1:
+            image.draft("RGB", (math.ceil(image.width / factor), math.ceil(image.height / factor)))
+        if pool is not None:
+            return _decode_pil_into(image, pool)
+        return pil_to_qimage(image)
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+
+def multipart_boundary(content_type: str) -> bytes | None:
+    """Get the boundary of a multipart Content-Type header.
+
+    Args:
+        content_type: Value of the Content-Type header
+
+    Returns:
+        The boundary, or None if the content is not multipart
+    """
+    media_type, _, params = content_type.partition(";")
+    if not media_type.strip().lower().startswith("multipart/"):
+        return None
+    for param in params.split(";"):
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "boundary" and value:
+            return value.strip('"').removeprefix("--").encode()
+    return None
+
+
+class MJPEGFrameParser:
+    """
+    Incremental extractor for JPEG frames in an MJPEG byte stream.
+
+    Incoming chunks are appended to a growable buffer and every search resumes where the
+    previous call left off, so no byte is scanned twice no matter how the stream is chunked.
+
+    If the stream is multipart and a part has a Content-Length header, exactly that many bytes
+    are taken as the frame without scanning them. SOI/EOI marker scanning is only used for parts
+    without a length, or for streams that are not multipart at all.
+
+    The part headers of every frame returned by `feed` are left in `frame_headers`, in the same order.
+    """
+
+    SOI = b"\xff\xd8"
+    EOI = b"\xff\xd9"
+    HEADER_END = b"\r\n\r\n"
+    MAX_CONTENT_LENGTH = 64 * 1024 * 1024
+
+    def __init__(self, boundary: bytes | None = None):
+        self.boundary = boundary
+        self.frame_headers: list[dict[str, str]] = []
+        self._buffer = bytearray()
+        self.reset()
+
+    def reset(self):
+        """Discard any partially received frame."""
+        self._buffer.clear()
+        self._pos = 0
+        self._search_pos = 0
+        self._frame_start = -1
+        self._in_headers = self.boundary is not None
+        self._body_length: int | None = None
+        self._part_headers: dict[str, str] = {}
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """Add a chunk of stream data.
+
+        Args:
+            chunk: Raw bytes read from the stream
+
+        Returns:
+            Every frame completed by this chunk, oldest first
+        """
+        buffer = self._buffer
+        buffer += chunk
+
+        self.frame_headers = []
+        frames: list[bytes] = []
+        while True:
+            if self._body_length is not None:
+                end = self._pos + self._body_length
+                if len(buffer) < end:
+                    break
+                self._emit(frames, self._pos, end)
+                self._body_length = None
+                self._in_headers = True
+                self._pos = self._search_pos = end
+            elif self._in_headers:
+                end = buffer.find(self.HEADER_END, self._search_pos)
+                if end == -1:
+                    self._search_pos = max(len(buffer) - 3, self._pos)
+                    break
+                self._in_headers = False
+                headers = self._parse_headers(buffer[self._pos : end])
+                if headers is None:
+                    # Not a part header, look for the frame markers instead
+                    self._search_pos = self._pos
+                    continue
+                self._pos = self._search_pos = end + 4
+                self._part_headers = headers
+                self._body_length = self._content_length(headers)
+            elif not self._scan_markers(frames):
+                break
+
+        # Drop bytes that can never be part of a frame, deleting from the front of a bytearray is cheap
+        discard = self._pos if self._frame_start == -1 else self._frame_start
+        if discard:
+            del buffer[:discard]
+            self._pos -= discard
+            self._search_pos -= discard
+            if self._frame_start != -1:
+                self._frame_start -= discard
+
+        return frames
+
+    def _scan_markers(self, frames: list[bytes]) -> bool:
+        buffer = self._buffer
+        if self._frame_start == -1:
+            start = buffer.find(self.SOI, self._search_pos)
+            if start == -1:
+                # The last byte may be the first half of a marker
+                self._pos = self._search_pos = max(len(buffer) - 1, self._search_pos)
+                return False
+            self._frame_start = start
+            self._search_pos = start + 2
+
+        end = buffer.find(self.EOI, self._search_pos)
+        if end == -1:
+            self._search_pos = max(len(buffer) - 1, self._search_pos)
+            return False
+
+        self._emit(frames, self._frame_start, end + 2)
+        self._frame_start = -1
+        self._pos = self._search_pos = end + 2
+        self._in_headers = self.boundary is not None
+        return True
+
+    def _emit(self, frames: list[bytes], start: int, end: int):
+        # Slicing the bytearray would copy the frame twice, going through a view copies it once
+        with memoryview(self._buffer) as view:
+            frames.append(bytes(view[start:end]))
+        self.frame_headers.append(self._part_headers)
+        self._part_headers = {}
+
+    def _parse_headers(self, block: bytearray) -> dict[str, str] | None:
+        lines = bytes(block).split(b"\r\n")
+        if not any(line.startswith(b"--" + self.boundary) for line in lines):  # type: ignore
+            return None
+
+        headers = {}
+        for line in lines:
+            name, sep, value = line.partition(b":")
+            if sep:
+                headers[name.strip().decode("latin-1").lower()] = value.strip().decode("latin-1")
+        return headers
+
+    def _content_length(self, headers: dict[str, str]) -> int | None:
+        try:
+            length = int(headers["content-length"])
+        except (KeyError, ValueError):
+            return None
+        if not 0 < length <= self.MAX_CONTENT_LENGTH:
+            return None
+        return length
+
+
+@dataclass
+class FrameTimestamps:
+    """Monotonic times at which a frame passed each stage of the FPV pipeline, 0 if it hasn't yet."""
+
+    received: float = 0.0
+    extracted: float = 0.0
+    decoded: float = 0.0
+    delivered: float = 0.0
+    painted: float = 0.0
+    # Capture time reported by the camera, converted to the monotonic clock, 0 if the stream has none
+    captured: float = 0.0
+    # Time the frame left the viewer's jitter buffer, the same as `delivered` when pacing is off
+    presented: float = 0.0
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile of already sorted values.
+
+    Args:
+        values: Sorted values, must not be empty
+        percent: Percentile between 0 and 100
+
+    Returns:
+        The smallest value that at least `percent` % of the values are less than or equal to
+    """
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
+
+
+class FrameStats:
+    """
+    Rolling per-stage timings of displayed frames, and a windowed frame rate.
+
+    Stage durations are kept for the last `window` frames. The frame rate is the number of frames
+    painted over the last `fps_window` seconds, so it doesn't jump around with every frame.
+    """
+
+    # Stage name, start and end field of FrameTimestamps
+    STAGES = (
+        ("Extract", "received", "extracted"),
+        ("Decode", "extracted", "decoded"),
+        ("Deliver", "decoded", "delivered"),
+        ("Pacing", "delivered", "presented"),
+        ("Paint", "presented", "painted"),
+        ("Total", "received", "painted"),
+        ("Latency", "captured", "painted"),
+    )
+
+    def __init__(self, window: int = 300, fps_window: float = 2.0):
+        self.window = window
+        self.fps_window = fps_window
+        self._durations: dict[str, deque[float]] = {name: deque(maxlen=window) for name, _, _ in self.STAGES}
+        self._painted: deque[float] = deque()
+
+    def clear(self):
+        for durations in self._durations.values():
+            durations.clear()
+        self._painted.clear()
+
+    def record(self, stamps: FrameTimestamps):
+        """Add the timings of a painted frame.
+
+        Args:
+            stamps: Timestamps of the frame, every stage up to `painted` must be set
+        """
+        if not stamps.presented:
+            stamps.presented = stamps.delivered
+        for name, start, end in self.STAGES:
+            if getattr(stamps, start):
+                self._durations[name].append(getattr(stamps, end) - getattr(stamps, start))
+        self._painted.append(stamps.painted)
+        self._expire(stamps.painted)
+
+    def fps(self, now: float | None = None) -> float:
+        """Frames painted per second over the last `fps_window` seconds.
+
+        Args:
+            now: Current monotonic time, defaults to `time.monotonic()`
+        """
+        if now is None:
+            now = time.monotonic()
+        self._expire(now)
+        if len(self._painted) < 2:  # noqa: PLR2004
+            return 0.0
+        # A stalled stream should read as 0 once it leaves the window, not as its old rate
+        return (len(self._painted) - 1) / max(now - self._painted[0], self._painted[-1] - self._painted[0])
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Statistics for each stage, in milliseconds.
+
+        Returns:
+            Stage name to "mean", "p50", "p95", "p99" and "max", stages without samples are left out
+        """
+        result = {}
+        for name, durations in self._durations.items():
+            if not durations:
+                continue
+            values = sorted(durations)
+            result[name] = {
+                "mean": sum(values) / len(values) * 1000,
+                "p50": percentile(values, 50) * 1000,
+                "p95": percentile(values, 95) * 1000,
+                "p99": percentile(values, 99) * 1000,
+                "max": values[-1] * 1000,
+            }
+        return result
+
+    def _expire(self, now: float):
+        while self._painted and now - self._painted[0] > self.fps_window:
+            self._painted.popleft()
+
+
+class FramePacer:
+    """
+    Small jitter buffer that presents frames at a steady cadence.
+
+    The frame interval is estimated from arrival times, and the jitter from how much the intervals vary.
+    Frames are held until the buffer reaches a target depth of 1 to 3 frames, set from the jitter, then
+    presented one per interval. The cadence runs slightly fast while the buffer is above its target and
+    slightly slow while it's below, so it settles back without visible jumps.
+    """
+
+    MIN_DEPTH = 1
+    MAX_DEPTH = 3
+    # How much the cadence is sped up or slowed down to get back to the target depth
+    CORRECTION = 0.1
+    # Gaps longer than this are outages, not jitter
+    MAX_INTERVAL = 1.0
+
+    def __init__(self):
+        self.interval: float | None = None
+        self.jitter = 0.0
+        self.underruns = 0
+        self.dropped = 0
+        self._last_arrival: float | None = None
+        self._frames: deque[tuple[QImage, FrameTimestamps | None]] = deque()
+        self._primed = False
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def target_depth(self) -> int:
+        """Number of frames buffered before presenting starts."""
+        if not self.interval:
+            return self.MIN_DEPTH
+        return min(max(math.ceil(2 * self.jitter / self.interval), self.MIN_DEPTH), self.MAX_DEPTH)
+
+    def push(self, frame: QImage, stamps: FrameTimestamps | None, now: float) -> QImage | None:
+        """Add a decoded frame.
+
+        Args:
+            frame: Decoded frame
+            stamps: Pipeline timestamps of the frame, the receive time is used as its arrival time
+            now: Current monotonic time, used if the frame has no timestamps
+
+        Returns:
+            The oldest frame, if it had to be dropped to make room
+        """
+        arrival = stamps.received if stamps is not None and stamps.received else now
+        if self._last_arrival is not None and 0 <= arrival - self._last_arrival <= self.MAX_INTERVAL:
+            delta = arrival - self._last_arrival
+            if self.interval is None:
+                self.interval = delta
+            else:
+                # Smoothing of the jitter estimate from RFC 3550
+                self.jitter += (abs(delta - self.interval) - self.jitter) / 16
+                self.interval += (delta - self.interval) / 8
+        self._last_arrival = arrival
+
+        self._frames.append((frame, stamps))
+        if len(self._frames) > self.MAX_DEPTH:
+            self.dropped += 1
+            return self._frames.popleft()[0]
+        return None
+
+    def pop(self) -> tuple[QImage, FrameTimestamps | None] | None:
+        """Take the next frame to present, if it is due."""
+        if not self._primed:
+            if len(self._frames) < self.target_depth:
+                return None
+            self._primed = True
+        if not self._frames:
+            self.underruns += 1
+            self._primed = False
+            return None
+        return self._frames.popleft()
+
+    def next_interval(self) -> float:
+        """Time until the next frame should be presented, in seconds."""
+        interval = self.interval or 1 / 30
+        if len(self._frames) > self.target_depth:
+            return interval * (1 - self.CORRECTION)
+        if len(self._frames) < self.target_depth:
+            return interval * (1 + self.CORRECTION)
+        return interval
+
+    def clear(self) -> list[QImage]:
+        """Empty the buffer.
+
+        Returns:
+            The frames that were buffered
+        """
+        frames = [frame for frame, _ in self._frames]
+        self._frames.clear()
+        self._primed = False
+        self._last_arrival = None
+        return frames
+
+
+class FrameMailbox:
+    """
+    Single slot "latest frame wins" handoff between the stream thread and the viewer.
+
+    A frame that is replaced before the viewer takes it is counted as dropped, so a busy GUI thread
+    shows the newest frame instead of working through a backlog of stale ones.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame: QImage | None = None
+        self._stamps: FrameTimestamps | None = None
+        self.dropped = 0
+        self.on_take: Callable[[], None] | None = None
+        self.on_drop: Callable[[QImage], None] | None = None
+
+    def put(self, frame: QImage, stamps: FrameTimestamps | None = None) -> bool:
+        """Place a frame in the slot, replacing any frame that wasn't taken yet.
+
+        Args:
+            frame: Decoded frame
+            stamps: Pipeline timestamps of the frame
+
+        Returns:
+            True if the slot was empty, and the viewer needs to be notified
+        """
+        with self._lock:
+            replaced, self._frame = self._frame, frame
+            self._stamps = stamps
+            if replaced is not None:
+                self.dropped += 1
+        if replaced is not None and self.on_drop:
+            self.on_drop(replaced)
+        return replaced is None
+
+    def take(self) -> QImage | None:
+        """Take the latest frame out of the slot, if there is one."""
+        return self.take_stamped()[0]
+
+    def take_stamped(self) -> tuple[QImage | None, FrameTimestamps | None]:
+        """Take the latest frame and its timestamps out of the slot, if there is one."""
+        with self._lock:
+            frame, self._frame = self._frame, None
+            stamps, self._stamps = self._stamps, None
+        if frame is not None and self.on_take:
+            self.on_take()
+        return frame, stamps
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._frame is None
+
+    def count_dropped(self, count: int = 1):
+        """Record frames that were dropped before reaching the slot."""
+        with self._lock:
+            self.dropped += count
+
+
+class DecodePool:
+    """
+    Small pool of JPEG decode worker threads, shared by one or more DecodePipelines.
+
+    Workers take frames from the pipelines in round-robin order, so every stream gets a fair share
+    of the pool. JPEG decoding releases the GIL, so more than one core can be used.
+
+    The pool and its pipelines share one lock, `condition`. Pipelines hold it while they change their
+    queues, and the workers hold it while they call `DecodePipeline.next_job` and `DecodePipeline.finish`.
+    The worker threads are only started once the first frame is queued.
+    """
+
+    def __init__(self, workers: int = 2):
+        self.workers = max(1, workers)
+        self.busy = 0
+        self._cond = threading.Condition()
+        self._pipelines: list[DecodePipeline] = []
+        self._next = 0
+        self._threads: list[threading.Thread] = []
+
+    def register(self, pipeline: "DecodePipeline"):
+        with self._cond:
+            self._pipelines.append(pipeline)
+
+    def unregister(self, pipeline: "DecodePipeline"):
+        with self._cond:
+            if pipeline in self._pipelines:
+                self._pipelines.remove(pipeline)
+
+    @property
+    def condition(self) -> threading.Condition:
+        """Lock shared with the pipelines."""
+        return self._cond
+
+    def notify(self):
+        """Wake a worker for a newly queued frame. Called with `condition` held."""
+        if not self._threads:
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"FPV Decode {index}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        self._cond.notify()
+
+    def wake(self):
+        """Notify the workers that a pipeline may have become ready."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def _next_job(self) -> "tuple[DecodePipeline, int, bytes, FrameTimestamps | None] | None":
+        for offset in range(len(self._pipelines)):
+            pipeline = self._pipelines[(self._next + offset) % len(self._pipelines)]
+            job = pipeline.next_job()
+            if job is not None:
+                self._next = (self._next + offset + 1) % len(self._pipelines)
+                return pipeline, *job
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while (job := self._next_job()) is None:
+                    self._cond.wait()
+                self.busy += 1
+            pipeline, seq, data, stamps = job
+            try:
+                image = pipeline.decode(data)
+            except Exception as e:  # noqa: BLE001
+                # A worker that dies takes every stream on the pool down with it, drop the frame as corrupt
+                logger.error(f"Could not decode MJPEG frame, {e!r}")
+                image = None
+            if stamps is not None:
+                stamps.decoded = time.monotonic()
+            with self._cond:
+                self.busy -= 1
+                pipeline.finish(seq, image, stamps)
+                self._cond.notify_all()
+
+
+class DecodePipeline:
+    """
+    Ordered decode stage between a stream reader and its viewer's mailbox.
+
+    Compressed frames wait in a bounded queue, the oldest frame is dropped without being decoded once
+    the queue is full. Frames are decoded in parallel on a DecodePool but always delivered in the order
+    they were received. While the mailbox still holds a frame the viewer hasn't taken, no new decodes
+    are started, since their result would only be overwritten.
+    """
+
+    def __init__(
+        self,
+        pool: DecodePool,
+        mailbox: FrameMailbox,
+        decode: Callable[[bytes], QImage | None],
+        deliver: Callable[[QImage, FrameTimestamps | None], None],
+        depth: int = 2,
+    ):
+        self.pool = pool
+        self.mailbox = mailbox
+        self.decode = decode
+        self.deliver = deliver
+        self.depth = max(1, depth)
+
+        self.corrupt = 0
+        self._seq = 0
+        self._queue: deque[tuple[int, bytes, FrameTimestamps | None]] = deque()
+        self._order: deque[int] = deque()
+        self._decoding = 0
+        self._done: dict[int, tuple[QImage | None, FrameTimestamps | None]] = {}
+
+        mailbox.on_take = pool.wake
+        pool.register(self)
+
+    def close(self):
+        self.pool.unregister(self)
+        self.clear()
 
-    def __init__(self, stream_url):
+    def clear(self):
+        """Drop queued frames that have not been decoded yet."""
+        with self.pool.condition:
+            for seq, _, _ in self._queue:
+                self._order.remove(seq)
+            self._queue.clear()
+            self._flush()
+
+    def submit(self, data: bytes, stamps: FrameTimestamps | None = None):
+        """Queue a compressed frame for decoding.
+
+        Args:
+            data: Compressed JPEG frame
+            stamps: Pipeline timestamps of the frame, the decode time is filled in
+        """
+        with self.pool.condition:
+            if len(self._queue) >= self.depth:
+                seq, _, _ = self._queue.popleft()
+                self._order.remove(seq)
+                self.mailbox.count_dropped()
+                self._flush()
+            self._queue.append((self._seq, data, stamps))
+            self._order.append(self._seq)
+            self._seq += 1
+            self.pool.notify()
+
+    def occupancy(self) -> dict[str, int]:
+        """Number of frames in each stage of the pipeline."""
+        with self.pool.condition:
+            return {
+                "queued": len(self._queue),
+                "decoding": self._decoding,
+                "reordering": len(self._done),
+            }
+
+    def next_job(self) -> tuple[int, bytes, FrameTimestamps | None] | None:
+        """Take the next frame to decode. Called by the pool's workers, with `DecodePool.condition` held.
+
+        Returns:
+            Sequence number, compressed frame and timestamps, or None if nothing should be decoded now
+        """
+        if not self._queue or not self.mailbox.is_empty():
+            return None
+        self._decoding += 1
+        return self._queue.popleft()
+
+    def finish(self, seq: int, image: QImage | None, stamps: FrameTimestamps | None):
+        """Hand back a decoded frame. Called by the pool's workers, with `DecodePool.condition` held.
+
+        Args:
+            seq: Sequence number from `next_job`
+            image: Decoded frame, or None if it was corrupt
+            stamps: Timestamps from `next_job`
+        """
+        self._decoding -= 1
+        if seq in self._order:
+            self._done[seq] = (image, stamps)
+        self._flush()
+
+    def _flush(self):
+        # Deliver every finished frame at the head of the order, holding the lock keeps them in order
+        while self._order and self._order[0] in self._done:
+            image, stamps = self._done.pop(self._order.popleft())
+            if image is None:
+                self.corrupt += 1
+                logger.debug("Skipped corrupt MJPEG frame")
+                continue
+            self.deliver(image, stamps)
+
+
+class FrameRateLimiter:
+    """Decides which frames to skip to stay under `max_fps`, None for no limit."""
+
+    def __init__(self, max_fps: float | None = None):
+        self.max_fps = max_fps
+        self._next = 0.0
+
+    def skip(self, now: float) -> bool:
+        """Check if a frame should be skipped.
+
+        Args:
+            now: Monotonic time the frame arrived at
+
+        Returns:
+            True if the frame is above the rate
+        """
+        if not self.max_fps:
+            return False
+        if now < self._next:
+            return True
+        interval = 1 / self.max_fps
+        # Keep the average rate when frames don't line up with the interval, but start over after a stall
+        # instead of catching up with a burst
+        if now - self._next > interval:
+            self._next = now + interval
+        else:
+            self._next += interval
+        return False
+
+
+# Errors that end a stream, after which it reconnects
+STREAM_ERRORS = (
+    urllib3.exceptions.MaxRetryError,
+    urllib3.exceptions.ConnectionError,
+    requests.exceptions.ConnectionError,
+    ConnectionRefusedError,
+    urllib3.exceptions.ProtocolError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+    urllib3.exceptions.ReadTimeoutError,
+    requests.exceptions.InvalidURL,
+    requests.exceptions.MissingSchema,
+    OSError,
+)
+
+
+def capture_time(headers: dict[str, str]) -> float:
+    """Capture time of a frame from its `X-Timestamp` part header.
+
+    Args:
+        headers: Part headers of the frame, with lowercase names
+
+    Returns:
+        The camera's timestamp converted to the monotonic clock, or 0 if the frame has none
+    """
+    try:
+        captured = float(headers["x-timestamp"])
+    except (KeyError, ValueError):
+        return 0.0
+    if not math.isfinite(captured) or captured <= 0:
+        return 0.0
+    # Convert the camera's wall clock timestamp to the monotonic clock the other stages use
+    return time.monotonic() - (time.time() - captured)
+
+
+class MJPEGReader:
+    """
+    Connection stage of the FPV pipeline, shared by MJPEGStreamThread and the child process of
+    MJPEGProcessStream.
+
+    `run` reads the stream and extracts its frames until `stop` is set, reconnecting with exponential
+    backoff after an error and reusing one HTTP session. The callbacks decide what happens next, they are
+    called on the thread running the reader: `on_frames` with the frames extracted from each chunk and
+    their timestamps, `on_error` with the repr of the error that ended the stream (None if it just ended)
+    and the backoff in seconds, and `on_reconnect` with the time the stream was down once frames arrive
+    again.
+    """
+
+    # Connecting can't be interrupted, stopping waits for it to time out. Robots are on the local network, so
+    # this is kept short
+    CONNECT_TIMEOUT = 2.0
+    READ_TIMEOUT = 3.0
+    RECONNECT_MIN = 0.25
+    RECONNECT_MAX = 8.0
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+        self,
+        stream_url: str,
+        stop: "threading.Event | ProcessEvent",
+        on_frames: Callable[[list[tuple[bytes, FrameTimestamps]]], None],
+        on_error: Callable[[str | None, float], None],
+        on_reconnect: Callable[[float], None],
+    ):
+        self.stream_url = stream_url
+        self.stop = stop
+        self.on_frames = on_frames
+        self.on_error = on_error
+        self.on_reconnect = on_reconnect
+        self.session = requests.Session()
+        self._response: requests.Response | None = None
+        self._lost_at: float | None = None
+
+    def run(self):
+        backoff = self.RECONNECT_MIN
+        while not self.stop.is_set():
+            try:
+                if self._stream():
+                    backoff = self.RECONNECT_MIN
+                error: str | None = None
+            except STREAM_ERRORS as e:
+                error = repr(e)
+            finally:
+                self._response = None
+
+            if self.stop.is_set():
+                break
+
+            if self._lost_at is None:
+                self._lost_at = time.monotonic()
+            self.on_error(error, backoff)
+
+            self.stop.wait(backoff)
+            backoff = min(backoff * 2, self.RECONNECT_MAX)
+
+    def interrupt(self):
+        """Unblock a read in progress, from another thread. A connection attempt is left to time out."""
+        # Closing the socket from another thread would not unblock the read, and there is no response while
+        # connecting
+        response = self._response
+        if response is None:
+            return
+        # The connection drops its socket once a HTTP/1.0 response starts, so go through the response's file
+        # descriptor, and detach so the wrapper doesn't close it
+        with contextlib.suppress(OSError, ValueError):
+            sock = socket.socket(fileno=response.raw.fileno())
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            finally:
+                sock.detach()
+
+    def _stream(self) -> bool:
+        """Read the stream until it ends.
+
+        Returns:
+            True if any frames were received
+        """
+        received = False
+        with self.session.get(self.stream_url, stream=True, timeout=(self.CONNECT_TIMEOUT, self.READ_TIMEOUT)) as r:
+            self._response = r
+            if self.stop.is_set():
+                return received
+            parser = MJPEGFrameParser(multipart_boundary(r.headers.get("Content-Type", "")))
+            # iter_content only returns full chunks, so the end of a frame would wait in the socket buffer
+            # until the next frame arrives. read1 returns whatever has been received so far
+            while chunk := r.raw.read1(self.CHUNK_SIZE):
+                if self.stop.is_set():
+                    break
+                received_at = time.monotonic()
+                frames = parser.feed(chunk)
+                extracted_at = time.monotonic()
+                if not frames:
+                    continue
+                if self._lost_at is not None:
+                    self.on_reconnect(time.monotonic() - self._lost_at)
+                    self._lost_at = None
+                received = True
+                stamped = []
+                for frame_data, headers in zip(frames, parser.frame_headers, strict=True):
+                    stamps = FrameTimestamps(received_at, extracted_at)
+                    stamps.captured = capture_time(headers)
+                    stamped.append((frame_data, stamps))
+                self.on_frames(stamped)
+        return received
+
+
+class MJPEGStream(QThread):
+    """
+    Live FPV stream, as seen by an MJPEGViewer.
+
+    Decoded frames are put into `mailbox`, and go back to `frame_pool` once the viewer is done with them.
+    `pipeline` is the DecodePipeline they are decoded on, if it is in this process.
+    Use `stop` to end the stream.
+
+    Sinks added with `add_sink` get every compressed frame as it is received, before it is decoded or
+    dropped. They are called on the stream thread and must not block.
+
+    If `max_fps` is set, frames above that rate are skipped before decoding, and while `suspended` is
+    set every frame is. Sinks still get them.
+    """
+
+    frame_ready = Signal()
+
+    frame_pool: FramePool
+
+    def __init__(self, stream_url, backend: DecodeBackend, pool: DecodePool | None = None):
         super().__init__()
         self.stream_url = stream_url
+        self.backend = backend
+        self.mailbox = FrameMailbox()
+        self.target_size: QSize | None = None
+        self.rate_limiter = FrameRateLimiter()
+        self.suspended = False
+        self.pool = pool or DecodePool()
+        self.pipeline: DecodePipeline | None = None
+
+        self._stop_event = threading.Event()
+        # Replaced rather than modified, so the stream thread can iterate it without a lock
+        self._sinks: tuple[Callable[[bytes, FrameTimestamps], None], ...] = ()
+        self._keep_connected: tuple[Callable[[bytes, FrameTimestamps], None], ...] = ()
+
+        self.skipped = 0
+        # Metrics, in seconds
+        self.reconnects = 0
+        self.last_reconnect_time: float | None = None
+        self.last_shutdown_time: float | None = None
+
+    @property
+    def max_fps(self) -> float | None:
+        return self.rate_limiter.max_fps
+
+    @max_fps.setter
+    def max_fps(self, max_fps: float | None):
+        self.rate_limiter.max_fps = max_fps
+
+    @property
+    def corrupt(self) -> int:
+        """Number of frames that could not be decoded."""
+        return 0 if self.pipeline is None else self.pipeline.corrupt
+
+    @override
+    def start(self, *args, **kwargs):
+        self._stop_event.clear()
+        super().start(*args, **kwargs)
+
+    def stop(self, timeout: float | None = None) -> bool:
+        """Stop the stream and wait for the thread to finish.
+
+        A read in progress is interrupted right away, but a connection attempt has to time out first.
+
+        Args:
+            timeout: Maximum time to wait in seconds, by default a little longer than
+                `MJPEGReader.CONNECT_TIMEOUT`
+
+        Returns:
+            True if the thread finished in time
+        """
+        if timeout is None:
+            timeout = MJPEGReader.CONNECT_TIMEOUT + 1.0
+        start = time.monotonic()
+        self.request_stop()
+        finished = self.wait(round(timeout * 1000))
+        self.last_shutdown_time = time.monotonic() - start
+        logger.debug(f"MJPEG stream stopped in {self.last_shutdown_time * 1000:.1f} ms")
+        return finished
+
+    def request_stop(self):
+        """Ask the stream to stop, without waiting for the thread to finish."""
+        self._stop_event.set()
+
+    def add_sink(self, sink: Callable[[bytes, FrameTimestamps], None], *, keep_connected: bool = True):
+        """Pass every received compressed frame to a callback.
+
+        Args:
+            sink: Called with the frame and its timestamps, on the stream thread
+            keep_connected: Keep the stream connected for this sink while its viewer is hidden, see
+                `MJPEGViewer.check_visibility`
+        """
+        self._sinks = (*self._sinks, sink)
+        if keep_connected:
+            self._keep_connected = (*self._keep_connected, sink)
+
+    def remove_sink(self, sink: Callable[[bytes, FrameTimestamps], None]):
+        self._sinks = tuple(s for s in self._sinks if s != sink)
+        self._keep_connected = tuple(s for s in self._keep_connected if s != sink)
+
+    def has_sinks(self, *, keep_connected: bool = False) -> bool:
+        """Check if any sinks are added.
+
+        Args:
+            keep_connected: Only count sinks that keep the stream connected while its viewer is hidden
+        """
+        return bool(self._keep_connected if keep_connected else self._sinks)
+
+    def set_target_size(self, size: QSize | None):
+        """Set the size frames are displayed at, so they can be decoded at a reduced resolution.
+
+        Args:
+            size: Display size in device pixels, or None to always decode at full resolution
+        """
+        self.target_size = size
+
+    def deliver(self, qimg: QImage, stamps: FrameTimestamps | None = None):
+        if self.mailbox.put(qimg, stamps):
+            self.frame_ready.emit()
+
+    def _reconnected(self, reconnect_time: float):
+        self.last_reconnect_time = reconnect_time
+        logger.info(f"MJPEG stream reconnected after {reconnect_time:.2f}s")
+
+    def _failed(self, error_text: str | None, backoff: float):
+        if error_text is None:
+            logger.warning(f"MJPEG stream ended, reconnecting in {backoff:.2f}s")
+            error_text = "Stream ended"
+        else:
+            logger.error(f"Could not open MJPEG stream, reconnecting in {backoff:.2f}s, {error_text}")
+
+        # Create a fake frame that displays description of error
+        img = create_image_with_text("Error", f"{error_text}\n\nReconnecting in {backoff:.1f}s", (640, 480))
+        self.deliver(pil_to_qimage(img))
+        self.reconnects += 1
+
+
+class MJPEGStreamThread(MJPEGStream):
+    """
+    Reader stage of the FPV pipeline.
+
+    Only receives data and extracts compressed frames with an MJPEGReader, decoding happens on a
+    DecodePool so a slow decode never stalls the socket. `stop` shuts the socket down, so a blocked read
+    returns right away.
+
+    If the parts of the stream have an `X-Timestamp` header with the capture time in seconds since the
+    epoch, it is used to measure capture-to-display latency. The camera's clock has to be in sync with
+    this machine's for the measurement to be meaningful.
+    """
+
+    frame_pool: FrameBufferPool
+    pipeline: DecodePipeline
+
+    def __init__(
+        self,
+        stream_url,
+        backend: DecodeBackend = DecodeBackend.QT,
+        pool: DecodePool | None = None,
+        depth: int = 2,
+    ):
+        super().__init__(stream_url, backend, pool)
+        self.pipeline = DecodePipeline(self.pool, self.mailbox, self.decode, self.deliver, depth)
+        # Frames can be decoding on every worker, waiting to be reordered, in the mailbox and on screen
+        self.frame_pool = FrameBufferPool(self.pool.workers + 2)
+        self.mailbox.on_drop = self.frame_pool.release
+        self.reader = MJPEGReader(stream_url, self._stop_event, self._received, self._failed, self._reconnected)
+
+    @override
+    def request_stop(self):
+        super().request_stop()
+        self.reader.interrupt()
+
+    def decode(self, data: bytes) -> QImage | None:
+        return decode_jpeg(data, self.backend, self.target_size, self.frame_pool)
 
     def run(self):
-        try:
-            with requests.get(self.stream_url, stream=True, timeout=10) as r:
-                buffer = b""
-                for chunk in r.iter_content(chunk_size=1024):
-                    buffer += chunk
-                    # Find the start and end of a frame
-                    start_idx = buffer.find(b"\xff\xd8")  # Start of JPEG
-                    end_idx = buffer.find(b"\xff\xd9")  # End of JPEG
-                    if start_idx != -1 and end_idx != -1 and start_idx < end_idx:
-                        # Extract the frame and convert it to QImage
-                        frame_data = buffer[start_idx : end_idx + 2]
-                        buffer = buffer[end_idx + 2 :]
-
-                        # Convert to QImage
-                        img = Image.open(BytesIO(frame_data))
-                        img = img.convert("RGB")
-                        qimg = QImage(
-                            img.tobytes(),
-                            img.width,
-                            img.height,
-                            QImage.Format.Format_RGB888,
-                        )
-                        self.frame_received.emit(qimg)
-        except (
-            urllib3.exceptions.MaxRetryError,
-            urllib3.exceptions.ConnectionError,
-            requests.exceptions.ConnectionError,
-            ConnectionRefusedError,
-            urllib3.exceptions.ProtocolError,
-            requests.exceptions.ChunkedEncodingError,
-            requests.exceptions.ReadTimeout,
-        ) as e:
-            logger.error(f"Could not open MJPEG stream, {e!r}")
-
-            # Create a fake frame that displays description of error
-            img = create_image_with_text(
-                "Error",
-                repr(e),
-                (
-                    640,
-                    480,
-                ),
-            )
-            img = img.convert("RGB")
-            qimg = QImage(img.tobytes(), img.width, img.height, QImage.Format.Format_RGB888)
-            self.frame_received.emit(qimg)
+        self.pipeline.clear()
+        self.reader.run()
+
+    def _received(self, frames: list[tuple[bytes, FrameTimestamps]]):
+        for frame_data, stamps in frames:
+            for sink in self._sinks:
+                sink(frame_data, stamps)
+            if self.suspended or self.rate_limiter.skip(stamps.received):
+                self.skipped += 1
+                continue
+            self.pipeline.submit(frame_data, stamps)
 
 
 class MJPEGViewer(QWidget):
-    def __init__(self, stream_url):
-        super().__init__()
-        # QLabel for displaying the image
-        self.label = QLabel(self)
-        self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.label.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
+    """
+    Widget that shows an MJPEG stream.
+
+    Frames are painted directly in `paintEvent` into a cached, aspect-correct target rect. Layout work
+    only happens when the aspect ratio of the stream changes, and a cheaper transformation is used
+    while the widget is being resized.
+
+    `set_player` switches the viewer to playing back frames from an MJPEGPlayer. The live stream keeps
+    running meanwhile, but stops decoding once its latest frame is waiting to be shown.
+
+    With `set_pacing`, live frames go through a FramePacer to smooth out bursty arrival, at the cost of
+    1 to 3 frames of latency. The added latency is recorded as the "Pacing" stage of `stats`.
+
+    With `process`, the stream is read and decoded in a child process, see MJPEGProcessStream.
 
-        # Set layout
-        layout = QVBoxLayout()
-        layout.addWidget(self.label)
-        self.setLayout(layout)
+    `set_overlay` adds a TelemetryHUD, which is painted over every frame from its cached layers.
+
+    While the viewer can't be seen, because it is hidden, minimized or has no visible area, the live
+    stream stays connected but skips decoding. If it stays hidden for `disconnect_after` seconds, the
+    stream is disconnected unless a sink added with `keep_connected`, like a recorder, still needs it.
+    Other sinks, like an instant replay buffer, miss frames meanwhile. Either way it resumes once the
+    viewer is shown again.
+    """
+
+    frame_displayed = Signal()
+
+    RESIZE_SETTLE_MS = 150
+    ASPECT_TOLERANCE = 0.01
+    VISIBILITY_CHECK_MS = 250
+
+    def __init__(
+        self,
+        stream_url,
+        backend: DecodeBackend = DecodeBackend.QT,
+        pool: DecodePool | None = None,
+        depth: int = 2,
+        process: bool = False,  # noqa: FBT001, FBT002
+        disconnect_after: float | None = 30.0,
+    ):
+        super().__init__()
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
 
         # Start the MJPEG stream
-        self.mjpeg_thread = MJPEGStreamThread(stream_url)
-        self.mjpeg_thread.frame_received.connect(self.update_image)
+        if process:
+            # Imported here, the module builds on this one
+            from kevinbot_desktopclient.ui.mjpeg_process import MJPEGProcessStream  # noqa: PLC0415
+
+            self.mjpeg_thread: MJPEGStream = MJPEGProcessStream(stream_url, pool)
+        else:
+            self.mjpeg_thread = MJPEGStreamThread(stream_url, backend, pool, depth)
+        self.mjpeg_thread.frame_ready.connect(self.take_frame)
         self.mjpeg_thread.start()
 
         super().setMinimumWidth(200)
 
-        # Store the current pixmap
-        self.current_pixmap = None
-
-    def update_image(self, qimg):
-        pixmap = QPixmap.fromImage(qimg)
-        aspect = pixmap.width() / pixmap.height()
-        super().setMinimumHeight(round(200 / aspect))
-        self.current_pixmap = pixmap
-        self.apply_scaling()
-
-    def apply_scaling(self):
-        if self.current_pixmap:
-            # Scale the pixmap to fit the label's current size
-            scaled_pixmap = self.current_pixmap.scaled(
-                self.label.size(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation,
-            )
-            self.label.setPixmap(scaled_pixmap)
+        # Player shown instead of the live stream
+        self.player: MJPEGPlayer | None = None
+
+        # Fraction of the widget's resolution frames are decoded at
+        self.decode_scale = 1.0
+
+        # Jitter buffer for live frames, None in lowest latency mode
+        self.pacer: FramePacer | None = None
+        self._pace_timer = QTimer(self)
+        self._pace_timer.setSingleShot(True)
+        self._pace_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._pace_timer.timeout.connect(self._present_paced)
+
+        # Drawn on top of the frame
+        self.overlay: TelemetryHUD | None = None
+
+        # Store the current pixmap, and where it is drawn
+        self.current_pixmap: QPixmap | None = None
+        self._aspect: float | None = None
+        self._frame_size = QSize()
+        self._target_rect = QRect()
+
+        # Timings of frames that made it to the screen
+        self.stats = FrameStats()
+        self._unpainted: FrameTimestamps | None = None
+
+        # Smooth scaling is skipped until a resize settles
+        self._resizing = False
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(self.RESIZE_SETTLE_MS)
+        self._resize_timer.timeout.connect(self._resize_settled)
+
+        # Hidden viewers don't decode, see `check_visibility`
+        self.disconnect_after = disconnect_after
+        self._hidden_at: float | None = None
+        self._disconnected = False
+        self._restart_pending = False
+        self._visibility_timer = QTimer(self)
+        self._visibility_timer.setInterval(self.VISIBILITY_CHECK_MS)
+        self._visibility_timer.timeout.connect(self.check_visibility)
+        self._visibility_timer.start()
+
+    @property
+    def dropped_frames(self) -> int:
+        """Number of frames skipped because a newer one arrived before they could be shown."""
+        return self.mjpeg_thread.mailbox.dropped
+
+    @property
+    def target_rect(self) -> QRect:
+        """Area of the widget the frame is drawn into."""
+        return QRect(self._target_rect)
+
+    def set_player(self, player: "MJPEGPlayer | None"):
+        """Show frames from a player instead of the live stream.
+
+        Args:
+            player: Player to show, or None to go back to the live stream
+        """
+        if self.player is not None:
+            self.player.frame_ready.disconnect(self.take_frame)
+        self.player = player
+        if player is not None:
+            self._clear_pacer()
+            player.set_target_size(self.mjpeg_thread.target_size)
+            player.frame_ready.connect(self.take_frame)
+        self.take_frame()
+
+    @property
+    def suspended(self) -> bool:
+        """True while the live stream isn't decoded because the viewer can't be seen."""
+        return self._hidden_at is not None
+
+    def is_shown(self) -> bool:
+        """Check if any part of the viewer can be seen."""
+        return self.isVisible() and not self.window().isMinimized() and not self.visibleRegion().isEmpty()
+
+    def check_visibility(self):
+        """Suspend or resume the live stream depending on whether the viewer can be seen.
+
+        Runs periodically, and right away when the viewer is shown. After `disconnect_after` seconds
+        hidden, the stream is disconnected too, unless a sink added with `keep_connected` still needs it.
+        Sinks that don't, like an instant replay buffer, miss the frames until the viewer is shown again.
+        """
+        thread = self.mjpeg_thread
+        if self._restart_pending and not thread.isRunning():
+            self._restart_pending = False
+            thread.start()
+
+        if self.is_shown():
+            if self._hidden_at is None:
+                return
+            self._hidden_at = None
+            thread.suspended = False
+            if self._disconnected:
+                logger.debug("FPV viewer shown, reconnecting")
+                self._reconnect()
+            return
+
+        now = time.monotonic()
+        if self._hidden_at is None:
+            self._hidden_at = now
+            thread.suspended = True
+            if thread.pipeline is not None:
+                thread.pipeline.clear()
+            self._clear_pacer()
+        elif self._disconnected and thread.has_sinks(keep_connected=True):
+            logger.debug("FPV sink added to a hidden viewer, reconnecting")
+            self._reconnect()
+        elif (
+            self.disconnect_after is not None
+            and not self._disconnected
+            and not thread.has_sinks(keep_connected=True)
+            and now - self._hidden_at >= self.disconnect_after
+        ):
+            logger.debug(f"FPV viewer hidden for {self.disconnect_after:g}s, disconnecting")
+            self._disconnected = True
+            self._restart_pending = False
+            # Don't block the GUI while the stream winds down, `_reconnect` waits for it if needed
+            thread.request_stop()
+
+    def _reconnect(self):
+        self._disconnected = False
+        # Still winding down from the disconnect, the next check starts it again once it is done
+        self._restart_pending = self.mjpeg_thread.isRunning()
+        if not self._restart_pending:
+            self.mjpeg_thread.start()
+
+    def set_overlay(self, overlay: "TelemetryHUD | None"):
+        """Draw a HUD over the frames.
+
+        Args:
+            overlay: HUD to draw, or None to remove it
+        """
+        if self.overlay is not None:
+            self.update(self.overlay.rect(self._target_rect))
+            self.overlay.changed.disconnect(self._overlay_changed)
+        self.overlay = overlay
+        if overlay is not None:
+            overlay.changed.connect(self._overlay_changed)
+            self._overlay_changed()
+
+    def _overlay_changed(self):
+        if self.overlay is not None:
+            self.update(self.overlay.rect(self._target_rect))
+
+    def set_decode_scale(self, scale: float):
+        """Decode frames at a fraction of the widget's size, for viewers that don't need full detail.
+
+        Args:
+            scale: Fraction of the widget's size in device pixels, 1 for full detail
+        """
+        self.decode_scale = scale
+        self._update_decode_size()
+
+    def _update_decode_size(self):
+        self.mjpeg_thread.set_target_size(self.size() * self.devicePixelRatio() * self.decode_scale)
+        if self.player is not None:
+            self.player.set_target_size(self.mjpeg_thread.target_size)
+
+    def set_pacing(self, enabled: bool):  # noqa: FBT001
+        """Switch between smooth mode, which presents live frames at a steady cadence, and lowest latency mode.
+
+        Args:
+            enabled: True for smooth mode
+        """
+        if enabled == (self.pacer is not None):
+            return
+        if enabled:
+            self.pacer = FramePacer()
+            # The buffered frames hold on to their frame buffers
+            self.mjpeg_thread.frame_pool.reserve(FramePacer.MAX_DEPTH)
+            return
+        self._clear_pacer()
+        self.pacer = None
+        self.mjpeg_thread.frame_pool.reserve(-FramePacer.MAX_DEPTH)
+
+    def _clear_pacer(self):
+        self._pace_timer.stop()
+        if self.pacer is not None:
+            for frame in self.pacer.clear():
+                self.mjpeg_thread.frame_pool.release(frame)
+
+    def take_frame(self):
+        source = self.player or self.mjpeg_thread
+        qimg, stamps = source.mailbox.take_stamped()
+        if qimg is None:
+            return
+        now = time.monotonic()
+        if stamps is not None:
+            stamps.delivered = now
+
+        if self.pacer is not None and self.player is None:
+            dropped = self.pacer.push(qimg, stamps, now)
+            if dropped is not None:
+                source.frame_pool.release(dropped)
+            # While frames are being presented, the timer keeps the cadence
+            if not self._pace_timer.isActive():
+                self._present_paced()
+            return
+
+        self._show(qimg, stamps)
+        source.frame_pool.release(qimg)
+
+    def _present_paced(self):
+        if self.pacer is None or self.player is not None:
+            return
+        frame = self.pacer.pop()
+        if frame is None:
+            return
+        qimg, stamps = frame
+        if stamps is not None:
+            stamps.presented = time.monotonic()
+        self._show(qimg, stamps)
+        self.mjpeg_thread.frame_pool.release(qimg)
+        self._pace_timer.start(round(self.pacer.next_interval() * 1000))
+
+    def _show(self, qimg: QImage, stamps: FrameTimestamps | None):
+        # A frame replaced before it was painted never reaches the screen, so it isn't recorded
+        self._unpainted = stamps
+        self.update_image(qimg)
+        self.frame_displayed.emit()
+
+    def update_image(self, qimg: QImage):
+        if self.current_pixmap is None or self.current_pixmap.size() != qimg.size():
+            self.current_pixmap = QPixmap.fromImage(qimg)
+        else:
+            self.current_pixmap.convertFromImage(qimg)
+
+        aspect = qimg.width() / qimg.height()
+        if self._aspect is None or abs(aspect - self._aspect) > self.ASPECT_TOLERANCE:
+            self._aspect = aspect
+            self._frame_size = qimg.size()
+            super().setMinimumHeight(round(self.minimumWidth() / aspect))
+            self._update_target_rect()
+            self.update()
+        else:
+            self.update(self._target_rect)
+
+    def _update_target_rect(self):
+        if self._aspect is None:
+            return
+        rect = QRect(QPoint(0, 0), self._frame_size.scaled(self.size(), Qt.AspectRatioMode.KeepAspectRatio))
+        rect.moveCenter(self.rect().center())
+        self._target_rect = rect
+
+    def _resize_settled(self):
+        self._resizing = False
+        self.update(self._target_rect)
+
+    @override
+    def paintEvent(self, event):
+        if self.current_pixmap is None:
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, not self._resizing)
+        painter.drawPixmap(self._target_rect, self.current_pixmap)
+        if self.overlay is not None:
+            self.overlay.paint(painter, self._target_rect)
+        painter.end()
+
+        if self._unpainted is not None:
+            self._unpainted.painted = time.monotonic()
+            self.stats.record(self._unpainted)
+            self._unpainted = None
+
+    @override
+    def showEvent(self, event):
+        self.check_visibility()
+        event.accept()
 
     @override
     def resizeEvent(self, event):
-        # Reapply scaling when the window is resized
-        self.apply_scaling()
+        self._update_decode_size()
+        self._update_target_rect()
+        self._resizing = True
+        self._resize_timer.start()
         event.accept()
 
     @override
     def closeEvent(self, event):
-        self.mjpeg_thread.terminate()
+        self._visibility_timer.stop()
+        self.mjpeg_thread.stop()
+        if self.mjpeg_thread.pipeline is not None:
+            self.mjpeg_thread.pipeline.close()
         event.accept()
@@ -0,0 +1,140 @@
+"""
+Several FPV streams shown together, as a mosaic or picture-in-picture
+"""
+
+import math
+from enum import Enum
+from typing import override
+
+from PySide6.QtCore import QEvent, QObject, QRect, Signal
+from PySide6.QtWidgets import QSizePolicy, QWidget
+
+from kevinbot_desktopclient.ui.mjpeg import DecodeBackend, DecodePool, MJPEGViewer
+
+
+class MosaicLayout(Enum):
+    MOSAIC = "mosaic"
+    PICTURE_IN_PICTURE = "pip"
+
+
+class MJPEGMosaic(QWidget):
+    """
+    Widget that shows one MJPEGViewer per stream.
+
+    All viewers decode on one shared DecodePool, which gives every stream a fair share of the workers.
+    Clicking a viewer focuses it. Viewers that aren't focused are decoded at a lower resolution and
+    frame rate, and in picture-in-picture layout they are shown small over the focused one.
+    """
+
+    focus_changed = Signal(int)
+
+    UNFOCUSED_SCALE = 0.5
+    UNFOCUSED_FPS = 10.0
+    # Width of a picture-in-picture inset, as a fraction of the widget's width
+    INSET_WIDTH = 0.25
+    INSET_MARGIN = 8
+
+    def __init__(
+        self,
+        stream_urls: list[str],
+        backend: DecodeBackend = DecodeBackend.QT,
+        pool: DecodePool | None = None,
+        depth: int = 2,
+        layout: MosaicLayout = MosaicLayout.MOSAIC,
+        process: bool = False,  # noqa: FBT001, FBT002
+    ):
+        super().__init__()
+        if not stream_urls:
+            msg = "At least one stream is needed"
+            raise ValueError(msg)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        super().setMinimumWidth(200)
+
+        self.pool = pool or DecodePool()
+        self.viewers: list[MJPEGViewer] = []
+        for url in stream_urls:
+            viewer = MJPEGViewer(url, backend, self.pool, depth, process)
+            viewer.setParent(self)
+            # Tiles are placed by the mosaic, their size is not theirs to decide
+            viewer.setMinimumWidth(0)
+            viewer.installEventFilter(self)
+            self.viewers.append(viewer)
+
+        self.layout_mode = layout
+        self.focused = 0
+        self._apply_focus()
+
+    def set_layout_mode(self, layout: MosaicLayout):
+        self.layout_mode = layout
+        self._place()
+
+    def set_focus(self, index: int):
+        """Show a stream at full detail.
+
+        Args:
+            index: Index of the stream in `viewers`
+        """
+        if index == self.focused or not 0 <= index < len(self.viewers):
+            return
+        self.focused = index
+        self._apply_focus()
+        self.focus_changed.emit(index)
+
+    def stop(self):
+        """Stop every stream. They stop in parallel, so this takes as long as the slowest one."""
+        for viewer in self.viewers:
+            viewer.mjpeg_thread.request_stop()
+        for viewer in self.viewers:
+            viewer.mjpeg_thread.stop()
+
+    def _apply_focus(self):
+        for index, viewer in enumerate(self.viewers):
+            focused = index == self.focused
+            viewer.set_decode_scale(1.0 if focused else self.UNFOCUSED_SCALE)
+            viewer.mjpeg_thread.max_fps = None if focused else self.UNFOCUSED_FPS
+        self._place()
+
+    def _place(self):
+        if self.layout_mode == MosaicLayout.PICTURE_IN_PICTURE and len(self.viewers) > 1:
+            self._place_picture_in_picture()
+        else:
+            self._place_mosaic()
+
+    def _place_mosaic(self):
+        columns = math.ceil(math.sqrt(len(self.viewers)))
+        rows = math.ceil(len(self.viewers) / columns)
+        width = self.width() // columns
+        height = self.height() // rows
+        for index, viewer in enumerate(self.viewers):
+            row, column = divmod(index, columns)
+            viewer.setGeometry(column * width, row * height, width, height)
+
+    def _place_picture_in_picture(self):
+        self.viewers[self.focused].setGeometry(self.rect())
+        self.viewers[self.focused].lower()
+
+        width = round(self.width() * self.INSET_WIDTH)
+        height = width * 3 // 4
+        right = self.width() - self.INSET_MARGIN
+        bottom = self.height() - self.INSET_MARGIN
+        for viewer in (viewer for index, viewer in enumerate(self.viewers) if index != self.focused):
+            viewer.setGeometry(QRect(right - width, bottom - height, width, height))
+            viewer.raise_()
+            bottom -= height + self.INSET_MARGIN
+
+    @override
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        if event.type() == QEvent.Type.MouseButtonPress and watched in self.viewers:
+            self.set_focus(self.viewers.index(watched))  # type: ignore
+        return super().eventFilter(watched, event)
+
+    @override
+    def resizeEvent(self, event):
+        self._place()
+        event.accept()
+
+    @override
+    def closeEvent(self, event):
+        for viewer in self.viewers:
+            viewer.close()
+        event.accept()
@@ -0,0 +1,468 @@
+"""
+FPV stream reading and decoding in a child process
+
+Decoding JPEG frames in Python threads competes with the GUI and the controller thread for the GIL. A
+child process reads and decodes the stream instead, and hands decoded frames back through shared
+memory, so the GUI only maps them and never copies them.
+"""
+
+import contextlib
+import math
+import multiprocessing
+import os
+import struct
+import threading
+import time
+from io import BytesIO
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+from multiprocessing.synchronize import Event
+from typing import override
+
+from loguru import logger
+from PIL import Image
+from PySide6.QtCore import QSize
+from PySide6.QtGui import QImage
+
+from kevinbot_desktopclient.ui.mjpeg import (
+    DecodeBackend,
+    DecodePool,
+    FramePacer,
+    FrameRateLimiter,
+    FrameTimestamps,
+    MJPEGReader,
+    MJPEGStream,
+    create_image_with_text,
+    jpeg_scale_factor,
+    pil_to_qimage,
+)
+
+# State, sequence number, width, height, bytes per line, then the received, extracted, decoded and
+# captured times of the frame
+SLOT_HEADER = struct.Struct("<B7xQIII4xdddd")
+SLOT_FREE = 0
+SLOT_WRITING = 1
+SLOT_READY = 2
+
+
+class FrameTooLargeError(Exception):
+    """A decoded frame would not fit in a SharedFrameBuffer slot."""
+
+    def __init__(self, size: QSize):
+        super().__init__(f"{size.width()}x{size.height()} frame does not fit in a slot")
+        self.size = size
+
+
+class SharedFrameBuffer:
+    """
+    Slots for decoded frames in shared memory, written by the child process and read by the GUI.
+
+    Each slot starts with a header describing the frame, followed by its RGBX pixels. The child only
+    takes free slots and marks them ready once the frame is complete, the GUI only marks them free
+    again once it no longer uses the frame. Since each side only makes its own transition, a slot is
+    never written while it is being read.
+
+    On the GUI side the buffer is the stream's FramePool: frames returned by `read` go back with `release`.
+    """
+
+    FORMAT = QImage.Format.Format_RGBX8888
+
+    # Two for double buffering, plus the frames a FramePacer can hold on to
+    SLOTS = 2 + FramePacer.MAX_DEPTH
+
+    def __init__(self, frame_bytes: int = 1920 * 1080 * 4):
+        self.frame_bytes = frame_bytes
+        self.slot_size = SLOT_HEADER.size + frame_bytes
+        self.exhausted = 0
+        self.shm: shared_memory.SharedMemory | None = None
+        self._owner = False
+        self._lock = threading.Lock()
+        self._in_use: dict[int, tuple[shared_memory.SharedMemory, int, memoryview]] = {}
+
+    @property
+    def count(self) -> int:
+        return self.SLOTS
+
+    @property
+    def name(self) -> str | None:
+        return None if self.shm is None else self.shm.name
+
+    def create(self):
+        """Allocate the shared memory, all slots start out free."""
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slot_size * self.SLOTS)
+        self._owner = True
+        for slot in range(self.SLOTS):
+            self.shm.buf[slot * self.slot_size] = SLOT_FREE
+
+    def attach(self, name: str):
+        """Map shared memory created by another process.
+
+        Args:
+            name: Name of the shared memory
+        """
+        self.shm = shared_memory.SharedMemory(name=name)
+        self._owner = False
+        if os.name == "posix":
+            # The child would otherwise register the memory with the resource tracker too, which unlinks it
+            # and warns about a leak once the child exits
+            from multiprocessing import resource_tracker  # noqa: PLC0415
+
+            resource_tracker.unregister(self.shm._name, "shared_memory")  # type: ignore  # noqa: SLF001
+
+    def close(self):
+        """Unmap the shared memory, and free it if it was created here.
+
+        Frames that haven't been released yet stay valid, the memory is unmapped once they are.
+        """
+        if self.shm is None:
+            return
+        if self._owner:
+            with contextlib.suppress(FileNotFoundError):
+                self.shm.unlink()
+        with self._lock:
+            in_use = any(shm is self.shm for shm, _, _ in self._in_use.values())
+        if not in_use:
+            with contextlib.suppress(BufferError):
+                self.shm.close()
+        self.shm = None
+
+    def acquire(self) -> int | None:
+        """Take a free slot to decode into.
+
+        Returns:
+            Index of the slot, or None if every slot is in use
+        """
+        for slot in range(self.SLOTS):
+            if self.shm.buf[slot * self.slot_size] == SLOT_FREE:  # type: ignore
+                self.shm.buf[slot * self.slot_size] = SLOT_WRITING  # type: ignore
+                return slot
+        return None
+
+    def decode_into(self, slot: int, data: bytes, target_size: QSize | None) -> QSize | None:
+        """Decode a JPEG frame into a slot, at reduced resolution if the target size allows it.
+
+        Args:
+            slot: Slot returned by `acquire`
+            data: Compressed JPEG frame
+            target_size: Display size of the frame, see `decode_jpeg`
+
+        Returns:
+            Size of the decoded frame, or None if the frame is corrupt
+
+        Raises:
+            FrameTooLargeError: The frame doesn't fit in a slot, even at the reduced resolution
+        """
+        try:
+            image = Image.open(BytesIO(data))
+            factor = jpeg_scale_factor(QSize(*image.size), target_size)
+            if factor > 1:
+                image.draft("RGB", (math.ceil(image.width / factor), math.ceil(image.height / factor)))
+        except (OSError, SyntaxError, ValueError):
+            return None
+        if image.width * image.height * 4 > self.frame_bytes:
+            raise FrameTooLargeError(QSize(*image.size))
+        try:
+            start = slot * self.slot_size + SLOT_HEADER.size
+            pixels = self.shm.buf[start : start + image.width * image.height * 4]  # type: ignore
+            # Same as decoding into a FrameBufferPool, the slot is mapped as a writable PIL image
+            view = Image.frombuffer("RGBX", image.size, pixels, "raw", "RGBX", image.width * 4, 1)
+            view.readonly = 0
+            view.paste(image)
+        except (OSError, SyntaxError, ValueError):
+            return None
+        return QSize(*image.size)
+
+    def publish(self, slot: int, seq: int, size: QSize, stamps: FrameTimestamps):
+        """Mark a decoded slot ready to be read.
+
+        Args:
+            slot: Slot the frame was decoded into
+            seq: Sequence number of the frame
+            size: Size returned by `decode_into`
+            stamps: Pipeline timestamps of the frame
+        """
+        offset = slot * self.slot_size
+        SLOT_HEADER.pack_into(
+            self.shm.buf,  # type: ignore
+            offset,
+            SLOT_WRITING,
+            seq,
+            size.width(),
+            size.height(),
+            size.width() * 4,
+            stamps.received,
+            stamps.extracted,
+            stamps.decoded,
+            stamps.captured,
+        )
+        # The state goes last, the reader ignores the rest of the header until it changes
+        self.shm.buf[offset] = SLOT_READY  # type: ignore
+
+    def free(self, slot: int):
+        self.shm.buf[slot * self.slot_size] = SLOT_FREE  # type: ignore
+
+    def read(self, slot: int) -> tuple[QImage, FrameTimestamps] | None:
+        """Map a ready slot as a QImage, without copying it.
+
+        Args:
+            slot: Slot the child process published
+
+        Returns:
+            The frame and its timestamps, or None if the slot isn't ready. The frame has to be given back
+            with `release`
+        """
+        if self.shm is None:
+            return None
+        offset = slot * self.slot_size
+        state, _, width, height, bytes_per_line, received, extracted, decoded, captured = SLOT_HEADER.unpack_from(
+            self.shm.buf,  # type: ignore
+            offset,
+        )
+        if state != SLOT_READY:
+            return None
+        start = offset + SLOT_HEADER.size
+        pixels = self.shm.buf[start : start + bytes_per_line * height]  # type: ignore
+        frame = QImage(pixels, width, height, bytes_per_line, self.FORMAT)
+        with self._lock:
+            # The view keeps the memory mapped for as long as the frame is in use, even past `close`
+            self._in_use[frame.cacheKey()] = (self.shm, slot, pixels)
+        return frame, FrameTimestamps(received, extracted, decoded, captured=captured)
+
+    def release(self, frame: QImage):
+        """Give a slot back to the child process. Frames that don't come from `read` are ignored.
+
+        Args:
+            frame: Frame returned by `read`
+        """
+        with self._lock:
+            shm, slot, _ = self._in_use.pop(frame.cacheKey(), (None, 0, None))
+            # Slots of memory that has been closed since are gone with it
+            if shm is not None and shm is self.shm:
+                self.free(slot)
+
+    def available(self) -> int:
+        """Number of slots the child process can decode into."""
+        if self.shm is None:
+            return 0
+        return sum(self.shm.buf[slot * self.slot_size] == SLOT_FREE for slot in range(self.SLOTS))  # type: ignore
+
+    def reserve(self, extra: int):
+        """Does nothing, there are always enough slots for a FramePacer.
+
+        Args:
+            extra: Number of frames held on to outside the stream
+        """
+
+
+class _ChildStream:
+    """Decoder running in the child process behind an MJPEGReader, see `stream_process`."""
+
+    def __init__(self, stream_url: str, frames: SharedFrameBuffer, conn: Connection, stop: Event):
+        self.frames = frames
+        self.conn = conn
+        self.reader = MJPEGReader(stream_url, stop, self._received, self._failed, self._reconnected)
+        self.rate_limiter = FrameRateLimiter()
+        self.target_size: QSize | None = None
+        self.suspended = False
+
+        self.seq = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.corrupt = 0
+        self.exhausted = 0
+
+    def run(self):
+        self.reader.run()
+
+    def _poll_config(self):
+        while self.conn.poll():
+            width, height, max_fps, self.suspended = self.conn.recv()
+            self.target_size = QSize(width, height) if width and height else None
+            self.rate_limiter.max_fps = max_fps or None
+
+    def _received(self, frames: list[tuple[bytes, FrameTimestamps]]):
+        self._poll_config()
+        # Only the newest frame of a chunk would be shown, the rest aren't worth decoding
+        self.dropped += len(frames) - 1
+        data, stamps = frames[-1]
+        if self.suspended or self.rate_limiter.skip(stamps.received):
+            self.skipped += 1
+            return
+        self._decode(data, stamps)
+
+    def _failed(self, error_text: str | None, backoff: float):
+        self.conn.send(("error", error_text, backoff))
+
+    def _reconnected(self, reconnect_time: float):
+        self.conn.send(("connected", reconnect_time))
+
+    def _decode(self, data: bytes, stamps: FrameTimestamps):
+        slot = self.frames.acquire()
+        if slot is None:
+            # The GUI hasn't given any slot back yet, it is behind anyway
+            self.dropped += 1
+            self.exhausted += 1
+            return
+        try:
+            size = self.frames.decode_into(slot, data, self.target_size)
+        except FrameTooLargeError as e:
+            self.frames.free(slot)
+            self.conn.send(("too_large", e.size.width(), e.size.height()))
+            return
+        if size is None:
+            self.frames.free(slot)
+            self.corrupt += 1
+            return
+        stamps.decoded = time.monotonic()
+        self.seq += 1
+        self.frames.publish(slot, self.seq, size, stamps)
+        self.conn.send(("frame", slot, self.dropped, self.skipped, self.corrupt, self.exhausted))
+        self.dropped = 0
+
+
+def stream_process(stream_url: str, shm_name: str, frame_bytes: int, conn: Connection, stop: Event):
+    """Entry point of the child process.
+
+    Args:
+        stream_url: URL of the MJPEG stream
+        shm_name: Name of the SharedFrameBuffer created by the GUI
+        frame_bytes: Size of a slot's pixel data
+        conn: Pipe to the GUI, frames and errors are sent and configuration is received through it
+        stop: Set by the GUI to end the process
+    """
+    frames = SharedFrameBuffer(frame_bytes)
+    frames.attach(shm_name)
+    try:
+        _ChildStream(stream_url, frames, conn, stop).run()
+    except (BrokenPipeError, EOFError):
+        # The GUI went away
+        pass
+    finally:
+        frames.close()
+        conn.close()
+
+
+class MJPEGProcessStream(MJPEGStream):
+    """
+    Live FPV stream that is read and decoded in a child process.
+
+    The thread only relays messages from the child, putting frames from shared memory into the mailbox
+    and showing errors, and keeps the child up to date with the target size, frame rate limit and
+    whether it is suspended.
+    Frames are always decoded with PIL, into a SharedFrameBuffer that is the stream's `frame_pool`. There
+    is no DecodePipeline in this process.
+
+    Compressed frames never reach this process, so sinks are not supported. Frames larger than
+    `MAX_FRAME_SIZE` after reducing them to the target size don't fit in shared memory, they are counted
+    as dropped and an error is shown instead.
+    """
+
+    # Largest frame that fits in a slot
+    MAX_FRAME_SIZE = QSize(1920, 1080)
+    CHILD_EXIT_TIMEOUT = 2.0
+    POLL_INTERVAL = 0.1
+
+    frame_pool: SharedFrameBuffer
+
+    def __init__(self, stream_url, pool: DecodePool | None = None):
+        # The pool is only passed on to players of recordings, which decode in this process
+        super().__init__(stream_url, DecodeBackend.PIL, pool)
+        self.frame_pool = SharedFrameBuffer(self.MAX_FRAME_SIZE.width() * self.MAX_FRAME_SIZE.height() * 4)
+        self.mailbox.on_drop = self.frame_pool.release
+        self._child_stop: Event | None = None
+        # Size of the frames that were too large, until one fits again
+        self._too_large: tuple[int, int] | None = None
+        self._corrupt = 0
+
+    @property
+    @override
+    def corrupt(self) -> int:
+        return self._corrupt
+
+    @override
+    def add_sink(self, sink, *, keep_connected: bool = True):
+        logger.warning("FPV sinks are not supported while decoding in a separate process")
+
+    @override
+    def request_stop(self):
+        if self._child_stop is not None:
+            self._child_stop.set()
+        super().request_stop()
+
+    @override
+    def run(self):
+        context = multiprocessing.get_context("spawn")
+        self._child_stop = context.Event()
+        conn, child_conn = context.Pipe()
+        self.frame_pool.create()
+        process = context.Process(
+            target=stream_process,
+            args=(self.stream_url, self.frame_pool.name, self.frame_pool.frame_bytes, child_conn, self._child_stop),
+            name="FPV stream",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        logger.debug(f"FPV stream process started, pid {process.pid}")
+
+        config = None
+        try:
+            while not self._stop_event.is_set():
+                size = self.target_size or QSize()
+                new_config = (size.width(), size.height(), self.max_fps or 0, self.suspended)
+                if new_config != config:
+                    conn.send(new_config)
+                    config = new_config
+
+                if not conn.poll(self.POLL_INTERVAL):
+                    if not process.is_alive():
+                        logger.error(f"FPV stream process exited with code {process.exitcode}")
+                        break
+                    continue
+                self._handle(conn.recv())
+        except (BrokenPipeError, EOFError):
+            logger.error("Lost connection to the FPV stream process")
+        finally:
+            self._child_stop.set()
+            conn.close()
+            process.join(self.CHILD_EXIT_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+            frame = self.mailbox.take()
+            if frame is not None:
+                self.frame_pool.release(frame)
+            self.frame_pool.close()
+
+    def _handle(self, message: tuple):
+        match message:
+            case ("frame", slot, dropped, skipped, corrupt, exhausted):
+                self._too_large = None
+                self.skipped = skipped
+                self._corrupt = corrupt
+                self.frame_pool.exhausted = exhausted
+                if dropped:
+                    self.mailbox.count_dropped(dropped)
+                frame = self.frame_pool.read(slot)
+                if frame is not None:
+                    self.deliver(*frame)
+            case ("too_large", width, height):
+                self.mailbox.count_dropped()
+                if self._too_large == (width, height):
+                    return
+                self._too_large = (width, height)
+                limit = f"{self.MAX_FRAME_SIZE.width()}x{self.MAX_FRAME_SIZE.height()}"
+                logger.error(
+                    f"FPV frames are {width}x{height}, larger than {limit} in a separate process, dropping them"
+                )
+                img = create_image_with_text(
+                    "Frame Too Large",
+                    f"{width}x{height} frames can't be decoded in a separate process, the limit is {limit}\n\n"
+                    "Turn off decoding in a separate process in the FPV settings",
+                    (640, 480),
+                )
+                self.deliver(pil_to_qimage(img))
+            case ("connected", reconnect_time):
+                self._reconnected(reconnect_time)
+            case ("error", error_text, backoff):
+                self._failed(error_text, backoff)
@@ -0,0 +1,612 @@
+"""
+Recording and playback of FPV streams
+
+A recording is a pair of files. The data file holds the compressed JPEG frames exactly as they were
+received, concatenated. The index file next to it (same name plus `.idx`) has a short header followed
+by one fixed size record per frame: byte offset and length in the data file, and the time the frame
+was received in seconds since the recording started.
+"""
+
+import bisect
+import mmap
+import queue
+import struct
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Protocol
+
+import qtawesome as qta
+from loguru import logger
+from PySide6.QtCore import QObject, QSize, Qt, QTimer, Signal
+from PySide6.QtGui import QImage
+from PySide6.QtWidgets import QAbstractSlider, QComboBox, QHBoxLayout, QLabel, QSlider, QToolButton, QWidget
+
+from kevinbot_desktopclient.ui.mjpeg import (
+    DecodeBackend,
+    DecodePipeline,
+    DecodePool,
+    FrameBufferPool,
+    FrameMailbox,
+    FrameTimestamps,
+    MJPEGFrameParser,
+    decode_jpeg,
+)
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"KBFPVIX1"
+# Offset, length, timestamp
+INDEX_RECORD = struct.Struct("<QId")
+
+
+def index_path(path: str | Path) -> Path:
+    """Path of the index file of a recording.
+
+    Args:
+        path: Path of the data file
+    """
+    path = Path(path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+class FrameRecorder:
+    """
+    Append-only recorder for compressed FPV frames.
+
+    `write` only places the frame in a bounded queue, a background thread does the disk writes. If the
+    disk can't keep up and the queue is full, frames are dropped from the recording instead of
+    slowing down the live view. Frames are never decoded or re-encoded.
+
+    Use `add_sink` of an MJPEGStreamThread to feed it every received frame.
+    """
+
+    def __init__(self, path: str | Path, queue_size: int = 64):
+        self.path = Path(path)
+        self.queue_size = queue_size
+        self.written = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.error: OSError | None = None
+
+        self._queue: queue.Queue[tuple[bytes, float] | None] = queue.Queue(queue_size)
+        self._thread: threading.Thread | None = None
+        self._start = 0.0
+
+    @property
+    def recording(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        """Create the recording files and start the writer thread.
+
+        Raises:
+            OSError: If the files can't be created
+        """
+        if self._thread is not None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = open(self.path, "xb")  # noqa: SIM115
+        try:
+            index = open(index_path(self.path), "xb")  # noqa: SIM115
+        except OSError:
+            data.close()
+            raise
+        index.write(INDEX_MAGIC)
+
+        self.written = self.dropped = self.bytes_written = 0
+        self.error = None
+        self._start = time.monotonic()
+        # A frame queued while the last recording was stopping must not end up in this one
+        self._queue = queue.Queue(self.queue_size)
+        self._thread = threading.Thread(
+            target=self._work, args=(self._queue, data, index), name="FPV Recorder", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Recording FPV to {self.path}")
+
+    def stop(self):
+        """Write out the frames that are still queued, and close the files."""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        # The writer drains the queue, so this can't stay blocked for long
+        self._queue.put(None)
+        thread.join()
+        logger.info(f"Recorded {self.written} FPV frames to {self.path}, {self.dropped} dropped")
+
+    def write(self, data: bytes, stamps: FrameTimestamps):
+        """Queue a frame to be written. Never blocks.
+
+        Args:
+            data: Compressed JPEG frame, as received
+            stamps: Pipeline timestamps of the frame, only the receive time is used
+        """
+        if self._thread is None:
+            return
+        try:
+            self._queue.put_nowait((data, stamps.received - self._start))
+        except queue.Full:
+            self.dropped += 1
+
+    def _work(self, frames: "queue.Queue[tuple[bytes, float] | None]", data_file, index_file):
+        offset = 0
+        with data_file, index_file:
+            while (item := frames.get()) is not None:
+                if self.error is not None:
+                    continue
+                data, timestamp = item
+                try:
+                    data_file.write(data)
+                    index_file.write(INDEX_RECORD.pack(offset, len(data), timestamp))
+                except OSError as e:
+                    self.error = e
+                    logger.error(f"FPV recording failed, {e!r}")
+                    continue
+                offset += len(data)
+                self.written += 1
+                self.bytes_written = offset
+
+
+def build_index(data: bytes | mmap.mmap, fps: float = 30.0) -> bytes:
+    """Build the index of a data file that doesn't have one, by scanning it for JPEG frames.
+
+    Args:
+        data: Contents of the data file
+        fps: Frame rate the frames are assumed to have been received at
+
+    Returns:
+        Contents of the index file
+    """
+    records = [INDEX_MAGIC]
+    pos = 0
+    while (start := data.find(MJPEGFrameParser.SOI, pos)) != -1:
+        end = data.find(MJPEGFrameParser.EOI, start + 2)
+        if end == -1:
+            break
+        pos = end + 2
+        records.append(INDEX_RECORD.pack(start, pos - start, (len(records) - 1) / fps))
+    return b"".join(records)
+
+
+class FrameSource(Protocol):
+    """Timestamped compressed frames that can be played back by an MJPEGPlayer."""
+
+    def __len__(self) -> int: ...
+
+    def frame(self, index: int) -> bytes: ...
+
+    def timestamp(self, index: int) -> float: ...
+
+
+def find_frame(source: FrameSource, timestamp: float) -> int:
+    """Binary search for the frame shown at a time.
+
+    Args:
+        source: Frames to search, must not be empty
+        timestamp: Time in the timebase of the source
+
+    Returns:
+        Index of the last frame at or before `timestamp`, or the first frame if there is none
+    """
+    return max(0, bisect.bisect_right(range(len(source)), timestamp, key=source.timestamp) - 1)
+
+
+class Recording:
+    """
+    Recorded FPV stream opened for playback.
+
+    The data and index files are memory-mapped, so opening a recording and seeking in it take the same
+    time no matter how long it is, and only the frames that are shown are read from disk.
+
+    If the index is missing, it is built by scanning the data file and saved next to it. The frames are
+    then assumed to be `fps` apart, since the data file has no timing.
+    """
+
+    def __init__(self, path: str | Path, fps: float = 30.0):
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            try:
+                self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                msg = f"{self.path} is empty"
+                raise ValueError(msg) from None
+
+        try:
+            self._index = self._open_index(fps)
+        except BaseException:
+            self._data.close()
+            raise
+
+        count = (len(self._index) - len(INDEX_MAGIC)) // INDEX_RECORD.size
+        # A recording that was cut short can have index entries for frames that never made it to disk
+        while count and sum(self._record(count - 1)[:2]) > len(self._data):
+            count -= 1
+        self._count = count
+
+    def _open_index(self, fps: float) -> bytes | mmap.mmap:
+        path = index_path(self.path)
+        try:
+            with open(path, "rb") as file:
+                if file.read(len(INDEX_MAGIC)) == INDEX_MAGIC:
+                    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            pass
+
+        logger.info(f"Building FPV recording index for {self.path}")
+        index = build_index(self._data, fps)
+        try:
+            path.write_bytes(index)
+        except OSError as e:
+            logger.warning(f"Could not save FPV recording index, {e!r}")
+        return index
+
+    def close(self):
+        self._data.close()
+        if isinstance(self._index, mmap.mmap):
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, index: int) -> tuple[int, int, float]:
+        return INDEX_RECORD.unpack_from(self._index, len(INDEX_MAGIC) + index * INDEX_RECORD.size)
+
+    def frame(self, index: int) -> bytes:
+        """Compressed frame, read from the data file."""
+        offset, length, _ = self._record(index)
+        return self._data[offset : offset + length]
+
+    def timestamp(self, index: int) -> float:
+        """Time the frame was received, in seconds since the recording started."""
+        return self._record(index)[2]
+
+
+class ReplayClip:
+    """Frames taken out of a ReplayBuffer, timestamps are monotonic times the frames were received at."""
+
+    def __init__(self, frames: list[tuple[float, bytes]]):
+        self._frames = frames
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def frame(self, index: int) -> bytes:
+        return self._frames[index][1]
+
+    def timestamp(self, index: int) -> float:
+        return self._frames[index][0]
+
+
+class ReplayBuffer:
+    """
+    Ring of the most recently received compressed frames, for instant replay.
+
+    Frames are kept while they are less than `max_age` seconds older than the newest one, and their
+    total size is at most `max_bytes`, the oldest frames are dropped first. Since frames are stored
+    compressed, a few MB hold many seconds of video.
+
+    Use `add_sink` of an MJPEGStreamThread to feed it every received frame.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_age: float = 30.0):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._frames: deque[tuple[float, bytes]] = deque()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._frames)
+
+    @property
+    def size(self) -> int:
+        """Total size of the stored frames in bytes."""
+        with self._lock:
+            return self._bytes
+
+    @property
+    def duration(self) -> float:
+        """Time between the oldest and newest stored frame, in seconds."""
+        with self._lock:
+            return self._frames[-1][0] - self._frames[0][0] if self._frames else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+
+    def write(self, data: bytes, stamps: FrameTimestamps):
+        """Add a frame, dropping the oldest ones that no longer fit.
+
+        Args:
+            data: Compressed JPEG frame, as received
+            stamps: Pipeline timestamps of the frame, only the receive time is used
+        """
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            frames = self._frames
+            frames.append((stamps.received, data))
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes or stamps.received - frames[0][0] > self.max_age:
+                self._bytes -= len(frames.popleft()[1])
+
+    def snapshot(self) -> ReplayClip:
+        """Frames stored right now, later frames don't change the clip."""
+        with self._lock:
+            return ReplayClip(list(self._frames))
+
+
+class MJPEGPlayer(QObject):
+    """
+    Plays back timestamped frames, such as a Recording or ReplayClip, in an MJPEGViewer.
+
+    Frames are decoded on a DecodePool like the live stream, through a pipeline with room for a single
+    frame, so scrubbing always decodes the newest position. Playback follows the frame timestamps at
+    `speed` times real time, frames are skipped if decoding can't keep up.
+
+    Use `MJPEGViewer.set_player` to show it.
+    """
+
+    frame_ready = Signal()
+    position_changed = Signal(int)
+    playing_changed = Signal(bool)
+
+    SPEEDS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+
+    def __init__(
+        self,
+        source: FrameSource,
+        pool: DecodePool | None = None,
+        backend: DecodeBackend = DecodeBackend.QT,
+    ):
+        super().__init__()
+        if not len(source):
+            msg = "Nothing to play back"
+            raise ValueError(msg)
+        self.source = source
+        self.backend = backend
+        self.target_size: QSize | None = None
+        self.pool = pool or DecodePool()
+        self.mailbox = FrameMailbox()
+        self.pipeline = DecodePipeline(self.pool, self.mailbox, self.decode, self.deliver, 1)
+        self.frame_pool = FrameBufferPool(self.pool.workers + 2)
+        self.mailbox.on_drop = self.frame_pool.release
+
+        self.index = -1
+        self.speed = 1.0
+        self._playing = False
+        # Monotonic time at which the source time `_origin_timestamp` was shown
+        self._origin_time = 0.0
+        self._origin_timestamp = 0.0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._advance)
+
+        self.show_frame(0)
+
+    @property
+    def playing(self) -> bool:
+        return self._playing
+
+    @property
+    def duration(self) -> float:
+        """Time between the first and last frame, in seconds."""
+        return self.source.timestamp(len(self.source) - 1) - self.source.timestamp(0)
+
+    @property
+    def position(self) -> float:
+        """Time of the current frame since the first frame, in seconds."""
+        return self.source.timestamp(self.index) - self.source.timestamp(0)
+
+    def close(self):
+        self.pause()
+        self.pipeline.close()
+
+    def set_target_size(self, size: QSize | None):
+        self.target_size = size
+
+    def decode(self, data: bytes) -> QImage | None:
+        return decode_jpeg(data, self.backend, self.target_size, self.frame_pool)
+
+    def deliver(self, qimg: QImage, stamps: FrameTimestamps | None = None):
+        if self.mailbox.put(qimg, stamps):
+            self.frame_ready.emit()
+
+    def play(self):
+        if self._playing:
+            return
+        if self.index >= len(self.source) - 1:
+            self.show_frame(0)
+        self._playing = True
+        self._set_origin(self.source.timestamp(self.index))
+        self.playing_changed.emit(True)  # noqa: FBT003
+        self._advance()
+
+    def pause(self):
+        if not self._playing:
+            return
+        self._playing = False
+        self._timer.stop()
+        self.playing_changed.emit(False)  # noqa: FBT003
+
+    def toggle(self):
+        if self._playing:
+            self.pause()
+        else:
+            self.play()
+
+    def set_speed(self, speed: float):
+        """Change the playback speed without jumping.
+
+        Args:
+            speed: Multiple of real time, must be positive
+        """
+        if self._playing:
+            self._set_origin(self._playback_time())
+        self.speed = speed
+        if self._playing:
+            self._advance()
+
+    def seek(self, position: float):
+        """Show the frame at a time.
+
+        Args:
+            position: Seconds since the first frame
+        """
+        timestamp = self.source.timestamp(0) + position
+        self.show_frame(find_frame(self.source, timestamp))
+        if self._playing:
+            self._set_origin(timestamp)
+            self._advance()
+
+    def step(self, frames: int = 1):
+        """Pause and move by a number of frames.
+
+        Args:
+            frames: Frames to move, negative to step back
+        """
+        self.pause()
+        self.show_frame(self.index + frames)
+
+    def show_frame(self, index: int):
+        index = min(max(index, 0), len(self.source) - 1)
+        if index == self.index:
+            return
+        self.index = index
+        now = time.monotonic()
+        self.pipeline.submit(self.source.frame(index), FrameTimestamps(now, now))
+        self.position_changed.emit(index)
+
+    def _set_origin(self, timestamp: float):
+        self._origin_time = time.monotonic()
+        self._origin_timestamp = timestamp
+
+    def _playback_time(self) -> float:
+        return self._origin_timestamp + (time.monotonic() - self._origin_time) * self.speed
+
+    def _advance(self):
+        if not self._playing:
+            return
+        now = self._playback_time()
+        self.show_frame(max(find_frame(self.source, now), self.index))
+        if self.index >= len(self.source) - 1:
+            self.pause()
+            return
+        delay = (self.source.timestamp(self.index + 1) - now) / self.speed
+        self._timer.start(max(0, round(delay * 1000)))
+
+
+class MJPEGPlaybackBar(QWidget):
+    """Transport controls for an MJPEGPlayer: play/pause, frame stepping, scrubbing and speed."""
+
+    close_requested = Signal()
+
+    def __init__(self):
+        super().__init__()
+        self.player: MJPEGPlayer | None = None
+
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        self.step_back = QToolButton()
+        self.step_back.setIcon(qta.icon("mdi6.step-backward"))
+        self.step_back.setToolTip("Previous frame")
+        self.step_back.clicked.connect(lambda: self._step(-1))
+        layout.addWidget(self.step_back)
+
+        self.play_pause = QToolButton()
+        self.play_pause.setIcon(qta.icon("mdi6.play"))
+        self.play_pause.clicked.connect(self._toggle)
+        layout.addWidget(self.play_pause)
+
+        self.step_forward = QToolButton()
+        self.step_forward.setIcon(qta.icon("mdi6.step-forward"))
+        self.step_forward.setToolTip("Next frame")
+        self.step_forward.clicked.connect(lambda: self._step(1))
+        layout.addWidget(self.step_forward)
+
+        self.slider = QSlider(Qt.Orientation.Horizontal)
+        self.slider.sliderMoved.connect(self._scrub)
+        self.slider.actionTriggered.connect(self._slider_action)
+        layout.addWidget(self.slider)
+
+        self.time_label = QLabel()
+        layout.addWidget(self.time_label)
+
+        self.speed = QComboBox()
+        for speed in MJPEGPlayer.SPEEDS:
+            self.speed.addItem(f"{speed:g}x", speed)
+        self.speed.setCurrentIndex(MJPEGPlayer.SPEEDS.index(1.0))
+        self.speed.currentIndexChanged.connect(self._speed_changed)
+        layout.addWidget(self.speed)
+
+        self.close_button = QToolButton()
+        self.close_button.setIcon(qta.icon("mdi6.close"))
+        self.close_button.setToolTip("Back to live")
+        self.close_button.clicked.connect(self.close_requested.emit)
+        layout.addWidget(self.close_button)
+
+    def set_player(self, player: MJPEGPlayer | None):
+        if self.player is not None:
+            self.player.position_changed.disconnect(self._position_changed)
+            self.player.playing_changed.disconnect(self._playing_changed)
+        self.player = player
+        if player is None:
+            return
+        player.position_changed.connect(self._position_changed)
+        player.playing_changed.connect(self._playing_changed)
+        player.set_speed(self.speed.currentData())
+        self.slider.setRange(0, round(player.duration * 1000))
+        self._position_changed()
+        self._playing_changed(player.playing)
+
+    def _step(self, frames: int):
+        if self.player is not None:
+            self.player.step(frames)
+
+    def _toggle(self):
+        if self.player is not None:
+            self.player.toggle()
+
+    def _speed_changed(self):
+        if self.player is not None:
+            self.player.set_speed(self.speed.currentData())
+
+    def _scrub(self, value: int):
+        if self.player is not None:
+            self.player.seek(value / 1000)
+
+    def _slider_action(self, action: int):
+        # Drags already seek through sliderMoved, this handles clicks on the groove and keys
+        if action != QAbstractSlider.SliderAction.SliderMove.value:
+            self._scrub(self.slider.sliderPosition())
+
+    def _position_changed(self):
+        if self.player is None:
+            return
+        if not self.slider.isSliderDown():
+            self.slider.blockSignals(True)  # noqa: FBT003
+            self.slider.setValue(round(self.player.position * 1000))
+            self.slider.blockSignals(False)  # noqa: FBT003
+        self.time_label.setText(f"{format_time(self.player.position)} / {format_time(self.player.duration)}")
+
+    def _playing_changed(self, playing: bool):  # noqa: FBT001
+        self.play_pause.setIcon(qta.icon("mdi6.pause" if playing else "mdi6.play"))
+        self.play_pause.setToolTip("Pause" if playing else "Play")
+
+
+def format_time(seconds: float) -> str:
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes)}:{seconds:04.1f}"
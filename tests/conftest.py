@@ -0,0 +1,37 @@
+"""
+Fixtures shared between test modules
+"""
+
+import socket
+
+import pytest
+
+
+@pytest.fixture
+def blackhole():
+    """Address that neither accepts nor refuses connections, like a robot that is switched off."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(0)
+    address = server.getsockname()
+    # Once the accept queue is full, new connection attempts are ignored
+    clients = []
+    for _ in range(8):
+        client = socket.socket()
+        client.setblocking(False)
+        client.connect_ex(address)
+        clients.append(client)
+    probe = socket.socket()
+    probe.settimeout(0.5)
+    try:
+        probe.connect(address)
+    except TimeoutError:
+        pass
+    else:
+        pytest.skip("Could not fill the accept queue")
+    finally:
+        probe.close()
+    yield address
+    for client in clients:
+        client.close()
+    server.close()
@@ -0,0 +1,247 @@
+"""
+Unit tests for live data plots
+"""
+
+import math
+import threading
+
+import numpy as np
+import pytest
+from kevinbot_desktopclient.components.dataplot import (
+    Decimation,
+    LivePlot,
+    RingBuffer,
+    TelemetrySampler,
+    TimeSeries,
+    decimate_lttb,
+    decimate_minmax,
+)
+
+
+class ManualClock:
+    def __init__(self) -> None:
+        self.time = 0.0
+
+    def __call__(self) -> float:
+        return self.time
+
+
+def sample(sampler: TelemetrySampler, clock: ManualClock, ticks: int, step: float = 0.1) -> None:
+    for _ in range(ticks):
+        sampler.sample()
+        clock.time += step
+
+
+def test_ring_buffer_wraps_without_copying():
+    buffer = RingBuffer(4)
+    for value in range(6):
+        buffer.append(value)
+    view = buffer.view()
+    assert view.tolist() == [2, 3, 4, 5]
+    assert view.flags["C_CONTIGUOUS"]
+    assert view.base is buffer._data
+
+    buffer.drop(3)
+    assert buffer.view().tolist() == [5]
+    buffer.reserve(8)
+    for value in range(6, 12):
+        buffer.append(value)
+    assert buffer.view().tolist() == [5, 6, 7, 8, 9, 10, 11]
+
+
+def test_ring_buffer_keeps_pinned_views():
+    buffer = RingBuffer(8)
+    for value in range(4):
+        buffer.append(value)
+    data = buffer._data
+    key = buffer.pin()
+    pinned = buffer.view()
+
+    # Filling the free space leaves the pinned values alone
+    for value in range(4, 8):
+        buffer.append(value)
+    assert buffer._data is data
+
+    # Overwriting them moves the buffer to a new array
+    buffer.append(8)
+    assert buffer._data is not data
+    assert pinned.tolist() == [0, 1, 2, 3]
+    assert buffer.view().tolist() == [1, 2, 3, 4, 5, 6, 7, 8]
+
+    buffer.unpin(key)
+    data = buffer._data
+    buffer.append(9)
+    assert buffer._data is data
+
+
+def test_time_series_retention():
+    series = TimeSeries(retention=1.0, capacity=2)
+    for index in range(100):
+        series.append(index * 0.1, index)
+    x, y = series.views()
+    assert x[-1] - x[0] <= 1.0
+    assert y.tolist() == list(range(100 - len(y), 100))
+
+    series.retention = 0.5
+    series.trim()
+    assert len(series) == 6
+
+
+@pytest.mark.usefixtures("qtbot")
+def test_live_plot_history():
+    clock = ManualClock()
+    plot = LivePlot(retention=10, sampler=TelemetrySampler(clock=clock), sample_disabled=True)
+    plot.timer.stop()
+    plot.sampler.timer.stop()
+    plot.add_data_source("ramp", lambda x: x)
+    sample(plot.sampler, clock, 500)
+    x, y = plot.series["ramp"].views()
+    assert x[-1] == pytest.approx(49.9)
+    assert x[0] >= x[-1] - 10
+    assert (x == y).all()
+
+    plot.set_retention(1)
+    assert len(plot.series["ramp"]) == 11
+    plot.clear_data()
+    assert len(plot._window("ramp")[0]) == 0
+    sample(plot.sampler, clock, 1)
+    assert len(plot._window("ramp")[0]) == 1
+
+
+@pytest.mark.usefixtures("qtbot")
+def test_disabled_sources_are_not_sampled():
+    calls = []
+    plot = LivePlot()
+    plot.timer.stop()
+    plot.sampler.timer.stop()
+    plot.add_data_source("hidden", lambda x: calls.append(x) or x)
+    plot.add_data_source("shown", lambda x: x, enabled=True)
+    assert "hidden" not in plot.plot_data_items
+    assert "shown" in plot.plot_data_items
+
+    for _ in range(5):
+        plot.sampler.sample()
+    assert calls == []
+    assert len(plot.series["shown"]) == 5
+
+    plot.edit_pen_color("hidden", "r")
+    plot.edit_enabled("hidden", enabled=True)
+    assert plot.plot_data_items["hidden"].isVisible()
+    plot.sampler.sample()
+    assert len(calls) == 1
+
+    # Disabled again, but its history is kept up to date
+    plot.edit_enabled("hidden", enabled=False)
+    assert not plot.plot_data_items["hidden"].isVisible()
+    plot.set_sample_disabled(True)
+    plot.sampler.sample()
+    assert len(calls) == 2
+
+    plot.remove_data_source("hidden")
+    assert "hidden" not in plot.plot_data_items
+    plot.sampler.sample()
+    assert len(calls) == 2
+
+
+@pytest.mark.usefixtures("qtbot")
+def test_plots_share_samples():
+    calls = []
+    clock = ManualClock()
+    sampler = TelemetrySampler(clock=clock)
+    sampler.timer.stop()
+    plots = [LivePlot(retention, sampler=sampler) for retention in (10, 60)]
+    for plot in plots:
+        plot.timer.stop()
+        plot.add_data_source("ramp", lambda x: calls.append(x) or x, enabled=True)
+    assert sampler.retention == 60
+
+    sample(sampler, clock, 1000, step=0.125)
+    # Each source is sampled once per tick, whatever the number of plots
+    assert len(calls) == 1000
+    assert plots[0].series is plots[1].series
+    assert len(plots[0]._window("ramp")[0]) == 81
+    assert len(plots[1]._window("ramp")[0]) == 481
+
+    # Still needed by the other plot
+    plots[1].edit_enabled("ramp", enabled=False)
+    assert sampler.is_sampled("ramp")
+    plots[0].close()
+    assert not sampler.is_sampled("ramp")
+    assert sampler.retention == 60
+
+
+def test_event_driven_sampling(qtbot):
+    clock = ManualClock()
+    sampler = TelemetrySampler(event_driven=True, clock=clock)
+    assert not sampler.timer.isActive()
+    plot = LivePlot(sampler=sampler)
+    plot.timer.stop()
+    plot.add_data_source("time", lambda x: x, enabled=True)
+
+    # Samples are stamped when they are recorded, wherever that happens
+    for time in (0.5, 0.52, 3.0):
+        clock.time = time
+        thread = threading.Thread(target=sampler.record)
+        thread.start()
+        thread.join()
+    qtbot.waitUntil(lambda: len(sampler.series["time"]) == 3)
+    x, y = sampler.series["time"].views()
+    assert x.tolist() == [0.5, 0.52, 3.0]
+    assert (x == y).all()
+
+    sampler.set_event_driven(False)
+    assert sampler.timer.isActive()
+    sampler.set_interval(10)
+    assert sampler.timer.interval() == 10
+    assert sampler.timer.isActive()
+    sampler.record()
+    assert len(sampler.series["time"]) == 3
+    plot.close()
+
+
+def test_decimate_minmax_keeps_spikes_and_gaps():
+    x = np.arange(10000, dtype=np.float64)
+    y = np.zeros(10000)
+    y[1234] = 100
+    y[5678] = -100
+    y[9000] = np.nan
+    dx, dy = decimate_minmax(x, y, 100)
+    assert len(dx) <= 300
+    assert np.all(np.diff(dx) > 0)
+    assert 100 in dy
+    assert -100 in dy
+    assert np.isnan(dy).any()
+
+    # Short series are left alone
+    assert len(decimate_minmax(x[:250], y[:250], 100)[0]) == 250
+
+
+def test_decimate_lttb():
+    x = np.arange(10000, dtype=np.float64)
+    y = np.sin(x / 100)
+    y[4321] = 50
+    dx, dy = decimate_lttb(x, y, 200)
+    assert len(dx) == 200
+    assert dx[0] == 0
+    assert dx[-1] == 9999
+    assert np.all(np.diff(dx) > 0)
+    assert 50 in dy
+
+
+def test_live_plot_decimates_long_history(qtbot):
+    plot = LivePlot(retention=1000, decimation=Decimation.MINMAX)
+    qtbot.addWidget(plot)
+    plot.timer.stop()
+    plot.resize(600, 300)
+    plot.show()
+    plot.sampler.timer.stop()
+    plot.add_data_source("sine", math.sin, enabled=True)
+    for _ in range(5000):
+        plot.sampler.sample()
+    plot.update_plot()
+    item = plot.plot_data_items["sine"]
+    qtbot.waitUntil(lambda: item.xData is not None and len(item.xData) < 5000)
+
+    plot.set_decimation(Decimation.NONE)
+    assert len(item.xData) == 5000
+    plot.close()
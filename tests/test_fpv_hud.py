@@ -0,0 +1,67 @@
+"""
+Unit tests for the FPV telemetry HUD
+"""
+
+from kevinbot_desktopclient.ui.fpv_hud import HUDState, TelemetryHUD
+from kevinbot_desktopclient.ui.mjpeg import MJPEGViewer
+from PySide6.QtCore import QRect
+from PySide6.QtGui import QImage, QPainter
+
+
+def paint(hud: TelemetryHUD) -> QImage:
+    image = QImage(400, 300, QImage.Format.Format_ARGB32_Premultiplied)
+    painter = QPainter(image)
+    hud.paint(painter, image.rect())
+    painter.end()
+    return image
+
+
+def test_hud_redraws_only_changed_values(qtbot):
+    state = HUDState(connected=True, voltages=[12.01, 11.5], powers=(0.5, -0.25))
+    hud = TelemetryHUD(lambda: state)
+    changes = []
+    hud.changed.connect(lambda: changes.append(True))
+
+    hud.refresh()
+    paint(hud)
+    assert hud.rect(QRect(10, 20, 400, 300)).topLeft().toTuple() == (10 + hud.MARGIN, 20 + hud.MARGIN)
+    assert hud.size().height() == hud.PADDING * 2 + hud.ROW_HEIGHT * 5
+    static = hud._static
+    assert hud.redraws == 1
+
+    # Changes that don't show up in the text are ignored
+    state.voltages = [12.02, 11.5]
+    hud.refresh()
+    paint(hud)
+    assert len(changes) == 1
+    assert hud.redraws == 1
+
+    state.enabled = True
+    hud.refresh()
+    paint(hud)
+    assert len(changes) == 2
+    assert hud.redraws == 2
+    assert hud._static is static
+
+    # A new battery adds a row
+    state.voltages = [12.0, 11.5, 11.0]
+    hud.refresh()
+    paint(hud)
+    assert hud._static is not static
+    assert hud.size().height() == hud.PADDING * 2 + hud.ROW_HEIGHT * 6
+
+
+def test_viewer_overlay(qtbot):
+    viewer = MJPEGViewer("http://127.0.0.1:9/video_feed")
+    qtbot.addWidget(viewer)
+    hud = TelemetryHUD(HUDState)
+    viewer.set_overlay(hud)
+    hud.start()
+    viewer.update_image(QImage(320, 240, QImage.Format.Format_RGBX8888))
+    viewer.resize(640, 480)
+    viewer.show()
+    qtbot.waitUntil(lambda: hud.redraws == 1)
+
+    viewer.set_overlay(None)
+    hud.stop()
+    viewer.mjpeg_thread.stop()
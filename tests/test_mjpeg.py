@@ -0,0 +1,571 @@
+"""
+Unit tests for the MJPEG stream parser and viewer
+"""
+
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import pytest
+from kevinbot_desktopclient.mjpeg_server import MJPEGTestServer
+from kevinbot_desktopclient.ui.mjpeg import (
+    DecodeBackend,
+    DecodePipeline,
+    DecodePool,
+    FrameBufferPool,
+    FrameMailbox,
+    FramePacer,
+    FrameStats,
+    FrameTimestamps,
+    MJPEGFrameParser,
+    MJPEGReader,
+    MJPEGStreamThread,
+    MJPEGViewer,
+    decode_jpeg,
+    jpeg_scale_factor,
+    multipart_boundary,
+)
+from PIL import Image
+from PySide6.QtCore import QRect, QSize
+from PySide6.QtGui import QImage
+
+
+def make_jpeg(color, size=(32, 24), comment=b"") -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "JPEG", comment=comment)
+    return buffer.getvalue()
+
+
+def make_stream(frames: list[bytes], *, content_length=False) -> bytes:
+    parts = []
+    for frame in frames:
+        length = f"Content-Length: {len(frame)}\r\n".encode() if content_length else b""
+        parts.append(b"--frame\r\nContent-Type: image/jpeg\r\n" + length + b"\r\n" + frame + b"\r\n")
+    return b"".join(parts)
+
+
+def split_randomly(data: bytes, rng: random.Random, max_chunk: int) -> list[bytes]:
+    chunks = []
+    pos = 0
+    while pos < len(data):
+        size = rng.randint(1, max_chunk)
+        chunks.append(data[pos : pos + size])
+        pos += size
+    return chunks
+
+
+def test_parser_single_chunk_emits_every_frame():
+    frames = [make_jpeg(color) for color in ("red", "green", "blue")]
+    parser = MJPEGFrameParser()
+    assert parser.feed(make_stream(frames)) == frames
+
+
+def test_parser_random_boundaries():
+    rng = random.Random(3)
+    frames = [make_jpeg((rng.randint(0, 255), 0, 0)) for _ in range(20)]
+    stream = make_stream(frames)
+
+    for max_chunk in (1, 2, 7, 1024, 65536):
+        parser = MJPEGFrameParser()
+        received = []
+        for chunk in split_randomly(stream, rng, max_chunk):
+            received.extend(parser.feed(chunk))
+        assert received == frames
+
+
+def test_parser_discards_garbage_and_reset():
+    frame = make_jpeg("white")
+    parser = MJPEGFrameParser()
+    assert parser.feed(b"\x00\xff" * 100) == []
+    assert parser.feed(frame[:10]) == []
+    parser.reset()
+    assert parser.feed(frame[10:]) == []
+    assert parser.feed(frame) == [frame]
+    assert len(parser._buffer) == 0
+
+
+def test_multipart_boundary():
+    assert multipart_boundary("multipart/x-mixed-replace; boundary=frame") == b"frame"
+    assert multipart_boundary('multipart/x-mixed-replace;boundary="--frame"') == b"frame"
+    assert multipart_boundary("image/jpeg") is None
+
+
+def test_parser_content_length_random_boundaries():
+    rng = random.Random(5)
+    frames = [make_jpeg((0, rng.randint(0, 255), 0)) for _ in range(20)]
+    stream = make_stream(frames, content_length=True)
+
+    for max_chunk in (1, 3, 64, 65536):
+        parser = MJPEGFrameParser(b"frame")
+        received = []
+        for chunk in split_randomly(stream, rng, max_chunk):
+            received.extend(parser.feed(chunk))
+        assert received == frames
+
+
+def test_parser_content_length_ignores_embedded_eoi():
+    frame = make_jpeg("red", comment=b"thumb\xff\xd9nail")
+
+    assert MJPEGFrameParser().feed(make_stream([frame])) != [frame]
+    assert MJPEGFrameParser(b"frame").feed(make_stream([frame], content_length=True)) == [frame]
+
+
+def test_parser_frame_headers():
+    frames = [make_jpeg(color) for color in ("red", "green")]
+    stream = make_stream(frames[:1], content_length=True).replace(b"\r\n\r\n", b"\r\nX-Timestamp: 12.5\r\n\r\n", 1)
+    parser = MJPEGFrameParser(b"frame")
+    assert parser.feed(stream + make_stream(frames[1:])) == frames
+    assert parser.frame_headers[0]["x-timestamp"] == "12.5"
+    assert "x-timestamp" not in parser.frame_headers[1]
+
+    assert MJPEGFrameParser().feed(frames[0]) == [frames[0]]
+
+
+def test_parser_multipart_without_length_falls_back_to_markers():
+    frames = [make_jpeg(color) for color in ("red", "green")]
+    parser = MJPEGFrameParser(b"frame")
+    stream = make_stream(frames[:1]) + make_stream(frames[1:], content_length=True)
+    assert parser.feed(stream) == frames
+
+
+@pytest.mark.usefixtures("qtbot")
+@pytest.mark.parametrize("backend", list(DecodeBackend))
+def test_decode_backends(backend):
+    qimg = decode_jpeg(make_jpeg((255, 0, 0), (64, 48)), backend)
+    assert qimg is not None
+    assert (qimg.width(), qimg.height()) == (64, 48)
+    assert qimg.pixelColor(32, 24).red() > 240
+
+    assert decode_jpeg(b"\xff\xd8garbage\xff\xd9", backend) is None
+
+
+@pytest.mark.usefixtures("qtbot")
+def test_frame_mailbox_latest_wins():
+    mailbox = FrameMailbox()
+    first = decode_jpeg(make_jpeg("red"))
+    second = decode_jpeg(make_jpeg("blue"))
+
+    assert mailbox.put(first) is True
+    assert mailbox.put(second) is False
+    assert mailbox.dropped == 1
+    assert mailbox.take() is second
+    assert mailbox.is_empty()
+    assert mailbox.take() is None
+
+    mailbox.count_dropped(2)
+    assert mailbox.dropped == 3
+
+    replaced = []
+    mailbox.on_drop = replaced.append
+    mailbox.put(first)
+    mailbox.put(second)
+    assert replaced == [first]
+
+
+def test_viewer_shows_error_frame(qtbot):
+    viewer = MJPEGViewer("http://127.0.0.1:9/video_feed")
+    qtbot.addWidget(viewer)
+    with qtbot.waitSignal(viewer.frame_displayed, timeout=10000):
+        pass
+    assert viewer.current_pixmap is not None
+    assert viewer.dropped_frames == 0
+    assert viewer.mjpeg_thread.stop()
+
+
+def test_jpeg_scale_factor():
+    full = QSize(1280, 720)
+    assert jpeg_scale_factor(full, None) == 1
+    assert jpeg_scale_factor(full, QSize(1280, 720)) == 1
+    assert jpeg_scale_factor(full, QSize(640, 360)) == 2
+    assert jpeg_scale_factor(full, QSize(400, 200)) == 2
+    assert jpeg_scale_factor(full, QSize(320, 100)) == 4
+    assert jpeg_scale_factor(full, QSize(100, 50)) == 8
+    # Only the aspect-fitted rect has to be covered
+    assert jpeg_scale_factor(full, QSize(640, 600)) == 2
+    assert jpeg_scale_factor(full, QSize(300, 900)) == 4
+    assert jpeg_scale_factor(QSize(1920, 1080), QSize(640, 900)) == 2
+    assert jpeg_scale_factor(QSize(640, 480), QSize(1280, 100)) == 4
+
+
+@pytest.mark.usefixtures("qtbot")
+@pytest.mark.parametrize("backend", list(DecodeBackend))
+def test_decode_reduced_resolution(backend):
+    data = make_jpeg((0, 0, 255), (640, 480))
+    assert decode_jpeg(data, backend, QSize(300, 200)).size() == QSize(320, 240)
+    assert decode_jpeg(data, backend, QSize(150, 100)).size() == QSize(160, 120)
+    assert decode_jpeg(data, backend, QSize(800, 600)).size() == QSize(640, 480)
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_pipeline_delivers_in_order():
+    rng = random.Random(1)
+    delays = [rng.random() / 100 for _ in range(30)]
+
+    def decode(data):
+        time.sleep(delays[data])
+        return data
+
+    delivered = []
+    pipeline = DecodePipeline(DecodePool(3), FrameMailbox(), decode, lambda image, _: delivered.append(image), depth=30)
+    for index in range(30):
+        pipeline.submit(index)
+    wait_until(lambda: len(delivered) == 30)
+    assert delivered == list(range(30))
+    assert pipeline.occupancy() == {"queued": 0, "decoding": 0, "reordering": 0}
+    pipeline.close()
+
+
+def test_pipeline_drops_oldest_and_corrupt_frames():
+    release = threading.Event()
+
+    def decode(data):
+        release.wait(5)
+        return None if data == 4 else data
+
+    mailbox = FrameMailbox()
+    delivered = []
+    pipeline = DecodePipeline(DecodePool(1), mailbox, decode, lambda image, _: delivered.append(image), depth=2)
+    pipeline.submit(0)
+    wait_until(lambda: pipeline.occupancy()["decoding"] == 1)
+    for index in range(1, 5):
+        pipeline.submit(index)
+    assert pipeline.occupancy()["queued"] == 2
+    assert mailbox.dropped == 2
+
+    release.set()
+    wait_until(lambda: pipeline.occupancy() == {"queued": 0, "decoding": 0, "reordering": 0})
+    assert delivered == [0, 3]
+    assert pipeline.corrupt == 1
+    pipeline.close()
+
+
+def test_pipeline_survives_decode_errors():
+    def decode(data):
+        if data == 0:
+            raise MemoryError
+        return data
+
+    delivered = []
+    pipeline = DecodePipeline(DecodePool(1), FrameMailbox(), decode, lambda image, _: delivered.append(image), depth=2)
+    pipeline.submit(0)
+    wait_until(lambda: pipeline.corrupt == 1)
+    # The only worker is still running
+    pipeline.submit(1)
+    wait_until(lambda: delivered == [1])
+    pipeline.close()
+
+
+@pytest.mark.usefixtures("qtbot")
+def test_pipeline_waits_for_viewer():
+    mailbox = FrameMailbox()
+    decoded = []
+
+    def decode(data):
+        decoded.append(data)
+        return decode_jpeg(make_jpeg("red"))
+
+    pipeline = DecodePipeline(DecodePool(1), mailbox, decode, mailbox.put, depth=1)
+    pipeline.submit(0)
+    wait_until(lambda: not mailbox.is_empty())
+
+    # The viewer hasn't taken frame 0, so frame 1 is replaced by frame 2 without being decoded
+    pipeline.submit(1)
+    pipeline.submit(2)
+    time.sleep(0.05)
+    assert decoded == [0]
+
+    mailbox.take()
+    wait_until(lambda: not mailbox.is_empty())
+    assert decoded == [0, 2]
+    assert mailbox.dropped == 1
+    pipeline.close()
+
+
+class OneFrameHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # noqa: N802
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        self.end_headers()
+        self.wfile.write(make_stream([make_jpeg("red")], content_length=True))
+        self.wfile.flush()
+        # Either stall the stream or end it
+        self.server.release.wait(10)  # type: ignore
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def one_frame_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OneFrameHandler)
+    server.daemon_threads = True
+    server.release = threading.Event()  # type: ignore
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.release.set()  # type: ignore
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.usefixtures("qtbot")
+def test_stream_stop_interrupts_blocked_read(one_frame_server):
+    thread = MJPEGStreamThread(f"http://127.0.0.1:{one_frame_server.server_port}/video_feed")
+    thread.start()
+    wait_until(lambda: thread.mailbox.take() is not None)
+
+    # The server is now stalled, stopping must not wait for the read timeout
+    assert thread.stop()
+    assert thread.last_shutdown_time < MJPEGReader.READ_TIMEOUT / 2
+    thread.pipeline.close()
+
+
+@pytest.mark.usefixtures("qtbot")
+def test_stream_stop_while_connecting(blackhole):
+    thread = MJPEGStreamThread(f"http://{blackhole[0]}:{blackhole[1]}/video_feed")
+    thread.start()
+    time.sleep(0.2)
+    assert thread.stop()
+    assert thread.last_shutdown_time < MJPEGReader.CONNECT_TIMEOUT + 0.5
+    thread.pipeline.close()
+
+
+@pytest.mark.usefixtures("qtbot")
+def test_stream_stop_when_refused():
+    thread = MJPEGStreamThread("http://127.0.0.1:9/video_feed")
+    thread.start()
+    wait_until(lambda: thread.reconnects >= 1)
+    assert thread.stop()
+    assert thread.last_shutdown_time < 0.5
+    thread.pipeline.close()
+
+
+@pytest.mark.usefixtures("qtbot")
+def test_stream_reconnects(one_frame_server):
+    one_frame_server.release.set()
+    thread = MJPEGStreamThread(f"http://127.0.0.1:{one_frame_server.server_port}/video_feed")
+    thread.start()
+    wait_until(lambda: thread.last_reconnect_time is not None)
+    assert thread.reconnects >= 1
+    assert thread.stop()
+    thread.pipeline.close()
+
+
+def test_viewer_target_rect(qtbot):
+    viewer = MJPEGViewer("http://127.0.0.1:9/video_feed")
+    viewer.mjpeg_thread.stop()
+    qtbot.addWidget(viewer)
+    viewer.resize(400, 400)
+    viewer.show()
+    qtbot.waitExposed(viewer)
+
+    viewer.update_image(decode_jpeg(make_jpeg("red", (640, 480))))
+    assert viewer.target_rect == QRect(0, 50, 400, 300)
+    assert viewer.minimumHeight() == 150
+
+    # Same aspect ratio at a lower decode resolution keeps the layout
+    viewer.update_image(decode_jpeg(make_jpeg("red", (320, 240))))
+    assert viewer.target_rect == QRect(0, 50, 400, 300)
+
+    viewer.resize(600, 300)
+    assert viewer._resizing
+    assert viewer.target_rect == QRect(100, 0, 400, 300)
+    qtbot.waitUntil(lambda: not viewer._resizing)
+
+
+@pytest.mark.usefixtures("qtbot")
+def test_frame_buffer_pool_reuse_and_exhaustion():
+    pool = FrameBufferPool(2)
+    size = QSize(64, 48)
+    first = pool.acquire(size)
+    second = pool.acquire(size)
+    assert pool.available() == 0
+
+    temporary = pool.acquire(size)
+    assert pool.exhausted == 1
+    assert temporary is not first and temporary is not second
+
+    pool.release(first)
+    pool.release(first)
+    pool.release(temporary)
+    assert pool.available() == 2
+    assert pool.acquire(size) is temporary
+    assert pool.exhausted == 1
+
+    # A new resolution replaces the buffers, old ones are not taken back
+    assert pool.acquire(QSize(32, 24)).size() == QSize(32, 24)
+    pool.release(second)
+    assert pool.available() == 1
+
+
+@pytest.mark.usefixtures("qtbot")
+def test_decode_into_pool():
+    pool = FrameBufferPool(1)
+    data = make_jpeg((0, 255, 0), (64, 48))
+
+    frame = decode_jpeg(data, DecodeBackend.PIL, pool=pool)
+    assert frame.size() == QSize(64, 48)
+    assert frame.pixelColor(32, 24).green() > 240
+    pool.release(frame)
+
+    assert decode_jpeg(make_jpeg((255, 0, 0), (64, 48)), DecodeBackend.PIL, pool=pool) is frame
+    assert frame.pixelColor(32, 24).red() > 240
+    assert pool.exhausted == 0
+
+    # A truncated frame gives its buffer back
+    pool.release(frame)
+    assert decode_jpeg(data[: len(data) // 2], DecodeBackend.PIL, pool=pool) is None
+    assert pool.available() == 1
+
+
+def test_frame_stats():
+    stats = FrameStats(window=100, fps_window=1.0)
+    for index in range(100):
+        start = index / 50
+        stats.record(FrameTimestamps(start, start + 0.001, start + 0.011, start + 0.012, start + 0.012 + index / 10000))
+
+    summary = stats.summary()
+    assert summary["Decode"]["p50"] == pytest.approx(10)
+    assert summary["Paint"]["p50"] == pytest.approx(4.9)
+    assert summary["Paint"]["p95"] == pytest.approx(9.4)
+    assert summary["Paint"]["max"] == pytest.approx(9.9)
+    assert summary["Total"]["mean"] == pytest.approx(16.95)
+
+    last = 99 / 50 + 0.012 + 99 / 10000
+    assert stats.fps(last) == pytest.approx(50, rel=0.05)
+    assert stats.fps(last + 0.5) == pytest.approx(25, rel=0.1)
+    assert stats.fps(last + 2) == 0
+
+
+def test_stream_records_frame_timings(qtbot, one_frame_server):
+    viewer = MJPEGViewer(f"http://127.0.0.1:{one_frame_server.server_port}/video_feed")
+    qtbot.addWidget(viewer)
+    viewer.show()
+    qtbot.waitUntil(lambda: "Total" in viewer.stats.summary(), timeout=5000)
+    assert viewer.mjpeg_thread.stop()
+
+    stages = viewer.stats.summary()
+    assert set(stages) == {"Extract", "Decode", "Deliver", "Pacing", "Paint", "Total"}
+    assert stages["Pacing"]["max"] == 0
+    assert all(stage["p50"] >= 0 for stage in stages.values())
+    assert stages["Total"]["max"] >= stages["Decode"]["max"]
+
+
+@pytest.fixture
+def test_server():
+    server = MJPEGTestServer(fps=30, size=(160, 120))
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_stream_latency(qtbot, test_server):
+    viewer = MJPEGViewer(test_server.url)
+    qtbot.addWidget(viewer)
+    viewer.show()
+    qtbot.waitUntil(lambda: len(viewer.stats._durations["Latency"]) >= 10, timeout=5000)
+    assert viewer.mjpeg_thread.stop()
+
+    latency = viewer.stats.summary()["Latency"]
+    assert 0 < latency["p50"] < 500
+    assert latency["p50"] >= viewer.stats.summary()["Total"]["p50"]
+
+
+@pytest.mark.usefixtures("qtbot")
+def test_stream_chunked():
+    server = MJPEGTestServer(fps=60, size=(160, 120), chunk_size=97, variety=3)
+    server.start()
+    thread = MJPEGStreamThread(server.url)
+    received = []
+    thread.add_sink(lambda data, _stamps: received.append(data))
+    thread.start()
+    try:
+        wait_until(lambda: len(received) >= 6)
+    finally:
+        assert thread.stop()
+        thread.pipeline.close()
+        server.stop()
+    assert received[:6] == [server.frame(index) for index in range(6)]
+
+
+def test_frame_pacer():
+    pacer = FramePacer()
+    frames = [QImage(4, 4, QImage.Format.Format_RGB888) for _ in range(30)]
+
+    # Steady arrival needs no buffering
+    for index in range(20):
+        assert pacer.push(frames[index], FrameTimestamps(received=index / 30), 0) is None
+        assert pacer.pop()[0] is frames[index]
+    assert pacer.interval == pytest.approx(1 / 30)
+    assert pacer.target_depth == 1
+    assert pacer.pop() is None
+    assert pacer.underruns == 1
+
+    # Bursts of 3 frames every 100 ms
+    pacer = FramePacer()
+    for burst in range(30):
+        for _ in range(3):
+            pacer.push(frames[0], FrameTimestamps(received=burst / 10), 0)
+        pacer.pop()
+        pacer.pop()
+    assert pacer.target_depth > 1
+    assert pacer.next_interval() > pacer.interval
+
+    dropped = [pacer.push(frame, None, 100) for frame in frames[:5]]
+    assert len(pacer) == FramePacer.MAX_DEPTH
+    assert dropped[-1] is not None
+    assert len(pacer.clear()) == FramePacer.MAX_DEPTH
+    assert pacer.pop() is None
+
+
+def test_viewer_pacing(qtbot, test_server):
+    viewer = MJPEGViewer(test_server.url)
+    qtbot.addWidget(viewer)
+    viewer.set_pacing(True)
+    assert viewer.mjpeg_thread.frame_pool.count == viewer.mjpeg_thread.pool.workers + 2 + FramePacer.MAX_DEPTH
+    viewer.show()
+    qtbot.waitUntil(lambda: len(viewer.stats._durations["Pacing"]) >= 20, timeout=5000)
+    assert viewer.pacer.interval == pytest.approx(1 / 30, rel=0.5)
+    assert viewer.stats.summary()["Pacing"]["max"] > 0
+
+    viewer.set_pacing(False)
+    assert viewer.pacer is None
+    assert viewer.mjpeg_thread.frame_pool.count == viewer.mjpeg_thread.pool.workers + 2
+    assert viewer.mjpeg_thread.stop()
+
+
+def test_hidden_viewer_suspends(qtbot, test_server):
+    viewer = MJPEGViewer(test_server.url, disconnect_after=0.5)
+    qtbot.addWidget(viewer)
+    # Like instant replay, this sink doesn't keep a hidden stream connected
+    received = []
+    viewer.mjpeg_thread.add_sink(lambda data, _: received.append(data), keep_connected=False)
+    assert viewer.mjpeg_thread.has_sinks()
+    assert not viewer.mjpeg_thread.has_sinks(keep_connected=True)
+    viewer.resize(320, 240)
+    viewer.show()
+    qtbot.waitUntil(lambda: viewer.current_pixmap is not None, timeout=5000)
+    assert not viewer.suspended
+
+    viewer.hide()
+    viewer.check_visibility()
+    assert viewer.suspended
+    assert viewer.mjpeg_thread.suspended
+    skipped = viewer.mjpeg_thread.skipped
+    qtbot.waitUntil(lambda: viewer.mjpeg_thread.skipped > skipped + 5, timeout=5000)
+    qtbot.waitUntil(lambda: not viewer.mjpeg_thread.isRunning(), timeout=5000)
+
+    displayed = []
+    viewer.frame_displayed.connect(lambda: displayed.append(True))
+    viewer.show()
+    qtbot.waitUntil(lambda: not viewer.suspended)
+    assert viewer.mjpeg_thread.isRunning()
+    qtbot.waitUntil(lambda: len(displayed) >= 5, timeout=5000)
+    assert viewer.mjpeg_thread.stop()
@@ -0,0 +1,80 @@
+"""
+Unit tests for the multi-stream FPV mosaic
+"""
+
+import time
+
+import pytest
+from kevinbot_desktopclient.mjpeg_server import MJPEGTestServer
+from kevinbot_desktopclient.ui.mjpeg import FrameRateLimiter, MJPEGReader
+from kevinbot_desktopclient.ui.mjpeg_mosaic import MJPEGMosaic, MosaicLayout
+from PySide6.QtCore import QPoint, Qt
+
+
+@pytest.fixture
+def servers():
+    servers = [MJPEGTestServer(fps=30, size=(320, 240)) for _ in range(3)]
+    for server in servers:
+        server.start()
+    yield servers
+    for server in servers:
+        server.stop()
+
+
+def test_mosaic_shares_pool_and_focus(qtbot, servers):
+    mosaic = MJPEGMosaic([server.url for server in servers])
+    qtbot.addWidget(mosaic)
+    mosaic.resize(800, 600)
+    mosaic.show()
+
+    assert all(viewer.mjpeg_thread.pool is mosaic.pool for viewer in mosaic.viewers)
+    qtbot.waitUntil(lambda: all(viewer.current_pixmap is not None for viewer in mosaic.viewers), timeout=5000)
+    assert [viewer.mjpeg_thread.max_fps for viewer in mosaic.viewers] == [None, 10.0, 10.0]
+    assert mosaic.viewers[1].mjpeg_thread.target_size == mosaic.viewers[1].size() * 0.5
+
+    with qtbot.waitSignal(mosaic.focus_changed):
+        qtbot.mouseClick(mosaic.viewers[2], Qt.MouseButton.LeftButton, pos=QPoint(5, 5))
+    assert mosaic.focused == 2
+    assert [viewer.mjpeg_thread.max_fps for viewer in mosaic.viewers] == [10.0, 10.0, None]
+
+    mosaic.stop()
+
+
+def test_mosaic_layouts(qtbot, servers):
+    mosaic = MJPEGMosaic([server.url for server in servers], layout=MosaicLayout.PICTURE_IN_PICTURE)
+    qtbot.addWidget(mosaic)
+    mosaic.resize(800, 600)
+    mosaic.show()
+
+    assert mosaic.viewers[0].geometry() == mosaic.rect()
+    for inset in mosaic.viewers[1:]:
+        assert inset.width() == 200
+        assert mosaic.rect().contains(inset.geometry())
+    assert not mosaic.viewers[1].geometry().intersects(mosaic.viewers[2].geometry())
+
+    mosaic.set_layout_mode(MosaicLayout.MOSAIC)
+    assert mosaic.viewers[0].geometry().size() == mosaic.viewers[2].geometry().size()
+    assert not mosaic.viewers[0].geometry().intersects(mosaic.viewers[1].geometry())
+
+    mosaic.stop()
+
+
+def test_mosaic_stops_streams_in_parallel(qtbot, blackhole):
+    mosaic = MJPEGMosaic([f"http://{blackhole[0]}:{blackhole[1]}/video_feed"] * 3)
+    qtbot.addWidget(mosaic)
+    time.sleep(0.2)
+
+    # Every stream is stuck connecting, stopping them one by one would wait for each connect timeout
+    start = time.monotonic()
+    mosaic.stop()
+    assert time.monotonic() - start < MJPEGReader.CONNECT_TIMEOUT + 0.5
+    assert all(viewer.mjpeg_thread.isFinished() for viewer in mosaic.viewers)
+
+
+def test_rate_limiter():
+    limiter = FrameRateLimiter()
+    assert not any(limiter.skip(index / 30) for index in range(30))
+
+    limiter.max_fps = 10
+    submitted = [index for index in range(90) if not limiter.skip(1 + index / 30)]
+    assert len(submitted) == 30
@@ -0,0 +1,77 @@
+"""
+Unit tests for FPV decoding in a child process
+"""
+
+import time
+
+import pytest
+from kevinbot_desktopclient.mjpeg_server import MJPEGTestServer, render_frame
+from kevinbot_desktopclient.ui.mjpeg import FrameTimestamps, MJPEGViewer
+from kevinbot_desktopclient.ui.mjpeg_process import FrameTooLargeError, MJPEGProcessStream, SharedFrameBuffer
+from PySide6.QtCore import QSize
+
+
+def test_shared_frame_buffer():
+    frames = SharedFrameBuffer(160 * 120 * 4)
+    frames.create()
+    try:
+        slots = [frames.acquire() for _ in range(frames.SLOTS)]
+        assert sorted(slots) == list(range(frames.SLOTS))
+        assert frames.acquire() is None
+        for slot in slots[1:]:
+            frames.free(slot)
+
+        # Not ready yet
+        assert frames.read(slots[0]) is None
+        size = frames.decode_into(slots[0], render_frame(0, (160, 120)), QSize(80, 60))
+        assert size == QSize(80, 60)
+        frames.publish(slots[0], 1, size, FrameTimestamps(1.0, 2.0, 3.0, captured=0.5))
+
+        frame, stamps = frames.read(slots[0])  # type: ignore
+        assert frame.size() == QSize(80, 60)
+        assert (stamps.received, stamps.extracted, stamps.decoded, stamps.captured) == (1.0, 2.0, 3.0, 0.5)
+        assert frames.available() == frames.SLOTS - 1
+        frames.release(frame)
+        assert frames.available() == frames.SLOTS
+
+        # Frames too large for a slot are rejected, unless they are reduced enough to fit
+        slot = frames.acquire()
+        with pytest.raises(FrameTooLargeError):
+            frames.decode_into(slot, render_frame(0, (320, 240)), None)  # type: ignore
+        assert frames.decode_into(slot, render_frame(0, (320, 240)), QSize(160, 120)) == QSize(160, 120)  # type: ignore
+        assert frames.decode_into(slot, b"\xff\xd8garbage\xff\xd9", None) is None  # type: ignore
+    finally:
+        frames.close()
+    assert frames.shm is None
+
+
+def test_process_viewer(qtbot):
+    server = MJPEGTestServer(fps=30, size=(160, 120))
+    server.start()
+    viewer = MJPEGViewer(server.url, process=True)
+    qtbot.addWidget(viewer)
+    viewer.show()
+    assert isinstance(viewer.mjpeg_thread, MJPEGProcessStream)
+    # Decoding happens in the child, there is no pipeline and no decode workers are started here
+    assert viewer.mjpeg_thread.pipeline is None
+    assert not viewer.mjpeg_thread.pool._threads
+
+    displayed = 0
+
+    def count():
+        nonlocal displayed
+        displayed += 1
+
+    viewer.frame_displayed.connect(count)
+    # Process startup includes importing Qt and PIL
+    qtbot.waitUntil(lambda: displayed >= 10, timeout=20000)
+    assert viewer.current_pixmap is not None
+    assert viewer.current_pixmap.size() == QSize(160, 120)
+    assert viewer.mjpeg_thread.frame_pool.available() > 0
+    assert viewer.mjpeg_thread.corrupt == 0
+
+    start = time.monotonic()
+    assert viewer.mjpeg_thread.stop()
+    assert time.monotonic() - start < 5
+    assert viewer.mjpeg_thread.frame_pool.shm is None
+    server.stop()
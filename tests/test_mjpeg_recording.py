@@ -0,0 +1,194 @@
+"""
+Unit tests for FPV recording
+"""
+
+import time
+
+import pytest
+from kevinbot_desktopclient.mjpeg_server import MJPEGTestServer, render_frame
+from kevinbot_desktopclient.ui.mjpeg import FrameTimestamps, MJPEGStreamThread, MJPEGViewer
+from kevinbot_desktopclient.ui.mjpeg_recording import (
+    INDEX_MAGIC,
+    INDEX_RECORD,
+    FrameRecorder,
+    MJPEGPlayer,
+    Recording,
+    ReplayBuffer,
+    find_frame,
+    index_path,
+)
+
+
+def read_index(path):
+    data = index_path(path).read_bytes()
+    assert data.startswith(INDEX_MAGIC)
+    return list(INDEX_RECORD.iter_unpack(data[len(INDEX_MAGIC) :]))
+
+
+def test_recorder_writes_frames_unchanged(tmp_path):
+    frames = [render_frame(index, (64, 48)) for index in range(5)]
+    recorder = FrameRecorder(tmp_path / "fpv.mjpeg")
+    recorder.start()
+    for frame in frames:
+        recorder.write(frame, FrameTimestamps(received=time.monotonic()))
+    recorder.stop()
+    recorder.write(frames[0], FrameTimestamps(received=time.monotonic()))
+
+    assert recorder.written == len(frames)
+    assert recorder.dropped == 0
+    data = (tmp_path / "fpv.mjpeg").read_bytes()
+    assert data == b"".join(frames)
+
+    index = read_index(tmp_path / "fpv.mjpeg")
+    assert [data[offset : offset + length] for offset, length, _ in index] == frames
+    timestamps = [timestamp for _, _, timestamp in index]
+    assert timestamps == sorted(timestamps)
+    assert timestamps[0] >= 0
+
+
+def test_recorder_does_not_overwrite(tmp_path):
+    (tmp_path / "fpv.mjpeg").write_bytes(b"old")
+    with pytest.raises(FileExistsError):
+        FrameRecorder(tmp_path / "fpv.mjpeg").start()
+    assert (tmp_path / "fpv.mjpeg").read_bytes() == b"old"
+    assert not index_path(tmp_path / "fpv.mjpeg").exists()
+
+
+@pytest.mark.usefixtures("qtbot")
+def test_record_stream(tmp_path):
+    server = MJPEGTestServer(fps=30, size=(160, 120))
+    server.start()
+    thread = MJPEGStreamThread(server.url)
+    recorder = FrameRecorder(tmp_path / "fpv.mjpeg")
+    recorder.start()
+    thread.add_sink(recorder.write)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 5
+        while recorder.written < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        thread.remove_sink(recorder.write)
+        assert thread.stop()
+        thread.pipeline.close()
+        recorder.stop()
+        server.stop()
+
+    index = read_index(tmp_path / "fpv.mjpeg")
+    assert len(index) >= 10
+    data = (tmp_path / "fpv.mjpeg").read_bytes()
+    for offset, length, _ in index:
+        assert data[offset : offset + 2] == b"\xff\xd8"
+        assert data[offset + length - 2 : offset + length] == b"\xff\xd9"
+
+
+def write_recording(path, count, interval=0.1):
+    frames = [render_frame(index, (64, 48)) for index in range(count)]
+    path.write_bytes(b"".join(frames))
+    index = [INDEX_MAGIC]
+    offset = 0
+    for number, frame in enumerate(frames):
+        index.append(INDEX_RECORD.pack(offset, len(frame), number * interval))
+        offset += len(frame)
+    index_path(path).write_bytes(b"".join(index))
+    return frames
+
+
+def test_recording_seek(tmp_path):
+    frames = write_recording(tmp_path / "fpv.mjpeg", 50)
+    with Recording(tmp_path / "fpv.mjpeg") as recording:
+        assert len(recording) == 50
+        assert [recording.frame(index) for index in range(50)] == frames
+        assert recording.timestamp(10) == pytest.approx(1.0)
+        assert find_frame(recording, -1) == 0
+        assert find_frame(recording, 0.25) == 2
+        assert find_frame(recording, 0.35) == 3
+        assert find_frame(recording, 100) == 49
+
+
+def test_recording_builds_missing_index(tmp_path):
+    frames = write_recording(tmp_path / "fpv.mjpeg", 5)
+    index_path(tmp_path / "fpv.mjpeg").unlink()
+    (tmp_path / "fpv.mjpeg").write_bytes(b"\x00garbage" + (tmp_path / "fpv.mjpeg").read_bytes())
+
+    with Recording(tmp_path / "fpv.mjpeg", fps=10) as recording:
+        assert [recording.frame(index) for index in range(len(recording))] == frames
+        assert recording.timestamp(4) == pytest.approx(0.4)
+    assert index_path(tmp_path / "fpv.mjpeg").exists()
+
+    with Recording(tmp_path / "fpv.mjpeg") as recording:
+        assert len(recording) == 5
+
+
+def test_recording_ignores_frames_missing_from_data(tmp_path):
+    frames = write_recording(tmp_path / "fpv.mjpeg", 5)
+    (tmp_path / "fpv.mjpeg").write_bytes(b"".join(frames[:3]) + frames[3][:10])
+    with Recording(tmp_path / "fpv.mjpeg") as recording:
+        assert len(recording) == 3
+
+
+def test_player(qtbot, tmp_path):
+    write_recording(tmp_path / "fpv.mjpeg", 20, interval=0.02)
+    recording = Recording(tmp_path / "fpv.mjpeg")
+    viewer = MJPEGViewer("http://127.0.0.1:9/video_feed")
+    qtbot.addWidget(viewer)
+    player = MJPEGPlayer(recording, viewer.mjpeg_thread.pool)
+    viewer.set_player(player)
+
+    player.step(5)
+    assert player.index == 5
+    player.seek(0.11)
+    assert player.index == 5
+    player.step(-10)
+    assert player.index == 0
+
+    player.set_speed(2)
+    with qtbot.waitSignal(player.playing_changed, check_params_cb=lambda playing: not playing, timeout=5000):
+        player.play()
+    assert player.index == len(recording) - 1
+    qtbot.waitUntil(lambda: viewer.current_pixmap is not None and player.mailbox.is_empty())
+
+    viewer.set_player(None)
+    player.close()
+    viewer.mjpeg_thread.stop()
+    recording.close()
+
+
+def test_replay_buffer_limits():
+    replay = ReplayBuffer(max_bytes=1000, max_age=1.0)
+    for index in range(20):
+        replay.write(bytes([index]) * 100, FrameTimestamps(received=index * 0.01))
+    assert len(replay) == 10
+    assert replay.size == 1000
+    clip = replay.snapshot()
+    assert clip.frame(0) == bytes([10]) * 100
+    assert clip.timestamp(9) == pytest.approx(0.19)
+
+    replay.write(b"new", FrameTimestamps(received=1.5))
+    assert len(replay) == 1
+    assert replay.duration == 0
+    assert len(clip) == 10
+
+    replay.write(b"x" * 2000, FrameTimestamps(received=1.6))
+    assert len(replay) == 1
+
+
+def test_replay_while_live(qtbot):
+    server = MJPEGTestServer(fps=30, size=(160, 120))
+    server.start()
+    viewer = MJPEGViewer(server.url)
+    qtbot.addWidget(viewer)
+    replay = ReplayBuffer()
+    viewer.mjpeg_thread.add_sink(replay.write)
+    qtbot.waitUntil(lambda: len(replay) >= 10, timeout=5000)
+
+    player = MJPEGPlayer(replay.snapshot(), viewer.mjpeg_thread.pool)
+    viewer.set_player(player)
+    with qtbot.waitSignal(player.playing_changed, check_params_cb=lambda playing: not playing, timeout=5000):
+        player.play()
+    assert len(replay) > len(player.source)
+
+    viewer.set_player(None)
+    player.close()
+    assert viewer.mjpeg_thread.stop()
+    server.stop()